@@ -1,47 +1,148 @@
+import numpy as np
 import pandas as pd
 
-df_del = pd.read_csv('cleaned_del.csv')
-df_match = pd.read_csv('cleaned_match.csv')
+import dataset
+import form
+import headtohead
+import leaderboard
+import rollup
+import search
+import winprob
+from dataset import CUBE_MEASURES, PHASES, over_phase
+
+# Every function below reads from one snapshot (frames, indexes and precomputed aggregates),
+# taken once per call. Importing this module loads nothing: the first snapshot is loaded on first
+# use (see dataset.current), so processes that publish their own snapshot, such as the batch
+# workers, never read the dataset files.
+
+# Helpers called by the functions below rather than entry points of their own: they are not
+# instrumented (see metrics.instrument_module) nor benchmarked (see benchmarks/suite.py)
+HELPERS = {'dismissal_counts', 'performance_stats', 'vs_team_stats', 'invalid_sections', 'report_innings',
+           'filter_partnerships', 'team_phase_record', 'head_to_head_stats', 'parse_window', 'window_info',
+           'pair_dismissal_types', 'head_to_head_list', 'pair_records',
+           'fall_of_wickets_records'}
+
+# Canonical name, ID and dataset spellings of a player, team, venue or city name
+def resolve_name(kind, name):
+    snap = dataset.current()
+    if kind not in snap.registries:
+        return {"error": f"Invalid kind. Use {', '.join(snap.registries)}"}
+    names = snap.registries[kind]
+    canonical = names.resolve(name, fuzzy=True)
+    if canonical is None:
+        return {"error": f"No {kind} found matching '{name}'"}
+    return {
+        "kind": kind,
+        "name": name,
+        "canonical": canonical,
+        "id": names.ids[canonical],
+        "variants": names.variants[canonical]
+    }
+
+# Autocomplete suggestions for a partial or misspelled player, team or venue name, best first
+# (see search.py), with their registry IDs
+def search_names(query, kind=None, k=10):
+    snap = dataset.current()
+    if kind is not None and kind not in search.KINDS:
+        return {"error": f"Invalid kind. Use {', '.join(search.KINDS)}"}
+    if k < 1:
+        return {"error": "k must be positive"}
+    results = snap.search_index.search(query, kind, k)
+    for result in results:
+        result["id"] = snap.registries[result["kind"]].ids[result["name"]]
+    return {"query": query, "results": results}
+
+# Counts per dismissal kind, most frequent first (NaN kinds are left out)
+def dismissal_counts(counts):
+    counts = counts[counts.index.notna()].sort_values(ascending=False, kind='stable')
+    return {kind: int(count) for kind, count in counts.items()}
+
+# Match aggregates: metrics (count, wins, toss_wins, mean_target, margin_histogram) of the
+# matches matching filters ({dimension: value or list of values}), grouped by any of season,
+# city, venue, team, toss_decision and result, from the precomputed rollup cubes.
+# Grouped or filtered by team, every match counts once for each side and wins are the team's;
+# otherwise wins are matches that had a winner and toss_wins those won by the toss winner.
+def aggregate_matches(group_by=(), filters=None, metrics=('count',)):
+    snap = dataset.current()
+    group_by, metrics, filters = list(group_by), list(metrics), dict(filters or {})
+    invalid = [dimension for dimension in group_by + list(filters) if dimension not in rollup.DIMENSIONS]
+    if invalid:
+        return {"error": f"Invalid dimension(s): {', '.join(invalid)}. Use {', '.join(rollup.DIMENSIONS)}"}
+    invalid = [metric for metric in metrics if metric not in rollup.METRICS]
+    if invalid or not metrics:
+        return {"error": f"Invalid metric(s): {', '.join(invalid)}. Use {', '.join(rollup.METRICS)}"}
+    
+    # Names are matched in all their dataset spellings
+    registries = {'team': snap.teams, 'venue': snap.venues, 'city': snap.cities}
+    for dimension, values in filters.items():
+        values = values if isinstance(values, (list, tuple, set)) else [values]
+        if dimension in registries:
+            values = [variant for value in values for variant in (registries[dimension].variants_of(value) or [value])]
+        elif dimension == 'season':
+            try:
+                values = [int(value) for value in values]
+            except (TypeError, ValueError):
+                return {"error": "Season must be a number"}
+        filters[dimension] = values
+    return rollup.query(snap.match_rollups, group_by, filters, metrics)
 
 # teams
 def teams():
-    teams = set(df_match['team1']) | set(df_match['team2'])
-    return {'teams' : list(teams)}
+    return {'teams' : [record['team'] for record in aggregate_matches(['team'])]}
 
 # total matches over seasons
 def total_matches_over_seasons():
-    res = df_match['season'].value_counts()
-    return {'seasons' : res.to_dict()}
+    res = sorted(aggregate_matches(['season']), key=lambda record: -record['count'])
+    return {'seasons' : {record['season']: record['count'] for record in res}}
 
 # matches hosted by each city
 def matches_hosted_by_each_city():
-    res = df_match['city'].value_counts()
-    return {'seasons' : res.to_dict()}
+    res = sorted(aggregate_matches(['city']), key=lambda record: -record['count'])
+    return {'seasons' : {record['city']: record['count'] for record in res}}
 
 # Average Target Runs by Season
 def avg_target_by_season():
-    return df_match.groupby('season')['target_runs'].mean().to_dict()
+    return {record['season']: record['mean_target'] for record in aggregate_matches(['season'], metrics=['mean_target'])}
 
-# Function to get player performance stats
 # Function to get player performance stats
 def player_performance(player_name):
-    player_data = df_del[(df_del['batter'] == player_name) | (df_del['bowler'] == player_name)]
+    snap = dataset.current()
+    player_name = snap.players.resolve(player_name) or player_name
+    batting = snap.player_totals(player_name, 'batting')
+    bowling = snap.player_totals(player_name, 'bowling')
     
-    if player_data.empty:
+    if batting is None and bowling is None:
         return {"error": "Player not found or no data available"}
+    return performance_stats(player_name, batting, bowling)
+
+# player_performance of many players: their cube rows are selected and summed in one groupby.
+# Keyed by the names as given; unknown players get an error entry.
+def player_performance_bulk(player_names):
+    snap = dataset.current()
+    resolved = {name: snap.players.resolve(name) or name for name in player_names}
+    totals = snap.players_totals(resolved.values())
     
+    results = {}
+    for name, player_name in resolved.items():
+        batting = totals.loc[(player_name, 'batting')] if (player_name, 'batting') in totals.index else None
+        bowling = totals.loc[(player_name, 'bowling')] if (player_name, 'bowling') in totals.index else None
+        if batting is None and bowling is None:
+            results[name] = {"error": "Player not found or no data available"}
+        else:
+            results[name] = performance_stats(player_name, batting, bowling)
+    return results
+
+def performance_stats(player_name, batting, bowling):
     # Batting Stats
-    batting_data = df_del[df_del['batter'] == player_name]
-    total_runs = batting_data['batsman_runs'].sum()
-    balls_faced = len(batting_data)
+    total_runs = batting['runs'] if batting is not None else 0
+    balls_faced = int(batting['balls']) if batting is not None else 0
     strike_rate = round((total_runs / balls_faced) * 100, 2) if balls_faced > 0 else 0
-    boundaries = batting_data[batting_data['batsman_runs'].isin([4, 6])]['batsman_runs'].count()
+    boundaries = batting['fours'] + batting['sixes'] if batting is not None else 0
     
     # Bowling Stats
-    bowling_data = df_del[df_del['bowler'] == player_name]
-    total_wickets = bowling_data[bowling_data['is_wicket'] == 1]['is_wicket'].count()
-    runs_conceded = bowling_data['total_runs'].sum()
-    balls_bowled = len(bowling_data)
+    total_wickets = bowling['wickets'] if bowling is not None else 0
+    runs_conceded = bowling['runs_conceded'] if bowling is not None else 0
+    balls_bowled = int(bowling['balls']) if bowling is not None else 0
     economy_rate = round((runs_conceded / (balls_bowled / 6)), 2) if balls_bowled > 0 else 0
     
     return {
@@ -62,27 +163,50 @@ def player_performance(player_name):
 
 # Function to get player performance against a specific team
 def player_vs_team(player_name, team_name):
-    player_data = df_del[(df_del['batter'] == player_name) & (df_del['bowling_team'] == team_name)]
+    snap = dataset.current()
+    player_name = snap.players.resolve(player_name) or player_name
+    team_name = snap.teams.resolve(team_name) or team_name
+    batting = snap.player_totals(player_name, 'batting', opposing_team=team_name)
     
-    if player_data.empty:
+    if batting is None:
         return {"error": "No data available for this player against the specified team"}
+    bowling = snap.player_totals(player_name, 'bowling', opposing_team=team_name)
+    return vs_team_stats(player_name, team_name, batting, bowling)
+
+# player_vs_team of many (player, team) pairs in one selection and groupby of the cube, keyed by the pairs
+def player_vs_team_bulk(pairs):
+    snap = dataset.current()
+    resolved = {(player, team): (snap.players.resolve(player) or player, snap.teams.resolve(team) or team) for player, team in pairs}
+    totals = snap.players_totals([player for player, _ in resolved.values()], [team for _, team in resolved.values()])
     
+    results = {}
+    for pair, (player_name, team_name) in resolved.items():
+        batting_key, bowling_key = (player_name, 'batting', team_name), (player_name, 'bowling', team_name)
+        if batting_key not in totals.index:
+            results[pair] = {"error": "No data available for this player against the specified team"}
+            continue
+        bowling = totals.loc[bowling_key] if bowling_key in totals.index else None
+        results[pair] = vs_team_stats(player_name, team_name, totals.loc[batting_key], bowling)
+    return results
+
+def vs_team_stats(player_name, team_name, batting, bowling):
     # Batting Stats
-    total_runs = player_data['batsman_runs'].sum()
-    balls_faced = len(player_data)
+    total_runs = batting['runs']
+    balls_faced = int(batting['balls'])
     strike_rate = round((total_runs / balls_faced) * 100, 2) if balls_faced > 0 else 0
-    boundaries = player_data[player_data['batsman_runs'].isin([4, 6])]['batsman_runs'].value_counts().to_dict()
+    boundaries = dismissal_counts(pd.Series({4: batting['fours'], 6: batting['sixes']}).loc[lambda counts: counts > 0])
     
     # Bowling Stats
-    bowling_data = df_del[(df_del['bowler'] == player_name) & (df_del['batting_team'] == team_name)]
-    total_wickets = bowling_data[bowling_data['is_wicket'] == 1]['is_wicket'].count()
-    runs = [bowling_data['batsman_runs'].sum(), bowling_data['extra_runs'].sum()]
+    if bowling is None:
+        bowling = pd.Series(0, index=CUBE_MEASURES)
+    total_wickets = bowling['wickets']
+    runs = [bowling['runs'], bowling['extras']]
     runs_conceded = {
         'runs' :  int(runs[0]),
         'extra' : int(runs[1]),
         'total' : int(sum(runs))
     }
-    balls_bowled = len(bowling_data)
+    balls_bowled = int(bowling['balls'])
     economy_rate = round((sum(runs) / (balls_bowled / 6)), 2) if balls_bowled > 0 else 0
     
     return {
@@ -105,14 +229,15 @@ def player_vs_team(player_name, team_name):
 # inning-wise statistics
 # 1. Powerplay, Middle, and Death Overs Analysis in inning
 def match_innings_1(match_id):
-    match_data = df_del[df_del['match_id'] == match_id]
+    snap = dataset.current()
+    match_data = snap.match_deliveries(match_id)
     
     if match_data.empty:
         return {"error": "Match ID not found"}
     
     innings_stats = {}
     for inning in match_data['inning'].unique():
-        inning_data = match_data[match_data['inning'] == inning]
+        inning_data = snap.inning_deliveries(match_id, inning)
         team = inning_data.iloc[0]['batting_team']
         total_runs = inning_data['total_runs'].sum()
         wickets = inning_data[inning_data['is_wicket'] == 1].shape[0]
@@ -163,26 +288,27 @@ def match_innings_1(match_id):
 
 # 2. inning Top Performers
 def match_innings_2(match_id):
-    match_data = df_del[df_del['match_id'] == match_id]
+    snap = dataset.current()
+    match_data = snap.match_deliveries(match_id)
     
     if match_data.empty:
         return {"error": "Match ID not found"}
     
     innings_stats = {}
     for inning in match_data['inning'].unique():
-        inning_data = match_data[match_data['inning'] == inning]
+        inning_data = snap.inning_deliveries(match_id, inning)
         team = inning_data.iloc[0]['batting_team']
         total_runs = inning_data['total_runs'].sum()
         wickets = inning_data[inning_data['is_wicket'] == 1].shape[0]
         run_rate = round(total_runs / (max(inning_data['over'])) + 1, 2) if max(inning_data['over']) > 0 else 0
         
         # Top batsman
-        top_batsman = inning_data.groupby('batter')['batsman_runs'].sum().idxmax()
-        top_batsman_runs = inning_data.groupby('batter')['batsman_runs'].sum().max()
+        top_batsman = inning_data.groupby('batter', observed=True)['batsman_runs'].sum().idxmax()
+        top_batsman_runs = inning_data.groupby('batter', observed=True)['batsman_runs'].sum().max()
         
         # Top bowler
-        top_bowler = inning_data.groupby('bowler')['is_wicket'].sum().idxmax()
-        top_bowler_wickets = inning_data.groupby('bowler')['is_wicket'].sum().max()
+        top_bowler = inning_data.groupby('bowler', observed=True)['is_wicket'].sum().idxmax()
+        top_bowler_wickets = inning_data.groupby('bowler', observed=True)['is_wicket'].sum().max()
         
         innings_stats[inning] = {
             "batting_team": team,
@@ -203,14 +329,15 @@ def match_innings_2(match_id):
 
 # 3. inning Boundary Analysis
 def match_innings_3(match_id):
-    match_data = df_del[df_del['match_id'] == match_id]
+    snap = dataset.current()
+    match_data = snap.match_deliveries(match_id)
     
     if match_data.empty:
         return {"error": "Match ID not found"}
     
     innings_stats = {}
     for inning in match_data['inning'].unique():
-        inning_data = match_data[match_data['inning'] == inning]
+        inning_data = snap.inning_deliveries(match_id, inning)
         team = inning_data.iloc[0]['batting_team']
         total_runs = inning_data['total_runs'].sum()
         wickets = inning_data[inning_data['is_wicket'] == 1].shape[0]
@@ -239,27 +366,24 @@ def match_innings_3(match_id):
 
 # 4. inning vise Fall of Wickets
 def match_innings_4(match_id):
-    match_data = df_del[df_del['match_id'] == match_id]
+    snap = dataset.current()
+    match_data = snap.match_deliveries(match_id)
     
     if match_data.empty:
         return {"error": "Match ID not found"}
     
     innings_stats = {}
     for inning in match_data['inning'].unique():
-        inning_data = match_data[match_data['inning'] == inning]
-        
-        # Calculate cumulative runs for each ball
-        inning_data['cumulative_runs'] = inning_data['total_runs'].cumsum()
+        inning_data = snap.inning_deliveries(match_id, inning)
+        inning_state = snap.inning_state(match_id, inning)
         
         team = inning_data.iloc[0]['batting_team']
-        total_runs = inning_data.iloc[-1,-1]
+        total_runs = inning_state['score'].iloc[-1]
         wickets = inning_data[inning_data['is_wicket'] == 1].shape[0]
         run_rate = round(total_runs / (max(inning_data['over']) + 1), 2) if max(inning_data['over']) > 0 else 0
         
-        # Fall of wickets
-        fall_of_wickets = inning_data[inning_data['is_wicket'] == 1][['over', 'ball', 'player_dismissed', 'cumulative_runs']]
-        fall_of_wickets = fall_of_wickets.rename(columns={'cumulative_runs': 'total_runs'})
-        fall_of_wickets = fall_of_wickets.to_dict(orient='records')
+        # Fall of wickets, with the score from the state table
+        fall_of_wickets = fall_of_wickets_records(inning_data, inning_state, [])
         
         innings_stats[int(inning)] = {
             "batting_team": team,
@@ -274,117 +398,377 @@ def match_innings_4(match_id):
 
 # inning vise Partnership Analysis
 def match_innings_5(match_id):
-    match_data = df_del[df_del['match_id'] == match_id]
+    snap = dataset.current()
+    match_data = snap.match_deliveries(match_id)
     
     if match_data.empty:
         return {"error": "Match ID not found"}
     
     innings_stats = {}
     for inning in match_data['inning'].unique():
-        inning_data = match_data[match_data['inning'] == inning]
+        inning_data = snap.inning_deliveries(match_id, inning)
         team = inning_data.iloc[0]['batting_team']
         total_runs = inning_data['total_runs'].sum()
         wickets = inning_data[inning_data['is_wicket'] == 1].shape[0]
         run_rate = round(total_runs / (max(inning_data['over'])) + 1, 2) if max(inning_data['over']) > 0 else 0
         
-        # Partnership analysis
-        partnerships = []
-        current_partnership = {"batsmen": [], "runs": 0, "balls": 0}
-        for _, ball in inning_data.iterrows():
-            if ball['is_wicket'] == 1:
-                partnerships.append(current_partnership)
-                current_partnership = {"batsmen": [], "runs": 0, "balls": 0}
-            else:
-                current_partnership["batsmen"] = list(set(current_partnership["batsmen"] + [ball['batter'], ball['non_striker']]))
-                current_partnership["runs"] += ball['total_runs']
-                current_partnership["balls"] += 1
-        
-        # Add the last partnership
-        if current_partnership["runs"] > 0:
-            partnerships.append(current_partnership)
-        
-        # Sort partnerships by runs
-        partnerships = sorted(partnerships, key=lambda x: x['runs'], reverse=True)
+        # Partnership analysis (from the precomputed partnerships table), sorted by runs
+        inning_partnerships = snap.partnerships[(snap.partnerships['match_id'] == match_id) & (snap.partnerships['inning'] == inning)]
+        inning_partnerships = inning_partnerships.sort_values('runs', ascending=False, kind='stable')
+        inning_partnerships = inning_partnerships[['batsmen', 'runs', 'balls']].to_dict(orient='records')
         
         innings_stats[int(inning)] = {
             "batting_team": team,
             "total_runs": int(total_runs),
             "wickets": wickets,
             "run_rate": float(run_rate),
-            "partnerships": partnerships
+            "partnerships": inning_partnerships
         }
     
     return {"match_id": match_id, "innings": innings_stats}
     
-def get_all_partnerships():
-    all_partnerships = []
+# Wickets of the deliveries with the score at their fall, as records of the key columns,
+# over, ball, player_dismissed and total_runs; state holds the delivery state rows of deliveries
+def fall_of_wickets_records(deliveries, state, keys):
+    fallen = (deliveries['is_wicket'] == 1).to_numpy()
+    wickets = deliveries[fallen][keys + ['over', 'ball', 'player_dismissed']]
+    return wickets.assign(total_runs=state['score'].to_numpy()[fallen]).to_dict(orient='records')
+
+# Over by over progress of every innings of a match, read off the delivery state table at the
+# last delivery of each over: worm (score and wickets), Manhattan (runs and wickets in the over)
+# and run rates (current, and required in a chase)
+PROGRESS_CHARTS = ['worm', 'manhattan', 'run_rate']
+
+def match_progress(match_id, chart):
+    snap = dataset.current()
+    if chart not in PROGRESS_CHARTS:
+        return {"error": f"Invalid chart. Use {', '.join(PROGRESS_CHARTS)}"}
+    match_data = snap.match_deliveries(match_id)
+    if match_data.empty:
+        return {"error": "Match ID not found"}
+    
+    match_state = snap.match_state(match_id)
+    overs = match_state.assign(inning=match_data['inning'].to_numpy(), over=match_data['over'].to_numpy())
+    overs = overs.drop_duplicates(['inning', 'over'], keep='last')
+    first = overs['inning'].ne(overs['inning'].shift()).to_numpy()
+    runs = np.where(first, overs['score'], overs['score'].diff().fillna(0)).astype(int)
+    wickets = np.where(first, overs['wickets'], overs['wickets'].diff().fillna(0)).astype(int)
+    teams = match_data.groupby('inning', sort=False)['batting_team'].first()
     
-    # Iterate through all matches
-    for match_id in df_del['match_id'].unique():
-        match_data = df_del[df_del['match_id'] == match_id]
-        
-        # Iterate through all innings in the match
-        for inning in match_data['inning'].unique():
-            inning_data = match_data[match_data['inning'] == inning]
-            team = inning_data.iloc[0]['batting_team']
-            
-            # Initialize partnership tracking
-            partnerships = []
-            current_partnership = {"batsmen": set(), "runs": 0, "balls": 0}
-            
-            # Iterate through each ball in the inning
-            for _, ball in inning_data.iterrows():
-                if ball['is_wicket'] == 1:
-                    # Finalize the current partnership
-                    current_partnership["batsmen"] = list(current_partnership["batsmen"])  # Convert set to list
-                    partnerships.append(current_partnership)
-                    # Start a new partnership
-                    current_partnership = {"batsmen": set(), "runs": 0, "balls": 0}
-                else:
-                    # Update the current partnership
-                    current_partnership["batsmen"].add(ball['batter'])
-                    current_partnership["batsmen"].add(ball['non_striker'])
-                    current_partnership["runs"] += ball['total_runs']
-                    current_partnership["balls"] += 1
-            
-            # Add the last partnership if it exists
-            if current_partnership["runs"] > 0:
-                current_partnership["batsmen"] = list(current_partnership["batsmen"])  # Convert set to list
-                partnerships.append(current_partnership)
-            
-            # Append partnerships to the all_partnerships list
-            for partnership in partnerships:
-                all_partnerships.append({
-                    "match_id": int(match_id),
-                    "inning": int(inning),
-                    "batting_team": team,
-                    "batsmen": partnership["batsmen"],
-                    "runs": partnership["runs"],
-                    "balls": partnership["balls"]
-                })
-    
-    return all_partnerships
+    innings_stats = {int(inning): {"batting_team": teams[inning], "overs": []} for inning in teams.index}
+    for row, over_runs, over_wickets in zip(overs.itertuples(index=False), runs, wickets):
+        point = {"over": int(row.over) + 1}
+        if chart == 'worm':
+            point.update(score=int(row.score), wickets=int(row.wickets))
+        elif chart == 'manhattan':
+            point.update(runs=int(over_runs), wickets=int(over_wickets))
+        else:
+            point.update(
+                current_run_rate=round(float(row.current_run_rate), 2),
+                required_run_rate=round(float(row.required_run_rate), 2) if row.required_run_rate == row.required_run_rate else None,
+            )
+        innings_stats[int(row.inning)]["overs"].append(point)
+    return {"match_id": match_id, "chart": chart, "innings": innings_stats}
+
+# Win probability of the batting side after every delivery of the first two innings of a match
+# (super overs are left out), from the win-probability model of the snapshot's dataset version
+# (see winprob.py), evaluated over each innings in one batch
+def match_win_probability(match_id):
+    snap = dataset.current()
+    match_data = snap.match_deliveries(match_id)
+    if match_data.empty:
+        return {"error": "Match ID not found"}
+    
+    model = winprob.model_for(snap)
+    match_state = snap.match_state(match_id)
+    innings_stats = {}
+    for inning in winprob.INNINGS:
+        rows = (match_data['inning'] == inning).to_numpy()
+        if not rows.any():
+            continue
+        inning_data = match_data[rows]
+        inning_state = match_state[rows]
+        probability = winprob.win_probability(model, inning, inning_state, inning_data['match_id'], snap.df_match)
+        innings_stats[inning] = {
+            "batting_team": inning_data['batting_team'].iloc[0],
+            "bowling_team": inning_data['bowling_team'].iloc[0],
+            "balls": [
+                {"over": int(over), "ball": int(ball), "score": int(score), "wickets": int(wickets), "win_probability": round(float(p), 4)}
+                for over, ball, score, wickets, p in zip(inning_data['over'], inning_data['ball'], inning_state['score'], inning_state['wickets'], probability)
+            ]
+        }
+    return {"match_id": match_id, "model_version": model['dataset_version'], "innings": innings_stats}
+
+# Combined match report: every inning-wise analysis above in one grouped pass over the match
+REPORT_SECTIONS = ['phase_stats', 'top_performers', 'boundaries', 'fall_of_wickets', 'partnerships']
+
+def invalid_sections(sections):
+    invalid = [section for section in sections if section not in REPORT_SECTIONS]
+    if invalid:
+        return {"error": f"Invalid section(s): {', '.join(invalid)}. Use {', '.join(REPORT_SECTIONS)}"}
+    return None
+
+def match_report(match_id, sections=None):
+    sections = REPORT_SECTIONS if not sections else list(sections)
+    error = invalid_sections(sections)
+    if error:
+        return error
+    return match_report_bulk([match_id], sections)[match_id]
+
+# Reports of many matches from one grouped pass over all their deliveries, keyed by match ID
+def match_report_bulk(match_ids, sections=None):
+    snap = dataset.current()
+    sections = REPORT_SECTIONS if not sections else list(sections)
+    error = invalid_sections(sections)
+    if error:
+        return error
+    
+    innings, _ = report_innings(snap, match_ids, sections)
+    return {
+        match_id: {"match_id": match_id, "sections": sections, "innings": innings[match_id]}
+        if match_id in innings else {"error": "Match ID not found"}
+        for match_id in dict.fromkeys(match_ids)
+    }
+
+# Per-inning stats and the requested sections of the given matches, as {match_id: {inning: stats}},
+# plus the per-inning summary table they were computed from
+def report_innings(snap, match_ids, sections):
+    keys = ['match_id', 'inning']
+    match_data = snap.matches_deliveries(match_ids)
+    match_data = match_data.assign(
+        phase=over_phase(match_data['over']),
+        fours=(match_data['batsman_runs'] == 4).astype(int),
+        sixes=(match_data['batsman_runs'] == 6).astype(int),
+    )
+    summary = match_data.groupby(keys, sort=False).agg(
+        batting_team=('batting_team', 'first'),
+        total_runs=('total_runs', 'sum'),
+        wickets=('is_wicket', 'sum'),
+        first_over=('over', 'min'),
+        last_over=('over', 'max'),
+        fours=('fours', 'sum'),
+        sixes=('sixes', 'sum'),
+    )
+    
+    innings = {}
+    for (match_id, inning), row in summary.iterrows():
+        innings.setdefault(int(match_id), {})[int(inning)] = {
+            "batting_team": row.batting_team,
+            "total_runs": int(row.total_runs),
+            "wickets": int(row.wickets),
+            "run_rate": round(row.total_runs / (row.last_over + 1), 2),
+        }
+    
+    if 'phase_stats' in sections:
+        phases = match_data.groupby(keys + ['phase']).agg(
+            runs=('total_runs', 'sum'),
+            wickets=('is_wicket', 'sum'),
+            first_over=('over', 'min'),
+            last_over=('over', 'max'),
+        )
+        phases['overs'] = phases['last_over'] - phases['first_over'] + 1
+        for match_innings in innings.values():
+            for stats in match_innings.values():
+                stats['phase_stats'] = {phase: {"runs": 0, "wickets": 0, "run_rate": 0} for phase in PHASES}
+        for (match_id, inning, phase), row in phases.iterrows():
+            innings[int(match_id)][int(inning)]['phase_stats'][phase] = {
+                "runs": int(row['runs']),
+                "wickets": int(row['wickets']),
+                "run_rate": round(row['runs'] / row['overs'], 2),
+            }
+    
+    if 'top_performers' in sections:
+        # Ties go to the first name in category order, as in match_innings_2
+        batsmen = match_data.groupby(keys + ['batter'], observed=True)['batsman_runs'].sum()
+        bowlers = match_data.groupby(keys + ['bowler'], observed=True)['is_wicket'].sum()
+        top_batsmen = batsmen.groupby(level=keys).idxmax()
+        top_bowlers = bowlers.groupby(level=keys).idxmax()
+        for (match_id, inning), batsman_key in top_batsmen.items():
+            bowler_key = top_bowlers.loc[(match_id, inning)]
+            innings[int(match_id)][int(inning)]['top_performers'] = {
+                "top_batsman": {"name": batsman_key[2], "runs": int(batsmen.loc[batsman_key])},
+                "top_bowler": {"name": bowler_key[2], "wickets": int(bowlers.loc[bowler_key])},
+            }
+    
+    if 'boundaries' in sections:
+        for (match_id, inning), row in summary.iterrows():
+            stats = innings[int(match_id)][int(inning)]
+            fours, sixes = int(row.fours), int(row.sixes)
+            boundary_runs = (fours * 4) + (sixes * 6)
+            stats['boundaries'] = {
+                "fours": fours,
+                "sixes": sixes,
+                "boundary_runs": boundary_runs,
+                "boundary_percentage": round((boundary_runs / stats['total_runs']) * 100, 2) if stats['total_runs'] > 0 else 0,
+            }
+    
+    if 'fall_of_wickets' in sections:
+        for match_innings in innings.values():
+            for stats in match_innings.values():
+                stats['fall_of_wickets'] = []
+        for record in fall_of_wickets_records(match_data, snap.matches_state(match_ids), keys):
+            innings[record.pop('match_id')][record.pop('inning')]['fall_of_wickets'].append(record)
+    
+    if 'partnerships' in sections:
+        match_partnerships = snap.partnerships[snap.partnerships['match_id'].isin(list(innings))]
+        for match_innings in innings.values():
+            for stats in match_innings.values():
+                stats['partnerships'] = []
+        for record in match_partnerships[keys + ['batsmen', 'runs', 'balls']].to_dict(orient='records'):
+            innings[record.pop('match_id')][record.pop('inning')]['partnerships'].append(record)
+    
+    return innings, summary
+
+# Inning-wise analysis N (as match_innings_N) of many matches in one grouped pass, keyed by match ID
+INNINGS_ANALYSES = {1: 'phase_stats', 2: 'top_performers', 3: 'boundaries', 4: 'fall_of_wickets', 5: 'partnerships'}
+
+def match_innings_bulk(match_ids, analysis):
+    snap = dataset.current()
+    section = INNINGS_ANALYSES.get(analysis)
+    if section is None:
+        return {"error": "Invalid analysis. Use 1, 2, 3, 4 or 5"}
+    
+    innings, summary = report_innings(snap, match_ids, [section])
+    results = {}
+    for match_id in dict.fromkeys(match_ids):
+        if match_id not in innings:
+            results[match_id] = {"error": "Match ID not found"}
+            continue
+        innings_stats = {}
+        for inning, stats in innings[match_id].items():
+            total_runs = stats['total_runs']
+            first_over, last_over = int(summary.loc[(match_id, inning), 'first_over']), int(summary.loc[(match_id, inning), 'last_over'])
+            # Each analysis keeps its own run rate formula
+            if analysis == 1:
+                run_rate = round(total_runs / (last_over - first_over + 1), 2)
+            elif analysis in (2, 5):
+                run_rate = round(total_runs / last_over + 1, 2) if last_over > 0 else 0
+            else:
+                run_rate = round(total_runs / (last_over + 1), 2) if last_over > 0 else 0
+            stats = {**stats, "run_rate": float(run_rate)}
+            if analysis == 2:
+                stats.update(stats.pop('top_performers'))
+            if analysis == 5:
+                stats['partnerships'] = sorted(stats['partnerships'], key=lambda partnership: -partnership['runs'])
+            innings_stats[inning] = stats
+        results[match_id] = {"match_id": match_id, "innings": innings_stats}
+    return results
+
+PARTNERSHIP_COLUMNS = ['match_id', 'inning', 'batting_team', 'batsmen', 'runs', 'balls']
+
+# Partnerships table filtered by match, batting team and season.
+# Filters are applied on the precomputed table, nothing is recomputed per request.
+def filter_partnerships(snap, match_id=None, team=None, season=None):
+    data = snap.partnerships
+    team = snap.teams.resolve(team) or team
+    
+    if match_id is not None:
+        data = data[data['match_id'] == match_id]
+    if team is not None:
+        data = data[data['batting_team'] == team]
+    if season is not None:
+        data = data[data['season'] == season]
+    
+    return data
+
+# Partnerships as a lazily converted stream of records, for large results.
+# The cursor is a row position in the partnerships table: the page starts at the first
+# matching row at or after it. Returns the records and the cursor of the next page
+# (None on the last page).
+def stream_partnerships(match_id=None, team=None, season=None, cursor=0, limit=None, batch_size=1000):
+    snap = dataset.current()
+    data = filter_partnerships(snap, match_id, team, season)
+    data = data[data.index >= cursor]
+    
+    next_cursor = None
+    if limit is not None:
+        if len(data) > limit:
+            next_cursor = int(data.index[limit])
+        data = data.iloc[:limit]
+    
+    def records():
+        for start in range(0, len(data), batch_size):
+            yield from data.iloc[start:start + batch_size][PARTNERSHIP_COLUMNS].to_dict(orient='records')
+    
+    return records(), next_cursor
 
 def batsman_vs_bowler(batsman, bowler):
-    # Filter deliveries where the batsman faced the bowler
-    filtered_data = df_del[
-        (df_del['batter'] == batsman) & 
-        (df_del['bowler'] == bowler)
-    ]
+    snap = dataset.current()
+    batsman = snap.players.resolve(batsman) or batsman
+    bowler = snap.players.resolve(bowler) or bowler
     
-    if filtered_data.empty:
+    # Totals of the deliveries where the batsman faced the bowler
+    pair = snap.head_to_head_matrix.pair(batsman, bowler)
+    if pair is None:
         return {"error": "No data found for this combination"}
-    
+    return head_to_head_stats(batsman, bowler, pair, pair_dismissal_types(pair))
+
+# Dismissal kinds of a pair's counts, most frequent first
+def pair_dismissal_types(pair):
+    kinds = [(kind, count) for kind, count in pair.items() if kind not in headtohead.MEASURES and count > 0]
+    return dict(sorted(kinds, key=lambda item: -item[1]))
+
+def pair_records(pairs):
+    return [(name, dict(zip(pairs.columns, counts))) for name, counts in zip(pairs.index, pairs.to_numpy().tolist())]
+
+# Head to head of a batsman against every bowler faced, or of a bowler against every batsman
+# bowled to: one row or column of the head to head matrix, limited to pairs with at least
+# min_balls balls, sorted by sort (highest first, ties by name) and cut to the top k
+HEAD_TO_HEAD_SORTS = ['runs', 'balls', 'dismissals', 'strike_rate', 'average']
+
+def head_to_head_list(pairs, min_balls, sort, k):
+    if sort not in HEAD_TO_HEAD_SORTS:
+        return None, {"error": f"Invalid sort. Use {', '.join(HEAD_TO_HEAD_SORTS)}"}
+    if (k is not None and k < 1) or (min_balls is not None and min_balls < 0):
+        return None, {"error": "Invalid k or min_balls: k must be at least 1 and min_balls at least 0"}
+    pairs = pairs[pairs['balls'] >= (min_balls or 0)]
+    runs, balls, dismissals = pairs['runs'], pairs['balls'], pairs['dismissals']
+    keys = {
+        'runs': runs,
+        'balls': balls,
+        'dismissals': dismissals,
+        'strike_rate': (runs / balls.where(balls > 0) * 100).fillna(0),
+        'average': (runs / dismissals.where(dismissals > 0)).fillna(runs),
+    }
+    order = keys[sort].sort_values(ascending=False, kind='stable').index
+    return pairs.loc[order[:k] if k is not None else order], None
+
+def batsman_vs_bowlers(batsman, min_balls=None, sort='runs', k=None):
+    snap = dataset.current()
+    batsman = snap.players.resolve(batsman) or batsman
+    pairs = snap.head_to_head_matrix.row(batsman)
+    if pairs.empty:
+        return {"error": "No data found for this batsman"}
+    pairs, error = head_to_head_list(pairs, min_balls, sort, k)
+    if error:
+        return error
+    return {
+        "batsman": batsman,
+        "bowlers": [head_to_head_stats(batsman, bowler, pair, pair_dismissal_types(pair)) for bowler, pair in pair_records(pairs)],
+    }
+
+def bowler_vs_batsmen(bowler, min_balls=None, sort='dismissals', k=None):
+    snap = dataset.current()
+    bowler = snap.players.resolve(bowler) or bowler
+    pairs = snap.head_to_head_matrix.column(bowler)
+    if pairs.empty:
+        return {"error": "No data found for this bowler"}
+    pairs, error = head_to_head_list(pairs, min_balls, sort, k)
+    if error:
+        return error
+    return {
+        "bowler": bowler,
+        "batsmen": [head_to_head_stats(batsman, bowler, pair, pair_dismissal_types(pair)) for batsman, pair in pair_records(pairs)],
+    }
+
+def head_to_head_stats(batsman, bowler, pair, dismissal_types):
     # Calculate stats
-    total_runs = filtered_data['batsman_runs'].sum()
-    total_balls = len(filtered_data)
-    dismissals = filtered_data['is_wicket'].sum()
+    total_runs = pair['runs']
+    total_balls = int(pair['balls'])
+    dismissals = pair['dismissals']
     strike_rate = (total_runs / total_balls) * 100 if total_balls > 0 else 0
     average = total_runs / dismissals if dismissals > 0 else total_runs
     
-    # Dismissal types
-    dismissal_types = filtered_data[filtered_data['is_wicket'] == 1]['dismissal_kind'].value_counts().to_dict()
-    
     return {
         "batsman": batsman,
         "bowler": bowler,
@@ -395,54 +779,93 @@ def batsman_vs_bowler(batsman, bowler):
         "average": float(round(average, 2)),
         "dismissal_types": dismissal_types}
 
+# Form over a window of matches: those dated from start to end (YYYY-MM-DD, both inclusive,
+# either may be left out), and/or the last last_n of them. Answered from the prefix sums of the
+# form tables, so the cost does not depend on the window's length.
+def parse_window(start, end, last_n):
+    try:
+        start = np.datetime64(pd.Timestamp(start), 'ns') if start else None
+        end = np.datetime64(pd.Timestamp(end), 'ns') if end else None
+    except ValueError:
+        return None, {"error": "Invalid date. Use YYYY-MM-DD"}
+    if last_n is not None and last_n < 1:
+        return None, {"error": "last_n must be a positive number"}
+    return (start, end, last_n), None
+
+def window_info(first_date, last_date, matches):
+    return {"from": str(first_date)[:10], "to": str(last_date)[:10], "matches": matches}
+
+def player_form(player_name, start=None, end=None, last_n=None):
+    snap = dataset.current()
+    window, error = parse_window(start, end, last_n)
+    if error:
+        return error
+    player_name = snap.players.resolve(player_name) or player_name
+    
+    found = snap.player_form.window(player_name, *window)
+    if found is None:
+        return {"error": "No data available for this player in the window"}
+    totals, first_date, last_date, matches = found
+    batting = totals[['runs', 'fours', 'sixes']].copy()
+    batting['balls'] = totals['balls_faced']
+    bowling = totals[['wickets', 'runs_conceded']].copy()
+    bowling['balls'] = totals['balls_bowled']
+    return {**performance_stats(player_name, batting, bowling), "window": window_info(first_date, last_date, matches)}
+
+def batsman_vs_bowler_form(batsman, bowler, start=None, end=None, last_n=None):
+    snap = dataset.current()
+    window, error = parse_window(start, end, last_n)
+    if error:
+        return error
+    batsman = snap.players.resolve(batsman) or batsman
+    bowler = snap.players.resolve(bowler) or bowler
+    
+    found = snap.pair_form.window((batsman, bowler), *window)
+    if found is None:
+        return {"error": "No data found for this combination in the window"}
+    totals, first_date, last_date, matches = found
+    dismissal_types = dismissal_counts(totals.drop(form.PAIR_MEASURES).loc[lambda counts: counts > 0])
+    return {**head_to_head_stats(batsman, bowler, totals, dismissal_types), "window": window_info(first_date, last_date, matches)}
+
 def player_dismissal_analysis(player_name):
-    # Filter deliveries where the player was dismissed
-    dismissals = df_del[
-        (df_del['player_dismissed'] == player_name) & 
-        (df_del['is_wicket'] == 1)
-    ]
+    snap = dataset.current()
+    player_name = snap.players.resolve(player_name) or player_name
     
-    if dismissals.empty:
+    # Dismissal kinds of the player
+    if player_name not in snap.player_dismissals.index.get_level_values(0):
         return {"error": "No dismissals found for this player"}
     
-    # Count dismissal types
-    dismissal_types = dismissals['dismissal_kind'].value_counts().to_dict()
+    dismissals = snap.player_dismissals.loc[player_name]
     
     return {
         "player": player_name,
-        "total_dismissals": len(dismissals),
-        "dismissal_types": dismissal_types
+        "total_dismissals": int(dismissals.sum()),
+        "dismissal_types": dismissal_counts(dismissals)
     }
 
 def player_performance_by_phase(player_name, phase):
-    # Define phase overs
+    snap = dataset.current()
+    player_name = snap.players.resolve(player_name) or player_name
+    
+    # Phases by over (see over_phase):
     
     # Overs 0-5 (Powerplay)
     # Overs 6-14 (Middle)
     # Overs 15-19 (Death)
     
-    if phase == "powerplay":
-        overs = range(0, 5)
-    elif phase == "middle":
-        overs = range(6, 14)
-    elif phase == "death":
-        overs = range(15, 19)
-    else:
+    if phase not in PHASES:
         return {"error": "Invalid phase. Use 'powerplay', 'middle', or 'death'"}
     
-    # Filter deliveries for the player in the specified phase
-    phase_data = df_del[
-        (df_del['batter'] == player_name) & 
-        (df_del['over'].isin(overs))
-    ]
+    # Batting totals of the player in the specified phase
+    phase_data = snap.player_totals(player_name, 'batting', phase=phase)
     
-    if phase_data.empty:
+    if phase_data is None:
         return {"error": "No data found for this player in the specified phase"}
     
     # Calculate stats
-    total_runs = phase_data['batsman_runs'].sum()
-    total_balls = len(phase_data)
-    boundaries = len(phase_data[phase_data['batsman_runs'].isin([4, 6])])
+    total_runs = phase_data['runs']
+    total_balls = int(phase_data['balls'])
+    boundaries = int(phase_data['fours'] + phase_data['sixes'])
     strike_rate = (total_runs / total_balls) * 100 if total_balls > 0 else 0
     
     return {
@@ -454,90 +877,120 @@ def player_performance_by_phase(player_name, phase):
         "strike_rate": float(round(strike_rate, 2))
     }
 
-def team_phase_stats(team, phase, role="batting"):
-    # Define phase overs
-    if phase == "powerplay":
-        overs = range(0, 5)
-    elif phase == "middle":
-        overs = range(6, 14)
-    elif phase == "death":
-        overs = range(15, 19)
-    else:
-        return {"error": "Invalid phase. Use 'powerplay', 'middle', or 'death'"}
-    
-    # Filter data based on role (batting or bowling)
+# Top k players by a batting or bowling metric, over all seasons or one, all phases or one,
+# among players with at least min_balls balls faced or bowled (by default
+# leaderboard.DEFAULT_MIN_BALLS for rates, none for counts; see leaderboard.py)
+def leaderboard_top(metric, season=None, phase=None, min_balls=None, k=10):
+    snap = dataset.current()
+    if metric not in leaderboard.METRICS:
+        return {"error": f"Invalid metric. Use {', '.join(leaderboard.METRICS)}"}
+    if phase is not None and phase not in PHASES:
+        return {"error": f"Invalid phase. Use {', '.join(PHASES)}"}
+    if k < 1 or (min_balls is not None and min_balls < 0):
+        return {"error": "k must be positive and min_balls not negative"}
+    if min_balls is None:
+        min_balls = leaderboard.DEFAULT_MIN_BALLS.get(metric, 0)
+    return {
+        "metric": metric,
+        "role": leaderboard.METRICS[metric][0],
+        "season": season,
+        "phase": phase,
+        "min_balls": min_balls,
+        "leaders": snap.leaderboards.top(metric, season, phase, min_balls, k)
+    }
+
+# Stats of one (team, phase, role) cell of the team phase matrix
+def team_phase_record(team, phase, role, totals):
     if role == "batting":
-        filtered_data = df_del[
-            (df_del['batting_team'] == team) & 
-            (df_del['over'].isin(overs))
-        ]
-        total_runs = filtered_data['total_runs'].sum()
-        total_balls = len(filtered_data)
-        boundaries = len(filtered_data[filtered_data['batsman_runs'].isin([4, 6])])
-        strike_rate = (total_runs / total_balls) * 100 if total_balls > 0 else 0
-        wickets_lost = filtered_data['is_wicket'].sum()
-        
+        strike_rate = (totals['runs'] / totals['balls']) * 100 if totals['balls'] > 0 else 0
         return {
             "team": team,
             "phase": phase,
             "role": role,
-            "total_runs": int(total_runs),
-            "total_balls": total_balls,
-            "boundaries": boundaries,
+            "total_runs": int(totals['runs']),
+            "total_balls": int(totals['balls']),
+            "boundaries": int(totals['boundaries']),
             "strike_rate": float(round(strike_rate, 2)),
-            "wickets_lost": int(wickets_lost)
+            "wickets_lost": int(totals['wickets'])
         }
     
-    elif role == "bowling":
-        filtered_data = df_del[
-            (df_del['bowling_team'] == team) & 
-            (df_del['over'].isin(overs))
-        ]
-        total_runs_conceded = filtered_data['total_runs'].sum()
-        total_balls = len(filtered_data)
-        wickets_taken = filtered_data['is_wicket'].sum()
-        economy_rate = (total_runs_conceded / total_balls) * 6 if total_balls > 0 else 0
-        
-        return {
-            "team": team,
-            "phase": phase,
-            "role": role,
-            "total_runs_conceded": int(total_runs_conceded),
-            "total_balls": total_balls,
-            "wickets_taken": int(wickets_taken),
-            "economy_rate": float(round(economy_rate, 2))
-        }
+    economy_rate = (totals['runs'] / totals['balls']) * 6 if totals['balls'] > 0 else 0
+    return {
+        "team": team,
+        "phase": phase,
+        "role": role,
+        "total_runs_conceded": int(totals['runs']),
+        "total_balls": int(totals['balls']),
+        "wickets_taken": int(totals['wickets']),
+        "economy_rate": float(round(economy_rate, 2))
+    }
+
+def team_phase_stats(team, phase, role="batting"):
+    snap = dataset.current()
+    team = snap.teams.resolve(team) or team
     
-    else:
+    # Phases by over (see over_phase): Powerplay 0-5, Middle 6-14, Death 15-19
+    if phase not in PHASES:
+        return {"error": "Invalid phase. Use 'powerplay', 'middle', or 'death'"}
+    
+    if role not in ("batting", "bowling"):
         return {"error": "Invalid role. Use 'batting' or 'bowling'"}
+    
+    # Sum the team's cell over all seasons
+    try:
+        totals = snap.team_phase.loc[(team, role, slice(None), phase), :].sum()
+    except KeyError:
+        totals = pd.Series(0, index=snap.team_phase.columns)
+    
+    return team_phase_record(team, phase, role, totals)
+
+# Every team x phase x role, over all seasons or per season (or for one season)
+def team_phase_matrix(season=None, by_season=False):
+    snap = dataset.current()
+    data = snap.team_phase
+    if season is not None:
+        data = data[data.index.get_level_values('season') == season]
+        if data.empty:
+            return {"error": "No data found for this season"}
+    
+    levels = ['season', 'team', 'role', 'phase'] if by_season else ['team', 'role', 'phase']
+    data = data.groupby(level=levels, observed=True).sum()
+    
+    matrix = {}
+    for key, totals in data.iterrows():
+        *groups, role, phase = key
+        cell = matrix
+        for group in groups:
+            cell = cell.setdefault(int(group) if isinstance(group, (int, np.integer)) else group, {})
+        record = team_phase_record(groups[-1], phase, role, totals)
+        cell.setdefault(phase, {})[role] = {k: v for k, v in record.items() if k not in ("team", "phase", "role")}
+    
+    return {"season": season, "by_season": by_season, "matrix": matrix}
 
 def team_home_vs_away(team, home_venue):
-    # Filter home matches
-    home_matches = df_match[
-        ((df_match['team1'] == team) | (df_match['team2'] == team)) & 
-        (df_match['venue'] == home_venue)
-    ]
-    home_wins = len(home_matches[home_matches['winner'] == team])
-    
-    # Filter away matches
-    away_matches = df_match[
-        ((df_match['team1'] == team) | (df_match['team2'] == team)) & 
-        (df_match['venue'] != home_venue)
-    ]
-    away_wins = len(away_matches[away_matches['winner'] == team])
+    snap = dataset.current()
+    team = snap.teams.resolve(team) or team
+    home_venue = snap.venues.resolve(home_venue) or home_venue
     
+    # Every spelling of the home ground in the dataset counts as home
+    home_grounds = snap.venues.variants_of(home_venue) or [home_venue]
+    by_venue = aggregate_matches(['venue'], {'team': team}, ['count', 'wins'])
+    home = [record for record in by_venue if record['venue'] in home_grounds]
+    
+    home_matches = sum(record['count'] for record in home)
+    home_wins = sum(record['wins'] for record in home)
     return {
         "team": team,
         "home_venue": home_venue,
-        "home_matches": len(home_matches),
+        "home_matches": home_matches,
         "home_wins": home_wins,
-        "away_matches": len(away_matches),
-        "away_wins": away_wins
+        "away_matches": sum(record['count'] for record in by_venue) - home_matches,
+        "away_wins": sum(record['wins'] for record in by_venue) - home_wins
     }
     
 # Distribution of Match Results
 def match_won_analysis():
-    result_counts = df_match['result'].value_counts().to_dict()
+    result_counts = {record['result']: record['count'] for record in aggregate_matches(['result'])}
     
     # Total matches
     total_matches = sum(result_counts.values())
@@ -574,59 +1027,31 @@ def match_won_analysis():
         }
     }
     
-# Result Margin Distribution
+# Result Margin Distribution: wins by runs in bins of 10 runs (0-9, ..., 140+), wins by wickets per wicket count
 def result_margin_distribution():
-    # Extract margins
-    margin_wins_by_runs = df_match[df_match['result'] == 'runs']['result_margin'].dropna().astype(int)
-    margin_wins_by_wickets = df_match[df_match['result'] == 'wickets']['result_margin'].dropna().astype(int)
-
-    # Define bins for runs (0-10, 10-20, ..., 90-100, 100+)
-    run_bins = list(range(0, 141, 10))  # 0-10, 10-20, ..., 130-140
-    run_bins.append(float('inf'))  # 140+
-
-    # Group runs into bins
-    run_labels = [f"{run_bins[i]}-{run_bins[i+1] - 1}" if run_bins[i+1] != float('inf') else "140+" for i in range(len(run_bins)-1)]
-    run_distribution = pd.cut(margin_wins_by_runs, bins=run_bins, labels=run_labels, right=False).value_counts().sort_index()
-
-    # Count wickets directly using value_counts()
-    wicket_distribution = margin_wins_by_wickets.value_counts().sort_index()
+    return aggregate_matches(metrics=['margin_histogram'])[0]['margin_histogram']
 
-    return {
-        "win_by_runs": run_distribution.to_dict(),
-        "win_by_wickets": wicket_distribution.to_dict()
-    }
 # Matches Won by Toss Decision
 def matches_won_by_toss_decision():
     """
     Analyzes the relationship between toss decisions and match outcomes.
 
     Returns:
-        pd.DataFrame: A DataFrame containing:
+        list of dict: One record per toss decision:
             - toss_decision (str): The decision made after winning the toss ("bat" or "field").
             - wins (int): Number of matches won by teams that won the toss and chose this decision.
             - total_matches (int): Total matches where teams made this toss decision.
             - percentage (float): Win percentage for each toss decision.
 
-    The function filters matches where the toss-winning team also won the match, 
-    then calculates the win count and percentage for each toss decision.
+    Decisions after which the toss winner never won the match are left out.
     """
-    
-    # Filter matches where the toss winner is also the match winner
-    toss_winner_wins = df_match[df_match['toss_winner'] == df_match['winner']]
-
-    # Groups matches by toss_decision (bat or field).
-    # Counts how many times a team won the match after winning the toss.
-    toss_decision_wins = toss_winner_wins.groupby('toss_decision').size().reset_index(name='wins')
-    
-    # Calculate total matches for each toss decision
-    total_matches_by_toss_decision = df_match['toss_decision'].value_counts().reset_index()
-    total_matches_by_toss_decision.columns = ['toss_decision', 'total_matches']
-    
-    # Merge wins and total matches
-    toss_decision_stats = pd.merge(toss_decision_wins, total_matches_by_toss_decision, on='toss_decision')
-    
-    # Calculate win percentage
-    toss_decision_stats['percentage'] = (toss_decision_stats['wins'] / toss_decision_stats['total_matches']) * 100
-    toss_decision_stats['percentage'] = toss_decision_stats['percentage'].round(2)
-    
-    return toss_decision_stats.to_dict(orient='records')
\ No newline at end of file
+    records = []
+    for record in aggregate_matches(['toss_decision'], metrics=['toss_wins', 'count']):
+        if record['toss_wins'] > 0:
+            records.append({
+                "toss_decision": record['toss_decision'],
+                "wins": record['toss_wins'],
+                "total_matches": record['count'],
+                "percentage": round(record['toss_wins'] / record['count'] * 100, 2),
+            })
+    return records
@@ -1,8 +1,152 @@
-from flask import Flask, jsonify, request
+import hashlib
+import hmac
+import json
+import multiprocessing
+import os
+import threading
+import time
+
+from flask import Flask, Response, g, jsonify, request, stream_with_context
 import api
+import cache
+import dataset
+import metrics
+import rollup
 
 app = Flask(__name__)
 
+# Load the dataset before serving, so the first request does not pay for it. Processes
+# started with multiprocessing (the asgi.py pool workers) attach the parent's snapshot instead.
+if multiprocessing.parent_process() is None:
+    dataset.load()
+
+# Latency, rows scanned and memory of every api entry point (see metrics.py); IPL_METRICS=0 turns it off
+if os.environ.get('IPL_METRICS', '1') != '0':
+    metrics.instrument_module(api, skip=api.HELPERS)
+
+# Response cache: GET responses keyed by route, normalized query args and dataset version.
+# Size is bounded (LRU); IPL_CACHE_TTL (seconds) optionally expires entries.
+ttl = os.environ.get('IPL_CACHE_TTL')
+response_cache = cache.LRUCache(maxsize=int(os.environ.get('IPL_CACHE_SIZE', 1024)), ttl=float(ttl) if ttl else None)
+NOT_CACHED = {'get_cache_stats', 'get_reload_status', 'get_metrics', 'get_all_partnerships', 'static'}
+
+# Route latency, and a sampling profile of requests sent with profile=1 or an X-Profile: 1 header:
+# the response is then replaced by the profile (admin token required when IPL_ADMIN_TOKEN is set)
+@app.before_request
+def start_instrumentation():
+    g.start_time = time.perf_counter()
+    if request.args.get('profile') == '1' or request.headers.get('X-Profile') == '1':
+        denied = check_admin_token(required=False)
+        if denied:
+            return denied
+        g.profiler = metrics.SamplingProfiler(threading.get_ident()).start()
+
+@app.after_request
+def attach_profile(response):
+    profiler = g.pop('profiler', None)
+    if profiler is None:
+        return response
+    return jsonify({"status": response.status_code, "profile": profiler.stop()})
+
+@app.teardown_request
+def record_latency(exc):
+    profiler = g.pop('profiler', None)
+    if profiler is not None:
+        profiler.stop()
+    if 'start_time' in g:
+        metrics.observe('ipl_request_duration_seconds', (('endpoint', request.endpoint or 'unknown'),), time.perf_counter() - g.start_time)
+
+# Every request reads from the snapshot published when it started (see dataset.pin). Admin
+# routes that publish snapshots are not pinned: they build on the latest one.
+NOT_PINNED = {'post_ingest', 'post_reload', 'get_reload_status'}
+
+@app.before_request
+def pin_snapshot():
+    if request.endpoint in NOT_PINNED:
+        return
+    g.snapshot_token = dataset.pin()
+
+@app.teardown_request
+def unpin_snapshot(exc):
+    token = g.pop('snapshot_token', None)
+    if token is not None:
+        dataset.unpin(token)
+
+def cache_key():
+    return (request.path, tuple(sorted(request.args.items(multi=True))), dataset.current().version)
+
+# Strong ETag: a hash of the exact response body within a dataset version
+def make_etag(body):
+    return hashlib.sha1(dataset.current().version.encode() + body).hexdigest()
+
+@app.before_request
+def serve_cached_response():
+    if request.method != 'GET' or request.endpoint in NOT_CACHED or g.get('profiler'):
+        return None
+    entry = response_cache.get(cache_key())
+    labels = (('endpoint', request.endpoint or 'unknown'),)
+    if entry is None:
+        metrics.increment('ipl_response_cache_misses_total', labels)
+        return None
+    metrics.increment('ipl_response_cache_hits_total', labels)
+    g.cached = True
+    body, status, mimetype, etag = entry
+    return conditional(Response(body, status=status, mimetype=mimetype), etag)
+
+@app.after_request
+def store_response(response):
+    if (request.method != 'GET' or request.endpoint in NOT_CACHED or g.get('cached') or g.get('profiler')
+            or response.status_code != 200 or response.is_streamed):
+        return response
+    body = response.get_data()
+    etag = make_etag(body)
+    response_cache.set(cache_key(), (body, response.status_code, response.mimetype, etag))
+    return conditional(response, etag)
+
+# Clients may keep a response but must revalidate it (If-None-Match), as an ingest or reload can
+# change it at any time; an unchanged one is then a 304 without a body
+def conditional(response, etag):
+    response.set_etag(etag)
+    response.cache_control.no_cache = True
+    return response.make_conditional(request)
+
+# Integer query parameter that must be at least minimum: (value, None), or (None, error response)
+# when it is not an integer or too small. Absent parameters give default.
+def bounded_int_arg(name, minimum, default=None):
+    raw = request.args.get(name)
+    if raw is None or raw == '':
+        return default, None
+    try:
+        value = int(raw)
+    except ValueError:
+        value = None
+    if value is None or value < minimum:
+        return None, (jsonify({"error": f"{name} must be an integer of at least {minimum}"}), 400)
+    return value, None
+
+# Streamed response for large results, so memory stays flat however many records there are:
+# newline-delimited JSON (format=ndjson or Accept: application/x-ndjson) or a chunked JSON array.
+# The cursor of the next page, if any, is sent in the X-Next-Cursor header.
+def stream_records(records, next_cursor=None):
+    ndjson = (request.args.get('format') == 'ndjson'
+              or request.accept_mimetypes.best == 'application/x-ndjson')
+    
+    def generate():
+        if ndjson:
+            for record in records:
+                yield json.dumps(record, sort_keys=True) + '\n'
+            return
+        yield '['
+        for i, record in enumerate(records):
+            yield (',' if i else '') + json.dumps(record, sort_keys=True)
+        yield ']\n'
+    
+    response = Response(stream_with_context(generate()),
+                        mimetype='application/x-ndjson' if ndjson else 'application/json')
+    if next_cursor is not None:
+        response.headers['X-Next-Cursor'] = str(next_cursor)
+    return response
+
 @app.route('/', methods=['GET'])
 def home():
     return jsonify({"message": "Welcome to IPL Analytics API"})
@@ -27,6 +171,19 @@ def get_matches_hosted_by_city():
 def get_avg_target_by_season():
     return jsonify(api.avg_target_by_season())
 
+# Match aggregates: group_by and metrics are comma-separated lists, filters are given per
+# dimension (repeat a parameter to allow several values), e.g.
+# /matches/aggregate?group_by=season,team&metrics=count,wins&venue=Eden Gardens&result=runs
+@app.route('/matches/aggregate', methods=['GET'])
+def get_matches_aggregate():
+    group_by = [dimension for dimension in request.args.get('group_by', '').split(',') if dimension]
+    metrics = [metric for metric in request.args.get('metrics', 'count').split(',') if metric]
+    filters = {dimension: request.args.getlist(dimension) for dimension in rollup.DIMENSIONS if dimension in request.args}
+    result = api.aggregate_matches(group_by, filters, metrics)
+    if isinstance(result, dict) and 'error' in result:
+        return jsonify(result), 400
+    return jsonify(result)
+
 # Get player performance statistics
 @app.route('/player/performance', methods=['GET'])
 def get_player_performance():
@@ -44,6 +201,70 @@ def get_player_vs_team():
         return jsonify({"error": "Player name and team name are required"}), 400
     return jsonify(api.player_vs_team(player_name, team_name))
 
+# Player form over a window: matches dated from/to (YYYY-MM-DD) and/or the last last_n of them
+@app.route('/player/form', methods=['GET'])
+def get_player_form():
+    player_name = request.args.get('player_name')
+    if not player_name:
+        return jsonify({"error": "Player name is required"}), 400
+    return form_response(api.player_form, player_name)
+
+# A form query over the window of the from, to and last_n arguments; a malformed window is a 400
+def form_response(function, *players):
+    last_n, error = bounded_int_arg('last_n', 1)
+    if error:
+        return error
+    result = function(*players, request.args.get('from'), request.args.get('to'), last_n)
+    if "error" in result and result["error"].startswith("Invalid"):
+        return jsonify(result), 400
+    return jsonify(result)
+
+# Batsman vs bowler totals and dismissal kinds
+@app.route('/player/batsman_vs_bowler', methods=['GET'])
+def get_batsman_vs_bowler():
+    batsman = request.args.get('batsman')
+    bowler = request.args.get('bowler')
+    if not batsman or not bowler:
+        return jsonify({"error": "Batsman and bowler are required"}), 400
+    return jsonify(api.batsman_vs_bowler(batsman, bowler))
+
+# A batsman against every bowler faced (or a bowler against every batsman), pairs with at least
+# min_balls balls, sorted by runs, balls, dismissals, strike_rate or average, top k
+def head_to_head_list_response(function, player, default_sort):
+    min_balls, error = bounded_int_arg('min_balls', 0)
+    if error:
+        return error
+    k, error = bounded_int_arg('k', 1)
+    if error:
+        return error
+    result = function(player, min_balls, request.args.get('sort', default_sort), k)
+    if "error" in result and result["error"].startswith("Invalid"):
+        return jsonify(result), 400
+    return jsonify(result)
+
+@app.route('/player/batsman_vs_bowler/bowlers', methods=['GET'])
+def get_batsman_vs_bowlers():
+    batsman = request.args.get('batsman')
+    if not batsman:
+        return jsonify({"error": "Batsman is required"}), 400
+    return head_to_head_list_response(api.batsman_vs_bowlers, batsman, 'runs')
+
+@app.route('/player/batsman_vs_bowler/batsmen', methods=['GET'])
+def get_bowler_vs_batsmen():
+    bowler = request.args.get('bowler')
+    if not bowler:
+        return jsonify({"error": "Bowler is required"}), 400
+    return head_to_head_list_response(api.bowler_vs_batsmen, bowler, 'dismissals')
+
+# Batsman vs bowler over a window, as /player/form
+@app.route('/player/batsman_vs_bowler/form', methods=['GET'])
+def get_batsman_vs_bowler_form():
+    batsman = request.args.get('batsman')
+    bowler = request.args.get('bowler')
+    if not batsman or not bowler:
+        return jsonify({"error": "Batsman and bowler are required"}), 400
+    return form_response(api.batsman_vs_bowler_form, batsman, bowler)
+
 # Get first innings match details including phase-wise analysis
 @app.route('/match/innings/first', methods=['GET'])
 def get_match_innings_1():
@@ -81,11 +302,229 @@ def get_match_innings_5():
         return jsonify({"error": "Match ID is required"}), 400
     return jsonify(api.match_innings_5(match_id))
 
+# Get all inning-wise analyses of a match in one call; sections is a comma-separated subset
+@app.route('/match/report', methods=['GET'])
+def get_match_report():
+    match_id = request.args.get('match_id', type=int)
+    if match_id is None:
+        return jsonify({"error": "Match ID is required"}), 400
+    sections = request.args.get('sections')
+    sections = [section.strip() for section in sections.split(',')] if sections else None
+    result = api.match_report(match_id, sections)
+    if "error" in result and result["error"].startswith("Invalid section"):
+        return jsonify(result), 400
+    return jsonify(result)
+
+# Over by over charts of a match: worm (score and wickets), Manhattan (runs and wickets per over)
+# and run rates (current and required), from the delivery state table
+def match_progress_response(chart):
+    match_id = request.args.get('match_id', type=int)
+    if match_id is None:
+        return jsonify({"error": "Match ID is required"}), 400
+    return jsonify(api.match_progress(match_id, chart))
+
+@app.route('/match/worm', methods=['GET'])
+def get_match_worm():
+    return match_progress_response('worm')
+
+@app.route('/match/manhattan', methods=['GET'])
+def get_match_manhattan():
+    return match_progress_response('manhattan')
+
+@app.route('/match/run_rate', methods=['GET'])
+def get_match_run_rate():
+    return match_progress_response('run_rate')
+
+# Win probability of the batting side after every delivery of a match (see winprob.py)
+@app.route('/match/win_probability', methods=['GET'])
+def get_match_win_probability():
+    match_id = request.args.get('match_id', type=int)
+    if match_id is None:
+        return jsonify({"error": "Match ID is required"}), 400
+    return jsonify(api.match_win_probability(match_id))
+
+# Get partnerships of all matches, optionally filtered by match, team or season.
+# Streamed (JSON array or NDJSON) and paged with limit and cursor (see X-Next-Cursor).
 @app.route('/all partnerships')
-def x():
-    return jsonify(api.get_all_partnerships())
+def get_all_partnerships():
+    match_id, error = bounded_int_arg('match_id', 0)
+    if error:
+        return error
+    season, error = bounded_int_arg('season', 0)
+    if error:
+        return error
+    team = request.args.get('team')
+    limit, error = bounded_int_arg('limit', 1)
+    if error:
+        return error
+    cursor, error = bounded_int_arg('cursor', 0, default=0)
+    if error:
+        return error
+    records, next_cursor = api.stream_partnerships(match_id, team, season, cursor, limit)
+    return stream_records(records, next_cursor)
 
     
 
+# Many lookups in one request. Body: {"player_performance": [names], "player_vs_team":
+# [{"player_name": ..., "team_name": ...}], "match_innings_1" ... "match_innings_5" and
+# "match_report": [match IDs]}. Each query answers all of its keys in one pass; results are
+# keyed by the keys as given (pairs as "player vs team"), one entry per distinct key, and a bad
+# key only fails its own entry.
+BATCH_LIMIT = int(os.environ.get('IPL_BATCH_LIMIT', 1000))
+MATCH_QUERIES = {f'match_innings_{n}': n for n in range(1, 6)}
+
+def batch_query(query, keys):
+    if not isinstance(keys, list):
+        return {"error": "A list of keys is required"}
+    results = {}
+    if query == 'player_performance':
+        names = [key for key in keys if isinstance(key, str) and key]
+        results.update({str(key): {"error": "Player name is required"} for key in keys if key not in names})
+        results.update(api.player_performance_bulk(names))
+        return results
+    if query == 'player_vs_team':
+        pairs = []
+        for key in keys:
+            if isinstance(key, dict) and key.get('player_name') and key.get('team_name'):
+                pairs.append((key['player_name'], key['team_name']))
+            else:
+                results[json.dumps(key)] = {"error": "Player name and team name are required"}
+        results.update({f"{player} vs {team}": result for (player, team), result in api.player_vs_team_bulk(pairs).items()})
+        return results
+    if query in MATCH_QUERIES or query == 'match_report':
+        match_ids = []
+        for key in keys:
+            try:
+                match_ids.append(int(key))
+            except (TypeError, ValueError):
+                results[str(key)] = {"error": "Invalid match ID"}
+        match_ids = list(dict.fromkeys(match_ids))  # a repeated ID is answered once
+        found = api.match_innings_bulk(match_ids, MATCH_QUERIES[query]) if query in MATCH_QUERIES else api.match_report_bulk(match_ids)
+        results.update({str(match_id): result for match_id, result in found.items()})
+        return results
+    return {"error": f"Unknown query. Use player_performance, player_vs_team, {', '.join(MATCH_QUERIES)} or match_report"}
+
+@app.route('/batch', methods=['POST'])
+def post_batch():
+    body = request.get_json(silent=True)
+    if not isinstance(body, dict) or not body:
+        return jsonify({"error": "JSON body with lists of keys per query is required"}), 400
+    if sum(len(keys) for keys in body.values() if isinstance(keys, list)) > BATCH_LIMIT:
+        return jsonify({"error": f"At most {BATCH_LIMIT} keys per batch"}), 400
+    return jsonify({query: batch_query(query, keys) for query, keys in body.items()})
+
+# Batting and bowling stats of every team in every phase; by_season=true splits them per season
+@app.route('/teams/phase_matrix', methods=['GET'])
+def get_team_phase_matrix():
+    season, error = bounded_int_arg('season', 0)
+    if error:
+        return error
+    by_season = request.args.get('by_season', 'false').lower() in ('1', 'true', 'yes')
+    return jsonify(api.team_phase_matrix(season, by_season))
+
+# /leaderboard?metric=strike_rate&season=2016&phase=death&min_balls=60&k=10
+@app.route('/leaderboard', methods=['GET'])
+def get_leaderboard():
+    metric = request.args.get('metric')
+    if not metric:
+        return jsonify({"error": "Metric is required"}), 400
+    season, error = bounded_int_arg('season', 0)
+    if error:
+        return error
+    min_balls, error = bounded_int_arg('min_balls', 0)
+    if error:
+        return error
+    k, error = bounded_int_arg('k', 1, default=10)
+    if error:
+        return error
+    result = api.leaderboard_top(metric, season, request.args.get('phase'), min_balls, k)
+    if "error" in result:
+        return jsonify(result), 400
+    return jsonify(result)
+
+# Resolve a player, team, venue or city name (aliases, spelling variants, typos) to its canonical form
+@app.route('/resolve', methods=['GET'])
+def get_resolved_name():
+    kind = request.args.get('kind')
+    name = request.args.get('name')
+    if not kind or not name:
+        return jsonify({"error": "Kind and name are required"}), 400
+    return jsonify(api.resolve_name(kind, name))
+
+# Autocomplete: /search?q=mccul[&kind=player][&k=10] suggests matching names, best first
+@app.route('/search', methods=['GET'])
+def get_search():
+    query = request.args.get('q')
+    if not query:
+        return jsonify({"error": "Query is required"}), 400
+    k, error = bounded_int_arg('k', 1, default=10)
+    if error:
+        return error
+    result = api.search_names(query, request.args.get('kind'), k)
+    if "error" in result:
+        return jsonify(result), 400
+    return jsonify(result)
+
+# Latency quantiles, rows scanned, memory and cache counters in Prometheus text format
+@app.route('/metrics', methods=['GET'])
+def get_metrics():
+    stats = response_cache.stats()
+    gauges = {
+        ('ipl_response_cache_entries', ()): stats['size'],
+        ('ipl_response_cache_evictions_total', ()): stats['evictions'],
+    }
+    return Response(metrics.render(gauges), mimetype='text/plain; version=0.0.4')
+
+# Response cache hit/miss counters and size
+@app.route('/cache/stats', methods=['GET'])
+def get_cache_stats():
+    return jsonify({**response_cache.stats(), "data_version": dataset.current().version})
+
+# Admin endpoints require an X-Admin-Token header matching IPL_ADMIN_TOKEN, and are disabled
+# when it is not set (they change the live data). Profiling (required=False) is open without it.
+def check_admin_token(required=True):
+    token = os.environ.get('IPL_ADMIN_TOKEN')
+    if not token:
+        return (jsonify({"error": "Admin endpoints are disabled: IPL_ADMIN_TOKEN is not set"}), 403) if required else None
+    if not hmac.compare_digest(request.headers.get('X-Admin-Token', '').encode(), token.encode()):
+        return jsonify({"error": "Invalid admin token"}), 403
+    return None
+
+# Append new matches without a restart: body {"deliveries": [...], "matches": [...]} with rows
+# in the cleaned CSV layout.
+@app.route('/admin/ingest', methods=['POST'])
+def post_ingest():
+    denied = check_admin_token()
+    if denied:
+        return denied
+    body = request.get_json(silent=True)
+    if not isinstance(body, dict):
+        return jsonify({"error": "JSON body with deliveries and matches is required"}), 400
+    result = dataset.ingest(body.get('deliveries') or [], body.get('matches') or [])
+    if "error" in result:
+        return jsonify(result), 400
+    response_cache.clear()
+    return jsonify(result)
+
+# Rebuild the dataset from the CSV files on a background thread and swap it in when ready;
+# force=true rebuilds even if the files are unchanged. Requests keep being served meanwhile.
+@app.route('/admin/reload', methods=['POST'])
+def post_reload():
+    denied = check_admin_token()
+    if denied:
+        return denied
+    force = request.args.get('force', 'false').lower() in ('1', 'true', 'yes')
+    started = dataset.reload_in_background(force)
+    return jsonify({**dataset.reload_status(), "started": started}), 202
+
+@app.route('/admin/status', methods=['GET'])
+def get_reload_status():
+    return jsonify(dataset.reload_status())
+
+# IPL_WATCH_INTERVAL (seconds) reloads the dataset automatically when the CSV files change
+watch_interval = os.environ.get('IPL_WATCH_INTERVAL')
+if watch_interval:
+    dataset.watch(float(watch_interval))
+
 if __name__ == '__main__':
     app.run(debug=True)
@@ -0,0 +1,249 @@
+import asyncio
+import concurrent.futures
+import io
+import json
+import multiprocessing
+import os
+import pickle
+import shutil
+import sys
+import tempfile
+import threading
+from collections import Counter
+
+from werkzeug.exceptions import HTTPException
+
+import app as flask_app
+import dataset
+import metrics
+import shared
+
+# Async serving mode: the Flask app behind an ASGI server, e.g. `uvicorn asgi:app`.
+# Light endpoints run their Flask handler on a thread, straight from the in-memory snapshot.
+# Heavy endpoints (IPL_HEAVY_ENDPOINTS, Flask endpoint names) run in a bounded process pool, so
+# a slow pandas computation never holds up cheap calls:
+#  - each heavy request waits at most IPL_HEAVY_TIMEOUT seconds (504 after that),
+#  - at most IPL_MAX_PENDING heavy computations are queued or running (503 beyond that),
+#  - identical requests arriving while one is being computed share its result.
+# Pool workers answer from the parent's snapshot, whatever was ingested or reloaded into it: the
+# parent writes each snapshot version it sends work for to a store (see shared.py; on /dev/shm
+# when it exists, or IPL_POOL_STORE_DIR), the deliveries and their state table as arrays the
+# workers map read-only and the other aggregates pickled once, and a worker attaches to the
+# version of the request it is given. A store is removed once it is neither the latest version
+# nor used by a computation in progress. Metrics a worker records are sent back with its result
+# and merged into /metrics. Streamed endpoints always run on a thread: a worker would have to
+# collect the whole body before returning it.
+HEAVY_ENDPOINTS = set(os.environ.get('IPL_HEAVY_ENDPOINTS', 'get_match_report,get_team_phase_matrix,post_batch').split(','))
+STREAMED_ENDPOINTS = {'get_all_partnerships'}
+POOL_WORKERS = int(os.environ.get('IPL_POOL_WORKERS', min(4, os.cpu_count() or 1)))
+HEAVY_TIMEOUT = float(os.environ.get('IPL_HEAVY_TIMEOUT', 30))
+MAX_PENDING = int(os.environ.get('IPL_MAX_PENDING', POOL_WORKERS * 4))
+LIGHT_THREADS = int(os.environ.get('IPL_LIGHT_THREADS', 32))
+STORE_DIR = os.environ.get('IPL_POOL_STORE_DIR', '/dev/shm' if os.path.isdir('/dev/shm') else None)
+
+pool = None
+light_pool = concurrent.futures.ThreadPoolExecutor(LIGHT_THREADS, thread_name_prefix='light')
+
+# Heavy computations in progress, by request key
+in_flight = {}
+
+# Snapshot stores by version, and the number of computations in progress using each
+stores = {}
+store_users = Counter()
+store_lock = threading.Lock()
+
+def get_pool():
+    global pool
+    if pool is None:
+        pool = concurrent.futures.ProcessPoolExecutor(POOL_WORKERS, mp_context=multiprocessing.get_context('spawn'))
+    return pool
+
+# Store directory of snap, written on first use (run on a thread, not the event loop)
+def export_snapshot(snap):
+    with store_lock:
+        if snap.version in stores:
+            return stores[snap.version]
+        directory = tempfile.mkdtemp(prefix='ipl-pool-', dir=STORE_DIR)
+        shared.export(snap.df_del, os.path.join(directory, 'deliveries'), {'version': snap.version})
+        shared.export(snap.delivery_state, os.path.join(directory, 'delivery_state'), {'version': snap.version})
+        aggregates = {name: getattr(snap, name) for name in dataset.AGGREGATES if name != 'delivery_state'}
+        with open(os.path.join(directory, 'snapshot.pickle'), 'wb') as f:
+            pickle.dump({'version': snap.version, 'matches': snap.df_match, 'aggregates': aggregates}, f, pickle.HIGHEST_PROTOCOL)
+        stores[snap.version] = directory
+        return directory
+
+# Remove the stores of old versions no computation uses any more
+def release_stores(latest):
+    with store_lock:
+        for version, directory in list(stores.items()):
+            if version != latest and not store_users[version]:
+                shutil.rmtree(directory, ignore_errors=True)
+                del stores[version], store_users[version]
+
+# In a worker: the store its published snapshot was attached from
+attached = None
+
+def attach_snapshot(directory):
+    global attached
+    if attached == directory:
+        return
+    with open(os.path.join(directory, 'snapshot.pickle'), 'rb') as f:
+        stored = pickle.load(f)
+    aggregates = {**stored['aggregates'], 'delivery_state': shared.attach(os.path.join(directory, 'delivery_state'))}
+    dataset.publish(dataset.Snapshot(shared.attach(os.path.join(directory, 'deliveries')), stored['matches'], stored['version'], aggregates))
+    attached = directory
+
+# WSGI environ of an ASGI HTTP request (without the body stream, so it can be sent to a worker)
+def wsgi_environ(scope, body):
+    server = scope.get('server') or ('localhost', 80)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', '').encode('utf8').decode('latin1'),
+        'PATH_INFO': scope['path'].encode('utf8').decode('latin1'),
+        'QUERY_STRING': scope['query_string'].decode('latin1'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1]),
+        'SERVER_PROTOCOL': 'HTTP/' + scope.get('http_version', '1.1'),
+        'REMOTE_ADDR': scope['client'][0] if scope.get('client') else '',
+        'CONTENT_LENGTH': str(len(body)),
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+    for name, value in scope['headers']:
+        name, value = name.decode('latin1').upper().replace('-', '_'), value.decode('latin1')
+        if name == 'CONTENT_LENGTH':
+            continue
+        if name == 'CONTENT_TYPE':
+            environ['CONTENT_TYPE'] = value
+            continue
+        key = 'HTTP_' + name
+        environ[key] = environ[key] + ',' + value if key in environ else value
+    return environ
+
+# Call the Flask app; returns the status, headers and body iterable
+def start_wsgi(environ, body):
+    environ = {**environ, 'wsgi.input': io.BytesIO(body), 'wsgi.errors': sys.stderr}
+    started = {}
+
+    def start_response(status, headers, exc_info=None):
+        started['status'], started['headers'] = int(status.split(' ', 1)[0]), headers
+
+    chunks = flask_app.app(environ, start_response)
+    return started['status'], started['headers'], chunks
+
+# A heavy request, run in a pool worker on the snapshot in the store directory, with the
+# response body collected; returns the metrics recorded while serving it too
+def run_in_worker(environ, body, directory):
+    attach_snapshot(directory)
+    status, headers, chunks = start_wsgi(environ, body)
+    try:
+        data = b''.join(chunks)
+    finally:
+        if hasattr(chunks, 'close'):
+            chunks.close()
+    return status, headers, data, metrics.drain()
+
+# A light request, run on one thread from start to end (the Flask request context and the
+# pinned snapshot belong to that thread); body chunks are forwarded as they are produced
+def run_on_thread(environ, body, send, loop):
+    def forward(message):
+        asyncio.run_coroutine_threadsafe(send(message), loop).result()
+
+    status, headers, chunks = start_wsgi(environ, body)
+    try:
+        forward({'type': 'http.response.start', 'status': status, 'headers': encode_headers(headers)})
+        for chunk in chunks:
+            if chunk:
+                forward({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+        forward({'type': 'http.response.body', 'body': b''})
+    finally:
+        if hasattr(chunks, 'close'):
+            chunks.close()
+
+def encode_headers(headers):
+    return [(name.lower().encode('latin1'), value.encode('latin1')) for name, value in headers]
+
+def error_response(status, message, headers=()):
+    return status, [('Content-Type', 'application/json'), *headers], json.dumps({"error": message}).encode()
+
+def endpoint_of(scope):
+    try:
+        endpoint, _ = flask_app.app.url_map.bind('localhost').match(scope['path'], method=scope['method'])
+    except HTTPException:
+        return None
+    return endpoint
+
+# Run a heavy request in the pool on snap and merge the worker's metrics (once, however many
+# callers share it)
+async def compute_in_pool(environ, body, snap):
+    loop = asyncio.get_running_loop()
+    store_users[snap.version] += 1
+    try:
+        directory = await loop.run_in_executor(light_pool, export_snapshot, snap)
+        status, headers, data, recorded = await loop.run_in_executor(get_pool(), run_in_worker, environ, body, directory)
+    finally:
+        store_users[snap.version] -= 1
+        release_stores(dataset.current().version)
+    metrics.merge(recorded)
+    return status, headers, data
+
+async def run_heavy(environ, body):
+    global pool
+    snap = dataset.current()
+    key = (environ['REQUEST_METHOD'], environ['PATH_INFO'], environ['QUERY_STRING'], environ.get('HTTP_ACCEPT'),
+           environ.get('HTTP_IF_NONE_MATCH'), body, snap.version)
+    task = in_flight.get(key)
+    # shield: a caller that times out leaves the computation running for the others sharing it
+    try:
+        if task is None:
+            if len(in_flight) >= MAX_PENDING:
+                return error_response(503, "Server busy, retry later", [('Retry-After', '1')])
+            task = asyncio.ensure_future(compute_in_pool(environ, body, snap))
+            in_flight[key] = task
+            task.add_done_callback(lambda _: in_flight.pop(key, None))
+        return await asyncio.wait_for(asyncio.shield(task), HEAVY_TIMEOUT)
+    except asyncio.TimeoutError:
+        return error_response(504, "Request timed out")
+    except concurrent.futures.process.BrokenProcessPool:
+        pool = None  # a worker died; the next heavy request starts a new pool
+        return error_response(500, "Worker process failed")
+
+async def read_body(receive):
+    body = b''
+    while True:
+        message = await receive()
+        body += message.get('body', b'')
+        if not message.get('more_body'):
+            return body
+
+async def lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            if pool is not None:
+                pool.shutdown(cancel_futures=True)
+            release_stores(None)
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+async def app(scope, receive, send):
+    if scope['type'] == 'lifespan':
+        return await lifespan(receive, send)
+    if scope['type'] != 'http':
+        return
+
+    body = await read_body(receive)
+    environ = wsgi_environ(scope, body)
+    loop = asyncio.get_running_loop()
+    endpoint = endpoint_of(scope)
+    if endpoint not in HEAVY_ENDPOINTS or endpoint in STREAMED_ENDPOINTS:
+        return await loop.run_in_executor(light_pool, run_on_thread, environ, body, send, loop)
+
+    status, headers, data = await run_heavy(environ, body)
+    await send({'type': 'http.response.start', 'status': status, 'headers': encode_headers(headers)})
+    await send({'type': 'http.response.body', 'body': data})
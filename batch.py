@@ -0,0 +1,143 @@
+import argparse
+import concurrent.futures
+import json
+import multiprocessing
+import os
+import shutil
+import tempfile
+import time
+
+import pandas as pd
+
+import api
+import dataset
+import shared
+
+# Parallel per-match batch engine.
+# The match IDs are split into contiguous shards and run on a process pool. The parent exports
+# the deliveries, their state table and the matches frame once to a shared store (see shared.py;
+# the store goes on /dev/shm when it exists); every worker maps them read-only and gets only the
+# store path, the match row offsets and the partnerships table (whose batsmen are lists, so it
+# is pickled, once per worker), so no deliveries are pickled or copied per worker. Importing api
+# loads nothing (the dataset is loaded on first use), so a worker never reads the dataset files.
+# Shards come back in submission order, so the merged result is the same whatever the number
+# of workers and whichever worker finishes first.
+#
+#     python batch.py [output.parquet] [--job report|innings1..innings5] [--workers N] [--min-matches N]
+#
+# precomputes the job for every match into a Parquet file, one row per match innings.
+JOBS = {'report': None, **{f'innings{analysis}': analysis for analysis in api.INNINGS_ANALYSES}}
+WORKERS = int(os.environ.get('IPL_BATCH_WORKERS', os.cpu_count() or 1))
+
+# Shards per worker: small enough to even out uneven shards, large enough that every shard is
+# still one grouped pass over many matches
+SHARDS_PER_WORKER = 4
+
+# Workers used for a run: no more than there are CPUs to run them, and each gets at least
+# min_matches matches. A worker pays its start-up before its first shard (spawning, importing
+# pandas and attaching the store); given at least as many matches as it costs to start, it
+# spends at least half its time on them, so a run of n matches on w such workers takes about
+# start + n * match / w against n * match serially. Both costs were measured on the real
+# dataset (benchmarks/batch_scaling.py prints them for the machine at hand); set
+# IPL_BATCH_MIN_MATCHES (or --min-matches) from that machine's figures.
+WORKER_START_SECONDS = 0.9
+MATCH_SECONDS = 0.0012
+MIN_MATCHES_PER_WORKER = int(os.environ.get('IPL_BATCH_MIN_MATCHES', round(WORKER_START_SECONDS / MATCH_SECONDS)))
+
+def usable_workers(workers, matches, min_matches=MIN_MATCHES_PER_WORKER):
+    cpus = len(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else (os.cpu_count() or 1)
+    return max(1, min(workers, cpus, matches // max(1, min_matches)))
+
+def export_store(snap, directory):
+    for name, frame in {'deliveries': snap.df_del, 'delivery_state': snap.delivery_state, 'matches': snap.df_match}.items():
+        shared.export(frame, os.path.join(directory, name), {'version': snap.version})
+
+# Worker initializer: publish a snapshot over the mapped store holding what the per-match
+# functions read (row offsets, delivery state and partnerships). Registries only need the match
+# table names.
+def attach_store(directory, version, match_offsets, inning_offsets, partnerships):
+    deliveries = shared.attach(os.path.join(directory, 'deliveries'))
+    matches = shared.attach(os.path.join(directory, 'matches'))
+    aggregates = {
+        'match_offsets': match_offsets,
+        'inning_offsets': inning_offsets,
+        'partnerships': partnerships,
+        'delivery_state': shared.attach(os.path.join(directory, 'delivery_state')),
+        'registries': dataset.name_registries(set(), matches),
+    }
+    dataset.publish(dataset.Snapshot(deliveries, matches, version, aggregates))
+
+def run_shard(job, match_ids):
+    if JOBS[job] is None:
+        return api.match_report_bulk(match_ids)
+    return api.match_innings_bulk(match_ids, JOBS[job])
+
+def shards_of(match_ids, count):
+    size = max(1, -(-len(match_ids) // count))
+    return [match_ids[start:start + size] for start in range(0, len(match_ids), size)]
+
+# Results of job for match_ids (all matches by default), as {match_id: result} in match_ids order.
+# Runs serially when the matches are too few, or the CPUs too few, for workers to pay off.
+def run(job='report', match_ids=None, workers=WORKERS, min_matches=MIN_MATCHES_PER_WORKER):
+    if job not in JOBS:
+        raise ValueError(f"Unknown job {job}. Use {', '.join(JOBS)}")
+    snap = dataset.load()
+    match_ids = sorted(snap.match_offsets) if match_ids is None else list(match_ids)
+    workers = usable_workers(workers, len(match_ids), min_matches)
+    if workers <= 1:
+        return run_shard(job, match_ids)
+
+    directory = tempfile.mkdtemp(prefix='ipl-batch-', dir='/dev/shm' if os.path.isdir('/dev/shm') else None)
+    try:
+        export_store(snap, directory)
+        pool = concurrent.futures.ProcessPoolExecutor(
+            workers, mp_context=multiprocessing.get_context('spawn'),
+            initializer=attach_store, initargs=(directory, snap.version, snap.match_offsets, snap.inning_offsets, snap.partnerships),
+        )
+        with pool:
+            shards = shards_of(match_ids, workers * SHARDS_PER_WORKER)
+            results = {}
+            for shard_results in pool.map(run_shard, [job] * len(shards), shards):
+                results.update(shard_results)
+        return results
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+# Nested stats flattened to columns (phase_stats.powerplay.runs -> phase_stats_powerplay_runs);
+# lists such as fall_of_wickets and partnerships are stored as JSON text
+def flatten(stats, prefix=''):
+    row = {}
+    for key, value in stats.items():
+        if isinstance(value, dict):
+            row.update(flatten(value, f"{prefix}{key}_"))
+        elif isinstance(value, list):
+            row[prefix + key] = json.dumps(value, default=str)
+        else:
+            row[prefix + key] = value
+    return row
+
+# One row per match innings
+def to_frame(results):
+    rows = []
+    for match_id, result in results.items():
+        for inning, stats in result.get('innings', {}).items():
+            rows.append({'match_id': match_id, 'inning': inning, **flatten(stats)})
+    return pd.DataFrame(rows)
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('output', nargs='?', default='match_reports.parquet')
+    parser.add_argument('--job', choices=list(JOBS), default='report')
+    parser.add_argument('--workers', type=int, default=WORKERS)
+    parser.add_argument('--min-matches', type=int, default=MIN_MATCHES_PER_WORKER)
+    options = parser.parse_args()
+
+    start = time.perf_counter()
+    results = run(options.job, workers=options.workers, min_matches=options.min_matches)
+    frame = to_frame(results)
+    frame.to_parquet(options.output, index=False)
+    print(f"{len(results)} matches, {len(frame)} innings written to {options.output} "
+          f"with {usable_workers(options.workers, len(results), options.min_matches)} workers in {time.perf_counter() - start:.1f}s")
+
+if __name__ == '__main__':
+    main()
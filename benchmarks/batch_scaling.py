@@ -0,0 +1,67 @@
+# Scaling of the parallel batch engine (batch.py):
+#   the two costs MIN_MATCHES_PER_WORKER is derived from - a worker's start-up (spawn, imports,
+#   attaching the store, one match) and one match of the job run serially - and the wall time
+#   of the job over every match with 1, 2, 4, ... workers up to the CPUs available, ignoring
+#   the min_matches cap, with the speedup over the serial run.
+#
+# Run from the repository root (next to cleaned_del.csv / cleaned_match.csv):
+#     python benchmarks/batch_scaling.py [--job report] [--repeat N]
+import argparse
+import concurrent.futures
+import multiprocessing
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import batch
+import dataset
+
+def worker_start(snap, job, match_id):
+    directory = tempfile.mkdtemp(prefix='ipl-batch-')
+    try:
+        batch.export_store(snap, directory)
+        start = time.perf_counter()
+        initargs = (directory, snap.version, snap.match_offsets, snap.inning_offsets, snap.partnerships)
+        with concurrent.futures.ProcessPoolExecutor(1, mp_context=multiprocessing.get_context('spawn'),
+                                                    initializer=batch.attach_store, initargs=initargs) as pool:
+            pool.submit(batch.run_shard, job, [match_id]).result()
+        return time.perf_counter() - start
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+def best(function, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--job', choices=list(batch.JOBS), default='report')
+    parser.add_argument('--repeat', type=int, default=3)
+    options = parser.parse_args()
+
+    snap = dataset.load()
+    match_ids = sorted(snap.match_offsets)
+    cpus = batch.usable_workers(os.cpu_count() or 1, len(match_ids), min_matches=1)
+    start = min(worker_start(snap, options.job, match_ids[0]) for _ in range(options.repeat))
+    serial = best(lambda: batch.run_shard(options.job, match_ids), options.repeat)
+    match = serial / len(match_ids)
+    print(f"{len(match_ids)} matches, {cpus} CPUs: worker start {start:.3f}s, {match * 1000:.3f}ms per match, "
+          f"min matches per worker {round(start / match)} (IPL_BATCH_MIN_MATCHES)")
+
+    print(f"{'workers':>8}{'seconds':>10}{'speedup':>9}")
+    workers = 1
+    while workers <= cpus:
+        elapsed = serial if workers == 1 else best(lambda: batch.run(options.job, match_ids, workers, min_matches=1), options.repeat)
+        print(f"{workers:>8}{elapsed:>10.3f}{serial / elapsed:>9.2f}")
+        workers *= 2
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+# Per-request latency of the match and player endpoints, served from the load-time
+# indexes ("index": match offsets, player cube) and with the full-frame boolean
+# scans they replaced ("scan").
+#
+# Run from the repository root (next to cleaned_del.csv / cleaned_match.csv):
+#     python benchmarks/match_index.py [repeats]
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import api
+import dataset
+
+FUNCTIONS = [api.match_innings_1, api.match_innings_2, api.match_innings_3,
+             api.match_innings_4, api.match_innings_5]
+
+# The lookups as they were before the index: one boolean mask over all deliveries per call
+def scan_match_deliveries(snap, match_id):
+    return snap.df_del[snap.df_del['match_id'] == match_id]
+
+def scan_inning_deliveries(snap, match_id, inning):
+    match_data = snap.df_del[snap.df_del['match_id'] == match_id]
+    return match_data[match_data['inning'] == inning]
+
+# player_performance's batting and bowling totals as computed before the player cube
+def scan_player_performance(player_name):
+    df_del = dataset.current().df_del
+    batting_data = df_del[df_del['batter'] == player_name]
+    bowling_data = df_del[df_del['bowler'] == player_name]
+    return (batting_data['batsman_runs'].sum(), len(batting_data), batting_data['batsman_runs'].isin([4, 6]).sum(),
+            bowling_data['is_wicket'].sum(), bowling_data['total_runs'].sum(), len(bowling_data))
+
+def timed(func, args_list):
+    start = time.perf_counter()
+    for args in args_list:
+        func(*args)
+    return (time.perf_counter() - start) / len(args_list) * 1000
+
+def main(repeats=20):
+    snap = dataset.current()
+    match_ids = [(int(m),) for m in snap.df_match['id'].sample(repeats, random_state=0)]
+    players = [(p,) for p in snap.df_del['batter'].drop_duplicates().sample(repeats, random_state=0)]
+    
+    print(f"{'function':<22}{'scan ms':>10}{'index ms':>10}{'speedup':>10}")
+    for func in FUNCTIONS:
+        indexed = timed(func, match_ids)
+        snapshot_class = dataset.Snapshot
+        saved = snapshot_class.match_deliveries, snapshot_class.inning_deliveries
+        snapshot_class.match_deliveries, snapshot_class.inning_deliveries = scan_match_deliveries, scan_inning_deliveries
+        try:
+            scanned = timed(func, match_ids)
+        finally:
+            snapshot_class.match_deliveries, snapshot_class.inning_deliveries = saved
+        print(f"{func.__name__:<22}{scanned:>10.2f}{indexed:>10.2f}{scanned / indexed:>9.1f}x")
+    
+    indexed = timed(api.player_performance, players)
+    scanned = timed(scan_player_performance, players)
+    print(f"{'player_performance':<22}{scanned:>10.2f}{indexed:>10.2f}{scanned / indexed:>9.1f}x")
+
+if __name__ == '__main__':
+    main(*[int(a) for a in sys.argv[1:]])
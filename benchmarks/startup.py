@@ -0,0 +1,49 @@
+# Startup time and resident memory of loading the datasets:
+#   csv   - plain pd.read_csv of both files (what api.py did before the cache)
+#   build - typed parse plus writing the columnar cache (first start)
+#   cache - loading from the columnar cache (every later start)
+#
+# Each mode runs in a fresh interpreter so RSS is not shared between them.
+# Run from the repository root (next to cleaned_del.csv / cleaned_match.csv):
+#     python benchmarks/startup.py
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CHILD = '''
+import resource, sys, time
+sys.path.insert(0, {root!r})
+start = time.perf_counter()
+import pandas as pd
+import loader
+if {mode!r} == 'csv':
+    frames = pd.read_csv('cleaned_del.csv'), pd.read_csv('cleaned_match.csv')
+else:
+    frames = loader.load_deliveries(cache_dir={cache_dir!r}), loader.load_matches(cache_dir={cache_dir!r})
+elapsed = time.perf_counter() - start
+memory = sum(frame.memory_usage(deep=True).sum() for frame in frames) / 2**20
+rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 2**10
+print(elapsed, memory, rss)
+'''
+
+def run(mode, cache_dir):
+    code = CHILD.format(root=ROOT, mode=mode, cache_dir=cache_dir)
+    out = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True).stdout
+    return [float(value) for value in out.split()]
+
+def main():
+    cache_dir = tempfile.mkdtemp(prefix='ipl-cache-')
+    try:
+        print(f"{'mode':<8}{'seconds':>10}{'frames MiB':>12}{'max RSS MiB':>13}")
+        for mode in ['csv', 'build', 'cache']:
+            elapsed, memory, rss = run(mode, cache_dir)
+            print(f"{mode:<8}{elapsed:>10.3f}{memory:>12.1f}{rss:>13.1f}")
+    finally:
+        shutil.rmtree(cache_dir)
+
+if __name__ == '__main__':
+    main()
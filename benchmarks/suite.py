@@ -0,0 +1,201 @@
+# Latency and peak memory of every api entry point (api.HELPERS are left out) on synthetic datasets at 1x, 10x and
+# 100x the real size (see synthetic.py), checked against a stored baseline.
+#
+# For every function the result is hashed: a hash that differs from the baseline means the
+# function now returns something else for the same data (the data is seeded, so runs are
+# repeatable and need no dataset files). Best-of-N latencies are compared too and slowdowns beyond
+# --tolerance are flagged; they only fail the run with --strict, as timings depend on the machine.
+#
+# Run from the repository root:
+#     python benchmarks/suite.py                        1x, compared with benchmarks/baseline.json
+#     python benchmarks/suite.py --scales 1 10 100
+#     python benchmarks/suite.py --update-baseline      store this run as the new baseline
+import argparse
+import hashlib
+import json
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import dataset
+import synthetic
+
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+
+# Functions whose result lists come in set order
+UNORDERED = {'teams'}
+
+# Arguments of every benchmarked function, picked deterministically from the snapshot
+def cases(snap):
+    match_ids = [int(match_id) for match_id in snap.df_match['id'][:50]]
+    match_id = match_ids[0]
+    batters = snap.df_del['batter'].value_counts().index
+    player = str(batters[0])
+    bowler = str(snap.df_del.loc[snap.df_del['batter'] == player, 'bowler'].value_counts().index[0])
+    team = str(snap.df_match['team1'].iloc[0])
+    opponent = str(snap.df_match['team2'].iloc[0])
+    venue = str(snap.df_match.loc[snap.df_match['team1'] == team, 'venue'].value_counts().index[0])
+    season = int(snap.df_match['season'].iloc[0])
+    return {
+        'resolve_name': ('player', player.lower()),
+        'search_names': (player[:4].lower(),),
+        'aggregate_matches': (['season', 'team'], {'venue': venue}, ['count', 'wins', 'mean_target', 'margin_histogram']),
+        'teams': (),
+        'total_matches_over_seasons': (),
+        'matches_hosted_by_each_city': (),
+        'avg_target_by_season': (),
+        'player_performance': (player,),
+        'player_performance_bulk': ([str(name) for name in batters[:100]],),
+        'player_vs_team': (player, opponent),
+        'player_vs_team_bulk': ([(str(name), opponent) for name in batters[:100]],),
+        'match_innings_1': (match_id,),
+        'match_innings_2': (match_id,),
+        'match_innings_3': (match_id,),
+        'match_innings_4': (match_id,),
+        'match_innings_5': (match_id,),
+        'match_innings_bulk': (match_ids, 1),
+        'match_report': (match_id,),
+        'match_progress': (match_id, 'manhattan'),
+        'match_win_probability': (match_id,),
+        'match_report_bulk': (match_ids,),
+        'stream_partnerships': (None, team),
+        'batsman_vs_bowler': (player, bowler),
+        'player_form': (player, f'{season}-01-01', f'{season + 4}-12-31'),
+        'batsman_vs_bowler_form': (player, bowler, None, None, 5),
+        'batsman_vs_bowlers': (player, 12, 'strike_rate', 10),
+        'bowler_vs_batsmen': (bowler,),
+        'player_dismissal_analysis': (player,),
+        'player_performance_by_phase': (player, 'death'),
+        'team_phase_stats': (team, 'powerplay'),
+        'team_phase_matrix': (season, True),
+        'leaderboard_top': ('strike_rate', season, 'death', 30, 10),
+        'team_home_vs_away': (team, venue),
+        'match_won_analysis': (),
+        'result_margin_distribution': (),
+        'matches_won_by_toss_decision': (),
+    }
+
+# Generators (stream_partnerships) are consumed, so their cost is counted
+def call(func, args):
+    result = func(*args)
+    if isinstance(result, tuple) and result and hasattr(result[0], '__next__'):
+        result = (list(result[0]),) + result[1:]
+    return result
+
+# JSON-able form of a result, for hashing: numpy scalars as Python values, keys as strings,
+# floats rounded so the last bits of a sum do not count as a change
+def canonical(value):
+    if isinstance(value, dict):
+        return {str(canonical(key)): canonical(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [canonical(item) for item in value]
+    if hasattr(value, 'item'):
+        value = value.item()
+    if isinstance(value, float):
+        return None if value != value else round(value, 6)
+    return value
+
+def result_hash(name, result):
+    result = canonical(result)
+    if name in UNORDERED:
+        result = {key: sorted(value) for key, value in result.items()}
+    return hashlib.sha1(json.dumps(result, sort_keys=True, default=str).encode()).hexdigest()[:16]
+
+def run_scale(scale, repeats, seed):
+    start = time.perf_counter()
+    df_del, df_match = synthetic.generate(scale, seed)
+    dataset.publish(dataset.build_snapshot(df_del, df_match, f'synthetic-{scale}x-{seed}'))
+    print(f"\n{scale:g}x: {len(df_match)} matches, {len(df_del)} deliveries, built in {time.perf_counter() - start:.1f}s")
+
+    import api
+    arguments = cases(dataset.current())
+    public = {name for name, func in vars(api).items() if callable(func) and getattr(func, '__module__', None) == 'api'}
+    missing = sorted(public - api.HELPERS - set(arguments))
+    if missing:
+        print(f"not benchmarked: {', '.join(missing)}")
+
+    results = {}
+    for name, args in arguments.items():
+        func = getattr(api, name)
+        call(func, args)  # warm-up
+        timings = []
+        for _ in range(repeats):
+            begin = time.perf_counter()
+            result = call(func, args)
+            timings.append((time.perf_counter() - begin) * 1000)
+
+        tracemalloc.start()
+        call(func, args)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+        results[name] = {
+            "min_ms": round(min(timings), 3),
+            "median_ms": round(statistics.median(timings), 3),
+            "peak_kb": round(peak / 1024, 1),
+            "result": result_hash(name, result),
+        }
+    return results
+
+def compare(scale, results, baseline, tolerance):
+    changed, slower = [], []
+    print(f"{'function':<30}{'min ms':>11}{'baseline':>11}{'ratio':>8}{'median ms':>11}{'peak KB':>11}  result")
+    for name, row in results.items():
+        base = baseline.get(name)
+        ratio = row['min_ms'] / base['min_ms'] if base and base['min_ms'] else None
+        if base is None:
+            status = 'new'
+        elif base['result'] != row['result']:
+            status = 'CHANGED'
+            changed.append(name)
+        else:
+            status = 'same'
+        if ratio is not None and ratio > 1 + tolerance:
+            slower.append(name)
+            status += ' SLOWER'
+        print(f"{name:<30}{row['min_ms']:>11.3f}{base['min_ms'] if base else float('nan'):>11.3f}"
+              f"{ratio if ratio is not None else float('nan'):>8.2f}{row['median_ms']:>11.3f}{row['peak_kb']:>11.1f}  {status}")
+    return changed, slower
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--scales', type=float, nargs='+', default=[1])
+    parser.add_argument('--repeats', type=int, default=10)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--baseline', default=BASELINE)
+    parser.add_argument('--update-baseline', action='store_true')
+    parser.add_argument('--tolerance', type=float, default=0.5, help='allowed slowdown over the baseline (0.5 = 50%%)')
+    parser.add_argument('--strict', action='store_true', help='fail on slowdowns too')
+    options = parser.parse_args()
+
+    baseline = {}
+    if os.path.exists(options.baseline):
+        with open(options.baseline) as f:
+            baseline = json.load(f)
+
+    failed = False
+    for scale in options.scales:
+        key = f"{scale:g}x-seed{options.seed}"
+        results = run_scale(scale, options.repeats, options.seed)
+        changed, slower = compare(scale, results, baseline.get(key, {}), options.tolerance)
+        failed |= bool(changed) or (options.strict and bool(slower))
+        if changed:
+            print(f"results changed: {', '.join(changed)}")
+        if slower:
+            print(f"slower than baseline: {', '.join(slower)}")
+        baseline[key] = results
+
+    if options.update_baseline:
+        with open(options.baseline, 'w') as f:
+            json.dump(baseline, f, indent=1, sort_keys=True)
+            f.write('\n')
+        print(f"\nbaseline written to {options.baseline}")
+        return 0
+    return 1 if failed else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,178 @@
+# Synthetic IPL datasets shaped like cleaned_del.csv / cleaned_match.csv, at any multiple of
+# the real size (scale=1 is about 1,100 matches and 275,000 deliveries).
+#
+# Everything comes from one seeded generator, so the same (scale, seed) always gives the same
+# data, and no download or real dataset is needed. Deliveries are generated a whole array of
+# innings at a time and built as categoricals, which keeps 100x (about 27M rows) in memory.
+#
+#     python benchmarks/synthetic.py [scale] [directory]    writes cleaned_del.csv / cleaned_match.csv
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import loader
+
+MATCHES = 1095
+SEASONS = list(range(2008, 2025))
+TEAMS = {
+    'Chennai Super Kings': 'CSK', 'Delhi Capitals': 'DC', 'Gujarat Titans': 'GT',
+    'Kolkata Knight Riders': 'KKR', 'Lucknow Super Giants': 'LSG', 'Mumbai Indians': 'MI',
+    'Punjab Kings': 'PBKS', 'Rajasthan Royals': 'RR', 'Royal Challengers Bangalore': 'RCB',
+    'Sunrisers Hyderabad': 'SRH',
+}
+VENUES = [
+    ('Chennai', 'MA Chidambaram Stadium, Chepauk, Chennai'), ('Delhi', 'Arun Jaitley Stadium, Delhi'),
+    ('Ahmedabad', 'Narendra Modi Stadium, Ahmedabad'), ('Kolkata', 'Eden Gardens, Kolkata'),
+    ('Lucknow', 'Bharat Ratna Shri Atal Bihari Vajpayee Ekana Cricket Stadium, Lucknow'),
+    ('Mumbai', 'Wankhede Stadium, Mumbai'), ('Chandigarh', 'Punjab Cricket Association IS Bindra Stadium, Mohali'),
+    ('Jaipur', 'Sawai Mansingh Stadium, Jaipur'), ('Bengaluru', 'M Chinnaswamy Stadium, Bengaluru'),
+    ('Hyderabad', 'Rajiv Gandhi International Stadium, Uppal, Hyderabad'),
+]
+UMPIRES = [f"Umpire {i}" for i in range(40)]
+DISMISSALS = ['bowled', 'caught', 'caught and bowled', 'lbw', 'run out', 'stumped']
+DISMISSAL_WEIGHTS = [0.18, 0.6, 0.03, 0.1, 0.06, 0.03]
+
+# Players per franchise (squads of 11 are drawn from it in every match)
+POOL = 30
+
+# Delivery slots generated per innings: 120 legal balls plus room for wides; slots past the
+# 20th over or the 10th wicket are dropped
+SLOTS = 144
+WIDE_RATE = 0.04
+WICKET_RATE = 0.045
+RUNS = [0, 1, 2, 3, 4, 6]
+RUN_WEIGHTS = [0.38, 0.35, 0.07, 0.01, 0.13, 0.06]
+
+def player_names():
+    return [f"{abbr} P{i}" for abbr in TEAMS.values() for i in range(POOL)]
+
+def generate(scale=1, seed=0):
+    rng = np.random.default_rng(seed)
+    n = max(1, int(round(MATCHES * scale)))
+    team_names = list(TEAMS)
+
+    # Fixtures and tosses
+    team1 = rng.integers(0, len(TEAMS), n)
+    team2 = (team1 + rng.integers(1, len(TEAMS), n)) % len(TEAMS)
+    toss_winner = np.where(rng.random(n) < 0.5, team1, team2)
+    bat_decision = rng.random(n) < 0.45
+    batting_first = np.where(bat_decision, toss_winner, np.where(toss_winner == team1, team2, team1))
+    chasing = np.where(batting_first == team1, team2, team1)
+
+    # Innings 2k is the first innings of match k, 2k + 1 the second
+    innings = 2 * n
+    batting = np.column_stack([batting_first, chasing]).ravel()
+    bowling = np.column_stack([chasing, batting_first]).ravel()
+
+    wide = rng.random((innings, SLOTS)) < WIDE_RATE
+    legal = ~wide
+    wicket = legal & (rng.random((innings, SLOTS)) < WICKET_RATE)
+    batsman_runs = np.where(legal & ~wicket, rng.choice(RUNS, (innings, SLOTS), p=RUN_WEIGHTS), 0)
+    extra_runs = wide.astype(int)
+
+    legal_before = np.cumsum(legal, axis=1) - legal
+    over = legal_before // 6
+    wickets_before = np.cumsum(wicket, axis=1) - wicket
+    keep = (over < 20) & (wickets_before < 10)
+
+    # Ball number inside the over, counting wides
+    slot = np.arange(SLOTS)
+    over_start = np.ones((innings, SLOTS), dtype=bool)
+    over_start[:, 1:] = over[:, 1:] != over[:, :-1]
+    ball = slot - np.maximum.accumulate(np.where(over_start, slot, 0), axis=1) + 1
+
+    # Strike changes after odd runs and at the end of every over; after a wicket the next
+    # batsman in the order comes in
+    swap = (batsman_runs % 2 == 1) | (legal & (legal_before % 6 == 5))
+    strike = (np.cumsum(swap, axis=1) - swap) % 2
+    order_start = rng.integers(0, POOL, innings)[:, None]
+    striker = batting[:, None] * POOL + (order_start + wickets_before + strike) % POOL
+    non_striker = batting[:, None] * POOL + (order_start + wickets_before + 1 - strike) % POOL
+    attack_start = rng.integers(0, POOL, innings)[:, None]
+    bowler = bowling[:, None] * POOL + (attack_start + 11 + over % 5) % POOL
+    fielder = bowling[:, None] * POOL + (attack_start + rng.integers(0, 11, (innings, SLOTS))) % POOL
+    kind = rng.choice(len(DISMISSALS), (innings, SLOTS), p=DISMISSAL_WEIGHTS)
+
+    rows = keep.ravel()
+    innings_of_row = np.repeat(np.arange(innings), SLOTS)[rows]
+    flat = lambda values: np.broadcast_to(values, (innings, SLOTS)).ravel()[rows]
+    wicket_rows = flat(wicket)
+    caught = np.isin(flat(kind), [DISMISSALS.index('caught'), DISMISSALS.index('run out'), DISMISSALS.index('stumped')])
+
+    players = pd.CategoricalDtype(player_names())
+    teams = pd.CategoricalDtype(team_names)
+    player_column = lambda codes, present=None: pd.Categorical.from_codes(np.where(present, codes, -1) if present is not None else codes, dtype=players)
+    match_ids = 100000 + np.arange(n)
+    deliveries = pd.DataFrame({
+        'match_id': match_ids[innings_of_row // 2],
+        'inning': innings_of_row % 2 + 1,
+        'batting_team': pd.Categorical.from_codes(batting[innings_of_row], dtype=teams),
+        'bowling_team': pd.Categorical.from_codes(bowling[innings_of_row], dtype=teams),
+        'over': flat(over),
+        'ball': flat(ball),
+        'batter': player_column(flat(striker)),
+        'bowler': player_column(flat(bowler)),
+        'non_striker': player_column(flat(non_striker)),
+        'batsman_runs': flat(batsman_runs),
+        'extra_runs': flat(extra_runs),
+        'total_runs': flat(batsman_runs + extra_runs),
+        'extras_type': pd.Categorical.from_codes(np.where(flat(wide), 0, -1), categories=['wides']),
+        'is_wicket': wicket_rows.astype(int),
+        'player_dismissed': player_column(flat(striker), wicket_rows),
+        'dismissal_kind': pd.Categorical.from_codes(np.where(wicket_rows, flat(kind), -1), categories=DISMISSALS),
+        'fielder': player_column(flat(fielder), wicket_rows & caught),
+    })
+    deliveries = loader.typed_frame(deliveries, loader.DELIVERY_INTS, loader.DELIVERY_CATEGORIES)
+
+    # Results follow from the innings totals
+    totals = np.bincount(innings_of_row, weights=deliveries['total_runs'].to_numpy(), minlength=innings).astype(int).reshape(n, 2)
+    wickets_lost = np.bincount(innings_of_row, weights=wicket_rows, minlength=innings).astype(int).reshape(n, 2)
+    first_won = totals[:, 0] > totals[:, 1]
+    tie = totals[:, 0] == totals[:, 1]
+    winner = np.where(first_won, batting_first, chasing)
+    season = np.array(SEASONS)[np.arange(n) * len(SEASONS) // n]
+    home = np.where(rng.random(n) < 0.85, team1, rng.integers(0, len(VENUES), n))
+    star = winner * POOL + rng.integers(0, POOL, n)
+    names = player_names()
+
+    matches = pd.DataFrame({
+        'id': match_ids,
+        'season': season,
+        'city': [VENUES[v][0] for v in home],
+        'date': [f"{s}-04-01" for s in season],
+        'match_type': np.where(np.arange(n) % 60 == 59, 'Final', 'League'),
+        'player_of_match': [names[p] for p in star],
+        'venue': [VENUES[v][1] for v in home],
+        'team1': [team_names[t] for t in team1],
+        'team2': [team_names[t] for t in team2],
+        'toss_winner': [team_names[t] for t in toss_winner],
+        'toss_decision': np.where(bat_decision, 'bat', 'field'),
+        'winner': [None if t else team_names[w] for w, t in zip(winner, tie)],
+        'result': np.where(tie, 'tie', np.where(first_won, 'runs', 'wickets')),
+        'result_margin': np.where(tie, np.nan, np.where(first_won, totals[:, 0] - totals[:, 1], 10 - wickets_lost[:, 1])),
+        'target_runs': (totals[:, 0] + 1).astype(float),
+        'target_overs': 20.0,
+        'super_over': np.where(tie, 'Y', 'N'),
+        'method': None,
+        'umpire1': [UMPIRES[u] for u in rng.integers(0, len(UMPIRES), n)],
+        'umpire2': [UMPIRES[u] for u in rng.integers(0, len(UMPIRES), n)],
+    })
+    matches = loader.typed_frame(matches, loader.MATCH_INTS, loader.MATCH_CATEGORIES)
+    return deliveries, matches
+
+# Write the datasets as CSV files laid out like the cleaned ones (with their leading index column)
+def write_csv(deliveries, matches, directory):
+    os.makedirs(directory, exist_ok=True)
+    deliveries.to_csv(os.path.join(directory, 'cleaned_del.csv'))
+    matches.to_csv(os.path.join(directory, 'cleaned_match.csv'))
+
+if __name__ == '__main__':
+    scale = float(sys.argv[1]) if len(sys.argv) > 1 else 1
+    directory = sys.argv[2] if len(sys.argv) > 2 else '.'
+    deliveries, matches = generate(scale)
+    write_csv(deliveries, matches, directory)
+    print(f"{len(matches)} matches, {len(deliveries)} deliveries written to {directory}")
@@ -0,0 +1,97 @@
+import pandas as pd
+
+try:
+    import pyarrow.parquet as parquet
+except ImportError:  # Parquet sources need pyarrow; CSV sources are read with pandas alone
+    parquet = None
+
+import dataset
+import form
+import loader
+import state
+
+# Out-of-core aggregation.
+# The deliveries source (CSV, or Parquet read by row group batches) is read chunk_rows rows at
+# a time. Each chunk is typed, the usual builders run on it, and their partial tables are merged
+# into running totals (player cube, team phase matrix, head to head) or appended (partnerships,
+# the per-match rows of the form tables),
+# so peak memory is about one chunk plus the aggregates, whatever the size of the file.
+# The matches table (one row per match) is loaded whole.
+#
+# The rows of a match must be contiguous in the source, as in the cleaned files: the trailing
+# match of every chunk is held back and completed with the next chunk, so partnerships, which
+# run over a whole innings, never straddle two chunks.
+
+def read_raw_chunks(path, chunk_rows):
+    if path.endswith('.parquet'):
+        if parquet is None:
+            raise ImportError("Reading Parquet deliveries needs pyarrow")
+        for batch in parquet.ParquetFile(path).iter_batches(batch_size=chunk_rows):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(path, chunksize=chunk_rows)
+
+# Typed chunks of deliveries holding whole matches only
+def match_chunks(path, chunk_rows):
+    seen = set()
+    carry = None
+
+    def typed(rows):
+        match_ids = set(rows['match_id'].unique())
+        split = match_ids & seen
+        if split:
+            raise ValueError(f"Deliveries of match {min(split)} are not contiguous in {path}")
+        seen.update(match_ids)
+        return loader.typed_frame(rows, loader.DELIVERY_INTS, loader.DELIVERY_CATEGORIES, sort_by=['match_id', 'inning'])
+
+    for raw in read_raw_chunks(path, chunk_rows):
+        if carry is not None:
+            raw = pd.concat([carry, raw], ignore_index=True)
+        last = (raw['match_id'] == raw['match_id'].iloc[-1]).to_numpy()
+        carry = raw[last]
+        if not last.all():
+            yield typed(raw[~last])
+    if carry is not None:
+        yield typed(carry)
+
+# The aggregates of dataset.build_aggregates, built chunk by chunk, and an empty deliveries frame
+# with the source's column types
+def build_aggregates(path, matches, chunk_rows):
+    totals = {}
+    partnerships = []
+    player_rows, pair_rows = [], []
+    player_names = set()
+    empty = None
+
+    for chunk in match_chunks(path, chunk_rows):
+        for name, table in dataset.build_totals(chunk, matches).items():
+            totals[name] = dataset.merge_totals(totals[name], table) if name in totals else table
+        partnerships.append(dataset.build_partnerships(chunk, matches))
+        player_rows.append(form.player_rows(chunk, matches))
+        pair_rows.append(form.pair_rows(chunk, matches))
+        player_names |= dataset.column_names(chunk, ['batter', 'bowler', 'non_striker'])
+        if empty is None:
+            empty = chunk.iloc[0:0]
+
+    if empty is None:
+        raise ValueError(f"No deliveries in {path}")
+
+    aggregates = {
+        # Per-match row ranges need the deliveries in memory; there are none in this mode
+        'match_offsets': {},
+        'inning_offsets': {},
+        'partnerships': pd.concat(partnerships, ignore_index=True),
+        'delivery_state': state.build_delivery_state(empty, matches),
+        'player_form': form.PrefixTable(pd.concat(player_rows, ignore_index=True), ['player']),
+        'pair_form': form.PrefixTable(pd.concat(pair_rows, ignore_index=True), ['batter', 'bowler']),
+        **totals,
+        **dataset.derived_aggregates(totals, dataset.name_registries(player_names, matches), matches),
+    }
+    return aggregates, empty
+
+# Snapshot holding aggregates only: season counts, career, head to head, team phase and
+# partnership queries are answered as usual, per-match deliveries queries find no rows
+def load_snapshot(deliveries_path, matches_path, chunk_rows):
+    matches = loader.load_matches(matches_path)
+    aggregates, empty = build_aggregates(deliveries_path, matches, chunk_rows)
+    return dataset.Snapshot(empty, matches, loader.dataset_version(deliveries_path, matches_path), aggregates)
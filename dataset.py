@@ -0,0 +1,531 @@
+import contextvars
+import hashlib
+import os
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+import chunked
+import form
+import headtohead
+import leaderboard
+import loader
+import metrics
+import registry
+import rollup
+import search
+import shared
+import state
+
+DELIVERIES_PATH = 'cleaned_del.csv'
+MATCHES_PATH = 'cleaned_match.csv'
+
+# With IPL_SHARED_DIR set (e.g. a directory on /dev/shm) the deliveries are exported there once
+# as fixed-width arrays and every worker process maps them read-only instead of holding a copy.
+SHARED_DIR = os.environ.get('IPL_SHARED_DIR')
+
+# With IPL_CHUNK_ROWS set, the deliveries file is never loaded whole: it is read that many rows
+# at a time and only the aggregates are kept (see chunked.py)
+CHUNK_ROWS = int(os.environ.get('IPL_CHUNK_ROWS', 0))
+
+# Match phases by (0-based) over number: Powerplay 0-5, Middle 6-14, Death 15-19
+PHASES = ['powerplay', 'middle', 'death']
+
+def over_phase(overs):
+    return pd.Series(np.select([overs <= 5, overs <= 14], PHASES[:2], PHASES[2]), index=overs.index)
+
+def season_of(deliveries, matches):
+    return deliveries['match_id'].map(matches.set_index('id')['season'])
+
+# Offset tables: (start, stop) row range of each match and of each innings.
+# first_row is the position of the first of these deliveries in the full deliveries frame.
+def build_match_index(deliveries, first_row=0):
+    match_ids = deliveries['match_id'].to_numpy()
+    innings = deliveries['inning'].to_numpy()
+
+    inning_starts = np.flatnonzero(np.r_[True, (match_ids[1:] != match_ids[:-1]) | (innings[1:] != innings[:-1])])
+    inning_stops = np.r_[inning_starts[1:], len(deliveries)]
+    inning_offsets = {
+        (int(match_ids[start]), int(innings[start])): (int(start) + first_row, int(stop) + first_row)
+        for start, stop in zip(inning_starts, inning_stops)
+    }
+
+    match_offsets = {}
+    for (match_id, _), (start, stop) in inning_offsets.items():
+        first = match_offsets.get(match_id, (start, stop))[0]
+        match_offsets[match_id] = (first, stop)
+
+    return match_offsets, inning_offsets
+
+# Partnerships of every innings.
+# A wicket closes the running partnership of its innings, so the partnership a
+# delivery belongs to is the number of wickets that fell before it in the innings.
+def build_partnerships(deliveries, matches):
+    keys = ['match_id', 'inning', 'partnership']
+    wicket = deliveries['is_wicket']
+    live = 1 - wicket
+    balls = deliveries[['match_id', 'inning', 'batting_team', 'batter', 'non_striker']].assign(
+        partnership=wicket.groupby([deliveries['match_id'], deliveries['inning']], sort=False).cumsum() - wicket,
+        runs=deliveries['total_runs'] * live,
+        balls=live,
+        closed=wicket,
+    )
+
+    table = balls.groupby(keys, sort=False).agg(
+        batting_team=('batting_team', 'first'),
+        runs=('runs', 'sum'),
+        balls=('balls', 'sum'),
+        closed=('closed', 'max'),
+    ).reset_index()
+
+    # Partnerships are closed by a wicket; the one still open at the end of an innings counts if it scored
+    table = table[(table['closed'] == 1) | (table['runs'] > 0)].drop(columns='closed')
+
+    # Batsmen involved in each partnership (deliveries on which a wicket fell are not counted)
+    live_balls = balls[live == 1]
+    names = pd.concat([
+        live_balls[keys + ['batter']].rename(columns={'batter': 'name'}),
+        live_balls[keys + ['non_striker']].rename(columns={'non_striker': 'name'}),
+    ]).astype({'name': object}).drop_duplicates().sort_values('name')
+    batsmen = names.groupby(keys)['name'].agg(list).rename('batsmen')
+    table = table.join(batsmen, on=keys)
+    table['batsmen'] = [b if isinstance(b, list) else [] for b in table['batsmen']]
+
+    table['batting_team'] = table['batting_team'].astype(object)
+    table['season'] = table['match_id'].map(matches.set_index('id')['season'])
+    return table.reset_index(drop=True)
+
+# Player career cube: batting and bowling totals of every player keyed by
+# (player, role, opposing_team, season, phase)
+CUBE_MEASURES = ['runs', 'extras', 'runs_conceded', 'balls', 'fours', 'sixes', 'wickets']
+
+def build_player_cube(deliveries, matches):
+    facts = deliveries.assign(
+        season=season_of(deliveries, matches),
+        phase=over_phase(deliveries['over']),
+        runs=deliveries['batsman_runs'],
+        extras=deliveries['extra_runs'],
+        runs_conceded=deliveries['total_runs'],
+        balls=1,
+        fours=(deliveries['batsman_runs'] == 4).astype(int),
+        sixes=(deliveries['batsman_runs'] == 6).astype(int),
+        wickets=deliveries['is_wicket'],
+    )
+
+    cubes = []
+    for role, player, opposing_team in [('batting', 'batter', 'bowling_team'), ('bowling', 'bowler', 'batting_team')]:
+        cube = facts.groupby([player, opposing_team, 'season', 'phase'], observed=True, dropna=False)[CUBE_MEASURES].sum().reset_index()
+        cube = cube.rename(columns={player: 'player', opposing_team: 'opposing_team'}).assign(role=role)
+        cubes.append(cube.astype({'player': object, 'opposing_team': object}))
+
+    return pd.concat(cubes).set_index(['player', 'role', 'opposing_team', 'season', 'phase']).sort_index()
+
+# Player cube totals per (player, role), per (player, role, opposing_team) and per (player, role,
+# phase), as {levels: {key: measures}}, so a player endpoint's totals are one dict lookup
+# instead of a slice of the cube's MultiIndex
+PLAYER_ROLLUPS = [('player', 'role'), ('player', 'role', 'opposing_team'), ('player', 'role', 'phase')]
+
+def build_player_rollups(cube):
+    rollups = {}
+    for levels in PLAYER_ROLLUPS:
+        totals = cube[CUBE_MEASURES].astype('int64').groupby(level=list(levels), observed=True).sum()
+        rollups[levels] = dict(zip(totals.index, totals.to_numpy()))
+    return rollups
+
+# Rollups with the cube rows in delta added: only the keys delta touches change
+def update_player_rollups(rollups, delta):
+    updated = {}
+    for levels, totals in build_player_rollups(delta).items():
+        merged = dict(rollups[levels])
+        for key, values in totals.items():
+            merged[key] = merged[key] + values if key in merged else values
+        updated[levels] = merged
+    return updated
+
+# Index of table with categorical levels turned into plain values, so tables built from
+# frames with different categories can be merged
+def plain_index(table):
+    levels = [table.index.get_level_values(i).astype(object) for i in range(table.index.nlevels)]
+    return table.set_axis(pd.MultiIndex.from_arrays(levels, names=table.index.names))
+
+# Batter vs bowler totals and dismissal kinds of every pair, and dismissal kinds of every player
+def build_head_to_head(deliveries):
+    pairs = deliveries.groupby(['batter', 'bowler'], observed=True).agg(
+        balls=('is_wicket', 'size'),
+        runs=('batsman_runs', 'sum'),
+        dismissals=('is_wicket', 'sum'),
+    )
+    wickets = deliveries[deliveries['is_wicket'] == 1]
+    pair_dismissals = wickets.groupby(['batter', 'bowler', 'dismissal_kind'], observed=True).size()
+    player_dismissals = wickets.groupby(['player_dismissed', 'dismissal_kind'], observed=True, dropna=False).size()
+    return plain_index(pairs), plain_index(pair_dismissals), plain_index(player_dismissals)
+
+# Team phase matrix: batting and bowling totals of every team in every phase of every season,
+# from one phase-bucketed groupby per role
+def build_team_phase_matrix(deliveries, matches):
+    facts = deliveries[['batting_team', 'bowling_team', 'total_runs', 'is_wicket']].assign(
+        season=season_of(deliveries, matches),
+        phase=over_phase(deliveries['over']),
+        boundaries=deliveries['batsman_runs'].isin([4, 6]).astype(int),
+    )
+
+    matrices = []
+    for role, team in [('batting', 'batting_team'), ('bowling', 'bowling_team')]:
+        matrix = facts.groupby([team, 'season', 'phase'], observed=True, dropna=False).agg(
+            runs=('total_runs', 'sum'),
+            balls=('total_runs', 'size'),
+            boundaries=('boundaries', 'sum'),
+            wickets=('is_wicket', 'sum'),
+        ).reset_index()
+        matrices.append(matrix.rename(columns={team: 'team'}).assign(role=role).astype({'team': object}))
+
+    return pd.concat(matrices).set_index(['team', 'role', 'season', 'phase']).sort_index()
+
+# Canonical name registries: API inputs are resolved once (exact, alias such as franchise
+# renames, spelling variant or fuzzy match) before filtering on the categorical columns,
+# whose comparisons then run on integer category codes
+def column_names(frame, columns):
+    return set().union(*(frame[column].dropna().unique() for column in columns))
+
+def build_registries(deliveries, matches):
+    return name_registries(column_names(deliveries, ['batter', 'bowler', 'non_striker']), matches)
+
+def name_registries(player_names, matches):
+    return {
+        'player': registry.Registry(player_names | column_names(matches, ['player_of_match'])),
+        'team': registry.Registry(column_names(matches, ['team1', 'team2']), registry.TEAM_ALIASES),
+        'venue': registry.Registry(column_names(matches, ['venue']), registry.VENUE_ALIASES, group_key=registry.venue_key),
+        'city': registry.Registry(column_names(matches, ['city']), registry.CITY_ALIASES),
+    }
+
+# Every aggregate of a snapshot. build_aggregates builds them from the deliveries, the chunked
+# engine (chunked.build_aggregates) chunk by chunk and ingest updates them with new matches;
+# the additive TOTALS are built the same way (build_totals) in all three and merged with
+# merge_totals, and the tables derived from them by derived_aggregates.
+AGGREGATES = [
+    'match_offsets', 'inning_offsets', 'partnerships', 'player_cube', 'player_rollups', 'leaderboards',
+    'head_to_head', 'pair_dismissals', 'head_to_head_matrix', 'player_dismissals', 'team_phase',
+    'match_rollups', 'delivery_state', 'registries', 'search_index', 'player_form', 'pair_form',
+]
+TOTALS = ['player_cube', 'team_phase', 'head_to_head', 'pair_dismissals', 'player_dismissals']
+
+def build_totals(deliveries, matches):
+    pairs, pair_dismissals, player_dismissals = build_head_to_head(deliveries)
+    return {
+        'player_cube': build_player_cube(deliveries, matches),
+        'team_phase': build_team_phase_matrix(deliveries, matches),
+        'head_to_head': pairs,
+        'pair_dismissals': pair_dismissals,
+        'player_dismissals': player_dismissals,
+    }
+
+def derived_aggregates(totals, registries, matches):
+    return {
+        'player_rollups': build_player_rollups(totals['player_cube']),
+        'leaderboards': leaderboard.build_leaderboards(totals['player_cube']),
+        'head_to_head_matrix': headtohead.build_head_to_head_matrix(totals['head_to_head'], totals['pair_dismissals']),
+        'match_rollups': rollup.build_match_rollups(matches),
+        'registries': registries,
+        'search_index': search.build_search_index(registries, totals['player_cube'], matches),
+    }
+
+# Derived tables of a set of deliveries and matches
+def build_aggregates(deliveries, matches):
+    match_offsets, inning_offsets = build_match_index(deliveries)
+    totals = build_totals(deliveries, matches)
+    return {
+        'match_offsets': match_offsets,
+        'inning_offsets': inning_offsets,
+        'partnerships': build_partnerships(deliveries, matches),
+        'delivery_state': state.build_delivery_state(deliveries, matches),
+        'player_form': form.build_player_form(deliveries, matches),
+        'pair_form': form.build_pair_form(deliveries, matches),
+        **totals,
+        **derived_aggregates(totals, build_registries(deliveries, matches), matches),
+    }
+
+# Immutable view of the dataset: the frames, their indexes and all precomputed aggregates.
+# A request reads everything from one snapshot; updates build a new snapshot and swap it in.
+class Snapshot:
+    def __init__(self, df_del, df_match, version, aggregates):
+        self._df_del = df_del
+        self._df_match = df_match
+        self.version = version
+        for name, value in aggregates.items():
+            setattr(self, name, value)
+        self.players = self.registries['player']
+        self.teams = self.registries['team']
+        self.venues = self.registries['venue']
+        self.cities = self.registries['city']
+
+    # Reading a whole frame counts as scanning all of its rows; the accessors below count the rows they return
+    @property
+    def df_del(self):
+        metrics.scanned(len(self._df_del))
+        return self._df_del
+
+    @property
+    def df_match(self):
+        metrics.scanned(len(self._df_match))
+        return self._df_match
+
+    # Deliveries of a match, as a slice of the sorted deliveries frame
+    def match_deliveries(self, match_id):
+        start, stop = self.match_offsets.get(match_id, (0, 0))
+        metrics.scanned(stop - start)
+        return self._df_del.iloc[start:stop]
+
+    # Deliveries of one innings of a match
+    def inning_deliveries(self, match_id, inning):
+        start, stop = self.inning_offsets.get((match_id, inning), (0, 0))
+        metrics.scanned(stop - start)
+        return self._df_del.iloc[start:stop]
+
+    # Summed cube measures of a player in a role, optionally against one team or in one phase, as
+    # {measure: total}: one lookup in the player rollups. Returns None when the player has no
+    # deliveries matching the filters.
+    def player_totals(self, player_name, role, opposing_team=None, phase=None):
+        if opposing_team is not None and phase is not None:
+            raise ValueError("Filter on an opposing team or a phase, not both")
+        if opposing_team is not None:
+            levels, key = PLAYER_ROLLUPS[1], (player_name, role, opposing_team)
+        elif phase is not None:
+            levels, key = PLAYER_ROLLUPS[2], (player_name, role, phase)
+        else:
+            levels, key = PLAYER_ROLLUPS[0], (player_name, role)
+        totals = self.player_rollups[levels].get(key)
+        if totals is None:
+            return None
+        metrics.scanned(1)
+        return dict(zip(CUBE_MEASURES, totals.tolist()))
+
+    # Deliveries of several matches: their row ranges taken in one go
+    def matches_deliveries(self, match_ids):
+        rows = self.match_rows(match_ids)
+        metrics.scanned(len(rows))
+        return self._df_del.iloc[rows]
+
+    # Rows of the matches, each match once however often it is listed
+    def match_rows(self, match_ids):
+        ranges = [np.arange(*self.match_offsets[match_id]) for match_id in dict.fromkeys(match_ids) if match_id in self.match_offsets]
+        return np.concatenate(ranges) if ranges else []
+
+    # Innings state after every delivery of a match or of several (see state.py), row for row
+    # with match_deliveries / matches_deliveries
+    def match_state(self, match_id):
+        start, stop = self.match_offsets.get(match_id, (0, 0))
+        return self.delivery_state.iloc[start:stop]
+
+    def inning_state(self, match_id, inning):
+        start, stop = self.inning_offsets.get((match_id, inning), (0, 0))
+        return self.delivery_state.iloc[start:stop]
+
+    def matches_state(self, match_ids):
+        return self.delivery_state.iloc[self.match_rows(match_ids)]
+
+    # Summed cube measures of several players, by (player, role), or by (player, role, opposing_team)
+    # when opposing_teams is given: one isin selection of the cube and one groupby
+    def players_totals(self, player_names, opposing_teams=None):
+        mask = self.player_cube.index.get_level_values('player').isin(list(player_names))
+        levels = ['player', 'role']
+        if opposing_teams is not None:
+            mask &= self.player_cube.index.get_level_values('opposing_team').isin(list(opposing_teams))
+            levels.append('opposing_team')
+        metrics.scanned(len(self.player_cube))
+        return self.player_cube[mask].groupby(level=levels)[CUBE_MEASURES].sum()
+
+def build_snapshot(df_del, df_match, version):
+    return Snapshot(df_del, df_match, version, build_aggregates(df_del, df_match))
+
+# Snapshot of the dataset files
+def load_snapshot():
+    if CHUNK_ROWS:
+        return chunked.load_snapshot(DELIVERIES_PATH, MATCHES_PATH, CHUNK_ROWS)
+    df_del = shared.load_deliveries(SHARED_DIR, DELIVERIES_PATH) if SHARED_DIR else loader.load_deliveries(DELIVERIES_PATH)
+    df_match = loader.load_matches(MATCHES_PATH)
+    return build_snapshot(df_del, df_match, loader.dataset_version(DELIVERIES_PATH, MATCHES_PATH))
+
+# The published snapshot. Readers take the reference once and use it for the whole call;
+# replacing it is a single assignment, so readers never see a half-updated dataset.
+_current = None
+_update_lock = threading.Lock()
+
+# A request pins the snapshot published when it started, so all of its reads use one version
+# even if a reload swaps in a newer one meanwhile
+_pinned = contextvars.ContextVar('pinned_snapshot', default=None)
+
+# The pinned snapshot, else the published one; the dataset files are loaded on first use
+def current():
+    return _pinned.get() or _current or load()
+
+def pin():
+    return _pinned.set(_current)
+
+def unpin(token):
+    _pinned.reset(token)
+
+def publish(snapshot):
+    global _current
+    _current = snapshot
+
+def load():
+    if _current is None:
+        reload()
+    return _current
+
+# Hot reload.
+# The next snapshot is built from the dataset files while the current one keeps serving, then
+# swapped in. Matches added with ingest() but not written to the files are dropped on reload.
+_reloading = threading.Lock()
+_status = {"source_version": None, "last_reload": None, "error": None}
+
+def source_version():
+    return loader.dataset_version(DELIVERIES_PATH, MATCHES_PATH)
+
+# Rebuild and publish the snapshot if the files changed since the last load (or always, with force).
+# Returns True if a new snapshot was published.
+def reload(force=False):
+    with _update_lock:
+        if not force and _current is not None and source_version() == _status["source_version"]:
+            return False
+        snapshot = load_snapshot()
+        publish(snapshot)
+        _status.update(source_version=snapshot.version, last_reload=time.time(), error=None)
+        return True
+
+# Run reload on a background thread; returns False if a reload is already running
+def reload_in_background(force=False):
+    if not _reloading.acquire(blocking=False):
+        return False
+
+    def run():
+        try:
+            reload(force)
+        except Exception as e:  # a broken file keeps the current snapshot serving
+            _status["error"] = f"{type(e).__name__}: {e}"
+        finally:
+            _reloading.release()
+
+    threading.Thread(target=run, name='dataset-reload', daemon=True).start()
+    return True
+
+# Poll the dataset files every interval seconds and reload once a change has settled
+# (the same new version seen on two polls in a row, so files still being copied are not read)
+def watch(interval=5.0):
+    def run():
+        seen = None
+        while True:
+            time.sleep(interval)
+            try:
+                version = source_version()
+            except OSError:  # file being replaced
+                continue
+            if version != _status["source_version"] and version == seen:
+                reload_in_background()
+            seen = version
+
+    threading.Thread(target=run, name='dataset-watch', daemon=True).start()
+
+def reload_status():
+    return {**_status, "version": _current.version if _current else None, "reloading": _reloading.locked()}
+
+# Index rows added to table (a totals table from one of the builders): rows with existing keys are summed.
+# Integer sums are kept as int64: pandas sums small ints in the narrowest type that holds the
+# result, which the merged sums can outgrow. Both sides are widened before adding.
+def total_dtype(dtype):
+    return np.dtype('int64') if pd.api.types.is_integer_dtype(dtype) else dtype
+
+def widen_totals(table):
+    if isinstance(table, pd.DataFrame):
+        return table.astype({column: total_dtype(dtype) for column, dtype in table.dtypes.items()})
+    return table.astype(total_dtype(table.dtype))
+
+def merge_totals(table, delta):
+    if delta.empty:
+        return table
+    table = widen_totals(table)
+    merged = table.add(widen_totals(delta), fill_value=0)
+    return merged.astype(table.dtypes.to_dict() if isinstance(table, pd.DataFrame) else table.dtype).sort_index()
+
+# Incremental ingest of new matches.
+# The deliveries and match rows of match_ids not yet in the dataset are appended, the
+# aggregates of just these rows are built and merged into the current ones (only the keys
+# they touch change), and the result is published as a new snapshot. Reads keep being
+# served from the previous snapshot until the swap.
+def ingest(deliveries, matches):
+    with _update_lock:
+        # The latest published snapshot, not the one pinned to the calling request: an ingest or
+        # reload that finished since that request started must not be dropped
+        base = _current
+        if base is None:
+            raise RuntimeError("No dataset loaded to ingest into; call dataset.load() first")
+        new_del = pd.DataFrame(deliveries)
+        new_match = pd.DataFrame(matches)
+
+        if new_match.empty or 'id' not in new_match or new_del.empty or 'match_id' not in new_del:
+            return {"error": "Both deliveries and matches rows are required"}
+        repeated = new_match['id'].astype(int)
+        repeated = set(repeated[repeated.duplicated()])
+        if repeated:
+            return {"error": f"Match rows given more than once: {', '.join(map(str, sorted(repeated)))}"}
+        new_ids = set(new_match['id'].astype(int))
+        existing = new_ids & set(base.df_match['id'].astype(int))
+        if existing:
+            return {"error": f"Matches already loaded: {', '.join(map(str, sorted(existing)))}"}
+        unknown = set(new_del['match_id'].astype(int)) - new_ids
+        if unknown:
+            return {"error": f"Deliveries for matches without a match row: {', '.join(map(str, sorted(unknown)))}"}
+
+        try:
+            new_del = new_del.sort_values(['match_id', 'inning'], kind='stable', ignore_index=True)
+            df_del = loader.append_typed(base.df_del, new_del, loader.DELIVERY_CATEGORIES)
+            df_match = loader.append_typed(base.df_match, new_match, loader.MATCH_CATEGORIES)
+        except (ValueError, TypeError) as e:
+            return {"error": f"Invalid rows: {e}"}
+
+        first_row = len(base.df_del)
+        added_del = df_del.iloc[first_row:]
+        added_match = df_match.iloc[len(base.df_match):]
+        match_offsets, inning_offsets = build_match_index(added_del, first_row)
+        totals = build_totals(added_del, df_match)
+
+        # Registries are only rebuilt when new names appeared, from the names already known
+        # plus the new ones
+        registries = dict(base.registries)
+        new_names = {
+            'player': column_names(added_del, ['batter', 'bowler', 'non_striker']) | column_names(added_match, ['player_of_match']),
+            'team': column_names(added_match, ['team1', 'team2']),
+            'venue': column_names(added_match, ['venue']),
+            'city': column_names(added_match, ['city']),
+        }
+        if any(not names <= set(registries[kind].canonical) for kind, names in new_names.items()):
+            registries = name_registries(set(registries['player'].canonical) | new_names['player'], df_match)
+
+        aggregates = {
+            'match_offsets': {**base.match_offsets, **match_offsets},
+            'inning_offsets': {**base.inning_offsets, **inning_offsets},
+            'partnerships': pd.concat([base.partnerships, build_partnerships(added_del, df_match)], ignore_index=True),
+            'delivery_state': pd.concat([base.delivery_state, state.build_delivery_state(added_del, df_match)]),
+            'player_form': base.player_form.extend(form.player_rows(added_del, df_match)),
+            'pair_form': base.pair_form.extend(form.pair_rows(added_del, df_match)),
+            **{name: merge_totals(getattr(base, name), totals[name]) for name in TOTALS},
+            'player_rollups': update_player_rollups(base.player_rollups, totals['player_cube']),
+            'leaderboards': base.leaderboards.update(totals['player_cube']),
+            'head_to_head_matrix': base.head_to_head_matrix.update(totals['head_to_head'], totals['pair_dismissals']),
+            'match_rollups': rollup.build_match_rollups(df_match),
+            'registries': registries,
+            'search_index': base.search_index.update(registries, totals['player_cube'], added_match),
+        }
+
+        version = hashlib.sha1(f"{base.version}+{sorted(new_ids)}".encode()).hexdigest()[:12]
+        publish(Snapshot(df_del, df_match, version, aggregates))
+
+        return {
+            "version": version,
+            "matches_added": len(added_match),
+            "deliveries_added": len(added_del),
+            "total_matches": len(df_match),
+            "total_deliveries": len(df_del)
+        }
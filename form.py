@@ -0,0 +1,143 @@
+import copy
+
+import numpy as np
+import pandas as pd
+
+# Rolling and date-window form.
+# An innings table has one row per key (a player, or a batter-bowler pair) per match, ordered by
+# key, then match date. Running totals of its measures over the whole table (prefix sums, with
+# a leading zero row) give the sum of any row range [lo, hi) as totals[hi] - totals[lo]; since
+# the rows of a key are contiguous and date-ordered, a date window or the last N matches of a
+# key is two binary searches on its dates and one subtraction, whatever the window's length.
+
+PLAYER_MEASURES = ['runs', 'balls_faced', 'fours', 'sixes', 'wickets', 'runs_conceded', 'balls_bowled']
+PAIR_MEASURES = ['balls', 'runs', 'dismissals']
+
+def match_dates(deliveries, matches):
+    dates = pd.to_datetime(matches.set_index('id')['date'].astype(object)).dt.normalize()
+    return deliveries['match_id'].map(dates)
+
+# Batting and bowling totals of every player in every match, one row per (player, match_id)
+def player_rows(deliveries, matches):
+    facts = deliveries.assign(
+        fours=(deliveries['batsman_runs'] == 4).astype(int),
+        sixes=(deliveries['batsman_runs'] == 6).astype(int),
+    )
+    batting = facts.groupby(['batter', 'match_id'], observed=True).agg(
+        runs=('batsman_runs', 'sum'),
+        balls_faced=('batsman_runs', 'size'),
+        fours=('fours', 'sum'),
+        sixes=('sixes', 'sum'),
+    )
+    bowling = facts.groupby(['bowler', 'match_id'], observed=True).agg(
+        wickets=('is_wicket', 'sum'),
+        runs_conceded=('total_runs', 'sum'),
+        balls_bowled=('total_runs', 'size'),
+    )
+    batting.index = batting.index.set_names(['player', 'match_id'])
+    bowling.index = bowling.index.set_names(['player', 'match_id'])
+    rows = batting.join(bowling, how='outer').fillna(0).astype(int).reset_index()
+    rows['player'] = rows['player'].astype(object)
+    rows['date'] = match_dates(rows, matches)
+    return rows
+
+# Batter vs bowler totals in every match, with one count column per dismissal kind
+def pair_rows(deliveries, matches):
+    keys = ['batter', 'bowler', 'match_id']
+    rows = deliveries.groupby(keys, observed=True).agg(
+        balls=('is_wicket', 'size'),
+        runs=('batsman_runs', 'sum'),
+        dismissals=('is_wicket', 'sum'),
+    )
+    wickets = deliveries[deliveries['is_wicket'] == 1]
+    kinds = wickets.groupby(keys + ['dismissal_kind'], observed=True).size().unstack(fill_value=0)
+    kinds.columns = kinds.columns.astype(object)
+    rows = rows.join(kinds).fillna(0).astype(int).reset_index()
+    rows[['batter', 'bowler']] = rows[['batter', 'bowler']].astype(object)
+    rows['date'] = match_dates(rows, matches)
+    return rows
+
+# Innings table of rows keyed by the keys columns, with prefix sums of every other count column.
+# Rows are stored in blocks: the rows of a key are contiguous and date-ordered within one block.
+class PrefixTable:
+    def __init__(self, rows, keys):
+        self.keys = keys
+        self.measures = []
+        self.match_ids = rows['match_id'].to_numpy()[:0]
+        self.dates = rows['date'].to_numpy()[:0]
+        self.totals = np.zeros((1, 0), dtype=np.int64)
+        self.offsets = {}
+        self.append(rows)
+
+    # Append rows as a new block and point their keys at it
+    def append(self, rows):
+        measures = self.measures + [column for column in rows.columns if column not in self.keys + ['match_id', 'date'] + self.measures]
+        if len(measures) > len(self.measures):
+            # New count columns (e.g. a dismissal kind not seen before) are zero in the older blocks
+            self.totals = np.hstack([self.totals, np.zeros((len(self.totals), len(measures) - len(self.measures)), dtype=np.int64)])
+            self.measures = measures
+        rows = rows.fillna({column: 0 for column in rows.columns if column not in self.keys + ['date']})
+        rows = rows.sort_values(self.keys + ['date', 'match_id'], ignore_index=True)
+        values = rows.reindex(columns=self.measures, fill_value=0).to_numpy(np.int64)
+
+        first = len(self.dates)
+        self.match_ids = np.concatenate([self.match_ids, rows['match_id'].to_numpy()])
+        self.dates = np.concatenate([self.dates, rows['date'].to_numpy()])
+        self.totals = np.vstack([self.totals, self.totals[-1] + values.cumsum(axis=0)])
+
+        key_values = [rows[key].to_numpy() for key in self.keys]
+        changed = np.zeros(len(rows), dtype=bool)
+        changed[:1] = True
+        for column in key_values:
+            changed[1:] |= column[1:] != column[:-1]
+        starts = np.flatnonzero(changed)
+        stops = np.r_[starts[1:], len(rows)]
+        self.offsets.update({
+            tuple(column[start] for column in key_values) if len(self.keys) > 1 else key_values[0][start]: (first + int(start), first + int(stop))
+            for start, stop in zip(starts, stops)
+        })
+
+    # The stored rows of keys, as a frame of key columns, match_id, date and measures
+    def key_rows(self, keys):
+        ranges = [self.offsets[key] for key in keys if key in self.offsets]
+        positions = np.concatenate([np.arange(start, stop) for start, stop in ranges]) if ranges else np.zeros(0, dtype=int)
+        lengths = [stop - start for start, stop in ranges]
+        found = [key if len(self.keys) > 1 else (key,) for key in keys if key in self.offsets]
+        rows = pd.DataFrame({name: np.repeat(np.array([key[i] for key in found], dtype=object), lengths) for i, name in enumerate(self.keys)})
+        rows['match_id'] = self.match_ids[positions]
+        rows['date'] = self.dates[positions]
+        counts = self.totals[positions + 1] - self.totals[positions]
+        for i, measure in enumerate(self.measures):
+            rows[measure] = counts[:, i]
+        return rows
+
+    # Totals of key's matches dated from start to end (inclusive, None for open-ended), limited
+    # to the last last_n of them. Returns (totals by measure, first date, last date, matches),
+    # or None when the key has no match in the window.
+    def window(self, key, start=None, end=None, last_n=None):
+        first, stop = self.offsets.get(key, (0, 0))
+        dates = self.dates[first:stop]
+        lo = first + (np.searchsorted(dates, start, 'left') if start is not None else 0)
+        hi = first + (np.searchsorted(dates, end, 'right') if end is not None else len(dates))
+        if last_n is not None:
+            lo = max(lo, hi - last_n)
+        if hi <= lo:
+            return None
+        totals = pd.Series(self.totals[hi] - self.totals[lo], index=self.measures)
+        return totals, self.dates[lo], self.dates[hi - 1], int(hi - lo)
+
+    # Table with more rows (e.g. of newly ingested matches). Only the keys in rows change: their
+    # old and new rows are appended as one block and their offsets moved to it; their old block
+    # stays unused until the next full build, and no other key's rows are moved or re-sorted.
+    def extend(self, rows):
+        keys = list(dict.fromkeys(zip(*(rows[key] for key in self.keys)) if len(self.keys) > 1 else rows[self.keys[0]]))
+        table = copy.copy(self)
+        table.offsets = dict(self.offsets)
+        table.append(pd.concat([self.key_rows(keys), rows], ignore_index=True))
+        return table
+
+def build_player_form(deliveries, matches):
+    return PrefixTable(player_rows(deliveries, matches), ['player'])
+
+def build_pair_form(deliveries, matches):
+    return PrefixTable(pair_rows(deliveries, matches), ['batter', 'bowler'])
@@ -0,0 +1,132 @@
+import numpy as np
+import pandas as pd
+
+# Sparse batter x bowler matrix.
+# Only pairs that met are stored, in CSR layout: players get integer IDs (positions in the sorted
+# list of names), the stored pairs are ordered by batter ID then bowler ID, and indptr[i] to
+# indptr[i + 1] is the range of batter i's pairs, whose bowler IDs (indices) are sorted. Each
+# stored pair has one row of data: balls, runs, dismissals and one count per dismissal kind.
+# A second ordering of the same pairs by bowler (colptr / column_order) serves whole columns.
+MEASURES = ['balls', 'runs', 'dismissals']
+
+class HeadToHeadMatrix:
+    # names: sorted player names; rows, columns: batter and bowler IDs of the stored pairs, in
+    # batter then bowler order; data: their counts; column_order: the pairs in bowler then batter order
+    def __init__(self, names, kinds, rows, columns, data, column_order):
+        self.names = names
+        self.ids = {name: i for i, name in enumerate(self.names)}
+        self.kinds = kinds
+        self.measures = MEASURES + self.kinds
+        self.rows = rows
+        self.indices = columns
+        self.indptr = np.searchsorted(rows, np.arange(len(self.names) + 1))
+        self.data = data
+        self.column_order = column_order
+        self.column_rows = rows[column_order]
+        self.colptr = np.searchsorted(columns[column_order], np.arange(len(self.names) + 1))
+
+    # From the head_to_head totals and pair_dismissals counts of dataset.build_head_to_head
+    @classmethod
+    def from_totals(cls, pairs, pair_dismissals):
+        batters = pairs.index.get_level_values('batter')
+        bowlers = pairs.index.get_level_values('bowler')
+        names = np.array(sorted(set(batters) | set(bowlers)), dtype=object)
+
+        rows = pd.Index(names).get_indexer(batters)
+        columns = pd.Index(names).get_indexer(bowlers)
+        order = np.lexsort((columns, rows))
+        rows, columns = rows[order], columns[order]
+
+        kinds = pair_dismissals.unstack('dismissal_kind', fill_value=0).reindex(pairs.index, fill_value=0)
+        data = np.column_stack([pairs[MEASURES].to_numpy(), kinds.to_numpy()]).astype(np.int64)[order]
+        return cls(names, list(kinds.columns), rows, columns, data, np.lexsort((rows, columns)))
+
+    # Matrix with the totals of new deliveries added (same arguments as from_totals): pairs that
+    # met before get their counts added, new pairs are inserted at their sorted positions in both
+    # orders. No other pair is regrouped or re-sorted; new players and dismissal kinds only
+    # renumber the IDs and widen the rows.
+    def update(self, pairs, pair_dismissals):
+        delta = HeadToHeadMatrix.from_totals(pairs, pair_dismissals)
+        names = self.names
+        if not all(name in self.ids for name in delta.names):
+            names = np.array(sorted(set(self.names) | set(delta.names)), dtype=object)
+        kinds = sorted(set(self.kinds) | set(delta.kinds)) if set(delta.kinds) - set(self.kinds) else self.kinds
+        size = len(names)
+
+        rows, columns = self.coordinates(names)
+        new_rows, new_columns = delta.coordinates(names)
+        data, new_data = self.counts(kinds), delta.counts(kinds)
+
+        keys = rows * size + columns
+        new_keys = new_rows * size + new_columns
+        positions = np.searchsorted(keys, new_keys)
+        met = positions < len(keys)
+        met[met] = keys[positions[met]] == new_keys[met]
+        data[positions[met]] += new_data[met]
+
+        # Pairs that never met before; np.insert places the k-th of them at position + k
+        added = ~met
+        positions = positions[added]
+        inserted = positions + np.arange(len(positions))
+        moved = np.arange(len(keys)) + np.searchsorted(positions, np.arange(len(keys)), 'right')
+
+        column_keys = (columns * size + rows)[self.column_order]
+        new_column_keys = new_columns[added] * size + new_rows[added]
+        by_column = np.argsort(new_column_keys, kind='stable')
+        column_order = np.insert(moved[self.column_order], np.searchsorted(column_keys, new_column_keys[by_column]), inserted[by_column])
+
+        return HeadToHeadMatrix(
+            names, kinds,
+            np.insert(rows, positions, new_rows[added]),
+            np.insert(columns, positions, new_columns[added]),
+            np.insert(data, positions, new_data[added], axis=0),
+            column_order,
+        )
+
+    # Batter and bowler IDs of the stored pairs among names (a superset of this matrix's names)
+    def coordinates(self, names):
+        ids = np.searchsorted(names, self.names) if names is not self.names else np.arange(len(self.names))
+        return ids[self.rows], ids[self.indices]
+
+    # A copy of the counts with one column per dismissal kind in kinds (a superset of this matrix's)
+    def counts(self, kinds):
+        if kinds == self.kinds:
+            return self.data.copy()
+        data = np.zeros((len(self.data), len(MEASURES) + len(kinds)), dtype=np.int64)
+        data[:, :len(MEASURES)] = self.data[:, :len(MEASURES)]
+        for i, kind in enumerate(self.kinds):
+            data[:, len(MEASURES) + kinds.index(kind)] = self.data[:, len(MEASURES) + i]
+        return data
+
+    # Counts of one pair as {measure: count}, or None if they never met
+    def pair(self, batter, bowler):
+        i, j = self.ids.get(batter), self.ids.get(bowler)
+        if i is None or j is None:
+            return None
+        start, stop = self.indptr[i], self.indptr[i + 1]
+        position = start + np.searchsorted(self.indices[start:stop], j)
+        if position == stop or self.indices[position] != j:
+            return None
+        return dict(zip(self.measures, self.data[position].tolist()))
+
+    # Every bowler the batter faced, as a frame of counts indexed by bowler name
+    def row(self, batter):
+        i = self.ids.get(batter)
+        if i is None:
+            return self.frame([], [])
+        positions = np.arange(self.indptr[i], self.indptr[i + 1])
+        return self.frame(positions, self.indices[positions])
+
+    # Every batter who faced the bowler, indexed by batter name
+    def column(self, bowler):
+        j = self.ids.get(bowler)
+        if j is None:
+            return self.frame([], [])
+        start, stop = self.colptr[j], self.colptr[j + 1]
+        return self.frame(self.column_order[start:stop], self.column_rows[start:stop])
+
+    def frame(self, positions, players):
+        return pd.DataFrame(self.data[positions], index=pd.Index(self.names[players], name='player'), columns=self.measures)
+
+def build_head_to_head_matrix(pairs, pair_dismissals):
+    return HeadToHeadMatrix.from_totals(pairs, pair_dismissals)
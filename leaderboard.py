@@ -0,0 +1,108 @@
+import numpy as np
+
+# Precomputed leaderboards.
+# The player cube (see dataset.build_player_cube) is summed once per (role, season, phase),
+# with None for all seasons or all phases, into boards of one row per player; each board keeps
+# the players' rank order under every metric of its role, so a top-k query is a balls filter
+# over a precomputed order and a slice, whatever the number of players.
+# New deliveries only rebuild the boards of the roles, seasons and phases they touch (and the
+# all-season / all-phase boards above them); every other board is shared with the old snapshot.
+MEASURES = ['runs', 'balls', 'fours', 'sixes', 'wickets', 'runs_conceded']
+
+# metric: (role, value of a board's rows, higher is better)
+METRICS = {
+    'runs': ('batting', lambda t: t['runs'], True),
+    'sixes': ('batting', lambda t: t['sixes'], True),
+    'fours': ('batting', lambda t: t['fours'], True),
+    'strike_rate': ('batting', lambda t: t['runs'] / t['balls'] * 100, True),
+    'wickets': ('bowling', lambda t: t['wickets'], True),
+    'economy': ('bowling', lambda t: t['runs_conceded'] / t['balls'] * 6, False),
+}
+
+# Balls a player needs, when the query gives no min_balls, to be ranked under a rate metric:
+# ten overs faced or bowled, so one short innings or spell cannot top the board
+DEFAULT_MIN_BALLS = {'strike_rate': 60, 'economy': 60}
+
+# Measures shown with each role's leaders
+ROLE_MEASURES = {
+    'batting': ['runs', 'balls', 'fours', 'sixes'],
+    'bowling': ['wickets', 'runs_conceded', 'balls'],
+}
+
+# Totals of one (role, season, phase), one row per player (sorted by name, which breaks ties)
+class Board:
+    def __init__(self, role, table):
+        self.table = table.sort_index()
+        self.players = self.table.index.to_numpy()
+        self.columns = {measure: self.table[measure].to_numpy() for measure in MEASURES}
+        self.balls = self.columns['balls']
+        self.values, self.orders = {}, {}
+        for metric, (metric_role, value, descending) in METRICS.items():
+            if metric_role != role:
+                continue
+            with np.errstate(divide='ignore', invalid='ignore'):
+                values = value(self.table).to_numpy(float)
+            self.values[metric] = values
+            # Players without balls have no rate; they are ranked last and never returned
+            order = np.argsort(-values if descending else values, kind='stable')
+            self.orders[metric] = order[np.isfinite(values[order])]
+
+    # Positions of the best k players with at least min_balls balls under metric
+    def top(self, metric, min_balls, k):
+        order = self.orders[metric]
+        if min_balls:
+            order = order[self.balls[order] >= min_balls]
+        return order[:k]
+
+def season_phase_totals(cube):
+    base = cube[MEASURES].astype('int64').groupby(level=['role', 'season', 'phase', 'player'], observed=True).sum()
+    tables = {}
+    for levels in [['role', 'season', 'phase'], ['role', 'season'], ['role', 'phase'], ['role']]:
+        totals = base.groupby(level=levels + ['player'], observed=True).sum()
+        for key, table in totals.groupby(level=levels, observed=True):
+            key = dict(zip(levels, key if isinstance(key, tuple) else (key,)))
+            season = int(key['season']) if 'season' in key else None
+            tables[(key['role'], season, key.get('phase'))] = table.droplevel(levels)
+    return tables
+
+class Leaderboards:
+    def __init__(self, boards):
+        self.boards = boards
+
+    @classmethod
+    def from_cube(cls, cube):
+        return cls({key: Board(key[0], table) for key, table in season_phase_totals(cube).items()})
+
+    # Leaderboards with the player cube rows in delta added: only the boards they touch are rebuilt
+    def update(self, delta):
+        boards = dict(self.boards)
+        for key, table in season_phase_totals(delta).items():
+            board = self.boards.get(key)
+            if board is not None:
+                table = board.table.add(table, fill_value=0).astype('int64')
+            boards[key] = Board(key[0], table)
+        return Leaderboards(boards)
+
+    # Best k players under metric in a season and phase (None for all), as records of rank,
+    # player, the metric and the role's measures; rates are rounded to 2 decimals.
+    # min_balls=None takes the metric's DEFAULT_MIN_BALLS
+    def top(self, metric, season=None, phase=None, min_balls=None, k=10):
+        role = METRICS[metric][0]
+        if min_balls is None:
+            min_balls = DEFAULT_MIN_BALLS.get(metric, 0)
+        board = self.boards.get((role, season, phase))
+        if board is None:
+            return []
+        leaders = []
+        for rank, position in enumerate(board.top(metric, min_balls, k), start=1):
+            value = board.values[metric][position]
+            leaders.append({
+                "rank": rank,
+                "player": str(board.players[position]),
+                metric: int(value) if metric in ROLE_MEASURES[role] else round(float(value), 2),
+                **{measure: int(board.columns[measure][position]) for measure in ROLE_MEASURES[role] if measure != metric},
+            })
+        return leaders
+
+def build_leaderboards(player_cube):
+    return Leaderboards.from_cube(player_cube)
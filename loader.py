@@ -0,0 +1,140 @@
+import hashlib
+import json
+import os
+
+import pandas as pd
+
+try:
+    import pyarrow.feather as feather
+except ImportError:  # no columnar cache without pyarrow, the CSVs are parsed on every start
+    feather = None
+
+CACHE_DIR = '.cache'
+
+# Bumped whenever the cached layout changes (column types, row order), invalidating old caches
+CACHE_VERSION = 2
+
+# Column types of the cleaned datasets.
+# Columns holding the same kind of value (players, teams) share one categorical dtype
+# so they can be compared with each other.
+DELIVERY_INTS = {
+    'match_id': 'int32', 'inning': 'int8', 'over': 'int8', 'ball': 'int8',
+    'batsman_runs': 'int8', 'extra_runs': 'int8', 'total_runs': 'int8', 'is_wicket': 'int8',
+}
+DELIVERY_CATEGORIES = {
+    'teams': ['batting_team', 'bowling_team'],
+    'players': ['batter', 'bowler', 'non_striker', 'player_dismissed', 'fielder'],
+    'extras_type': ['extras_type'],
+    'dismissal_kind': ['dismissal_kind'],
+}
+
+MATCH_INTS = {'id': 'int32', 'season': 'int16'}
+MATCH_CATEGORIES = {
+    'teams': ['team1', 'team2', 'toss_winner', 'winner'],
+    'umpires': ['umpire1', 'umpire2'],
+    'city': ['city'], 'venue': ['venue'], 'match_type': ['match_type'],
+    'player_of_match': ['player_of_match'], 'toss_decision': ['toss_decision'],
+    'result': ['result'], 'super_over': ['super_over'], 'method': ['method'],
+}
+
+# Parse a cleaned CSV and convert it to compact column types, optionally sorted (stable)
+def read_typed_csv(path, ints, categories, sort_by=None):
+    return typed_frame(pd.read_csv(path), ints, categories, sort_by)
+
+def typed_frame(df, ints, categories, sort_by=None):
+    df = df.drop(columns=[column for column in df.columns if column.startswith('Unnamed:')])
+    if sort_by:
+        df = df.sort_values(sort_by, kind='stable', ignore_index=True)
+
+    for column, dtype in ints.items():
+        if column in df.columns and df[column].notna().all():
+            df[column] = df[column].astype(dtype)
+
+    for columns in categories.values():
+        columns = [column for column in columns if column in df.columns]
+        values = pd.concat([df[column] for column in columns]).dropna().unique() if columns else []
+        dtype = pd.CategoricalDtype(sorted(values))
+        for column in columns:
+            df[column] = df[column].astype(dtype)
+
+    return df
+
+# Append rows (a DataFrame or a list of records) to a typed frame, keeping its column types.
+# Categories are extended with any new names, per shared group, without changing existing codes.
+# Returns a new frame; df is left untouched.
+def append_typed(df, rows, categories):
+    rows = pd.DataFrame(rows).reindex(columns=df.columns)
+
+    columns = {}
+    for group in categories.values():
+        group = [column for column in group if column in df.columns]
+        if not group or not isinstance(df[group[0]].dtype, pd.CategoricalDtype):
+            continue
+        dtype = df[group[0]].dtype
+        values = pd.concat([rows[column] for column in group]).dropna().unique()
+        added = sorted(value for value in values if value not in dtype.categories)
+        if added:
+            dtype = pd.CategoricalDtype(list(dtype.categories) + added)
+            columns.update({column: df[column].cat.set_categories(dtype.categories) for column in group})
+        rows = rows.astype({column: dtype for column in group})
+
+    others = {column: df[column].dtype for column in df.columns if not isinstance(df[column].dtype, pd.CategoricalDtype)}
+    rows = rows.astype(others)
+    return pd.concat([df.assign(**columns) if columns else df, rows], ignore_index=True)
+
+def file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+# Load a CSV through its columnar cache.
+# The cache is reused while the source mtime and size are unchanged; when the mtime
+# changes the source is hashed, and the cache is rebuilt only if the content changed.
+def load_table(path, ints, categories, cache_dir=CACHE_DIR, sort_by=None):
+    if feather is None:
+        return read_typed_csv(path, ints, categories, sort_by)
+
+    name = os.path.splitext(os.path.basename(path))[0]
+    cache_path = os.path.join(cache_dir, name + '.feather')
+    meta_path = os.path.join(cache_dir, name + '.json')
+    stat = os.stat(path)
+    source = {'mtime': stat.st_mtime, 'size': stat.st_size, 'version': CACHE_VERSION}
+
+    meta = None
+    if os.path.exists(cache_path) and os.path.exists(meta_path):
+        with open(meta_path) as f:
+            meta = json.load(f)
+
+    if meta is not None and meta.get('version') == CACHE_VERSION and meta['size'] == source['size']:
+        if meta['mtime'] == source['mtime']:
+            return feather.read_table(cache_path, memory_map=True).to_pandas()
+        source['sha256'] = file_hash(path)
+        if meta['sha256'] == source['sha256']:
+            write_meta(meta_path, source)
+            return feather.read_table(cache_path, memory_map=True).to_pandas()
+
+    df = read_typed_csv(path, ints, categories, sort_by)
+    os.makedirs(cache_dir, exist_ok=True)
+    feather.write_feather(df, cache_path, compression='uncompressed')
+    source.setdefault('sha256', file_hash(path))
+    write_meta(meta_path, source)
+    return df
+
+# Short identifier of the current state of the source files; changes whenever any of them changes
+def dataset_version(*paths):
+    stamps = [(os.path.abspath(path), os.stat(path).st_mtime_ns, os.stat(path).st_size) for path in paths]
+    return hashlib.sha1(json.dumps(stamps).encode()).hexdigest()[:12]
+
+def write_meta(meta_path, source):
+    with open(meta_path, 'w') as f:
+        json.dump(source, f)
+
+# Deliveries come sorted by (match_id, inning), so every match and every innings is a
+# contiguous block of rows (the stable sort keeps ball order inside an innings)
+def load_deliveries(path='cleaned_del.csv', cache_dir=CACHE_DIR):
+    return load_table(path, DELIVERY_INTS, DELIVERY_CATEGORIES, cache_dir, sort_by=['match_id', 'inning'])
+
+def load_matches(path='cleaned_match.csv', cache_dir=CACHE_DIR):
+    return load_table(path, MATCH_INTS, MATCH_CATEGORIES, cache_dir)
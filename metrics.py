@@ -0,0 +1,198 @@
+import contextvars
+import functools
+import inspect
+import math
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter, deque
+
+# Instrumentation: latency of every route and api function, rows scanned and (with
+# IPL_TRACE_MEMORY=1, which slows every allocation down) peak memory of every api call,
+# and response cache hits and misses per route. Rendered in Prometheus text format by /metrics.
+QUANTILES = [0.5, 0.95, 0.99]
+
+# Quantiles are computed over the last WINDOW observations of each series
+WINDOW = int(os.environ.get('IPL_METRICS_WINDOW', 1024))
+TRACE_MEMORY = os.environ.get('IPL_TRACE_MEMORY', '').lower() in ('1', 'true', 'yes')
+
+METRICS = {
+    'ipl_request_duration_seconds': ('summary', 'Latency of each route'),
+    'ipl_function_duration_seconds': ('summary', 'Latency of each api function'),
+    'ipl_function_rows_scanned': ('summary', 'Dataset rows read by each api function call'),
+    'ipl_function_memory_peak_bytes': ('summary', 'Peak memory allocated during each api function call'),
+    'ipl_response_cache_hits_total': ('counter', 'Requests answered from the response cache'),
+    'ipl_response_cache_misses_total': ('counter', 'Cacheable requests that had to be computed'),
+    'ipl_response_cache_entries': ('gauge', 'Responses held in the response cache'),
+    'ipl_response_cache_evictions_total': ('counter', 'Responses evicted from the response cache'),
+}
+
+# Count, sum and recent values of one series
+class Summary:
+    def __init__(self):
+        self.count = 0
+        self.sum = 0.0
+        self.recent = deque(maxlen=WINDOW)
+
+    def observe(self, value):
+        self.count += 1
+        self.sum += value
+        self.recent.append(value)
+
+    # Nearest-rank quantiles of the recent values
+    def quantiles(self):
+        values = sorted(self.recent)
+        return {q: values[max(0, math.ceil(q * len(values)) - 1)] for q in QUANTILES} if values else {}
+
+_lock = threading.Lock()
+summaries = {}
+counters = Counter()
+
+def observe(metric, labels, value):
+    with _lock:
+        summaries.setdefault((metric, labels), Summary()).observe(value)
+
+def increment(metric, labels, amount=1):
+    with _lock:
+        counters[(metric, labels)] += amount
+
+def reset():
+    with _lock:
+        summaries.clear()
+        counters.clear()
+
+# Everything recorded since the last drain, cleared from this process: a pool worker sends it
+# back with each result so the parent can merge it into the series served by /metrics
+def drain():
+    with _lock:
+        recorded = {
+            'summaries': {key: (summary.count, summary.sum, list(summary.recent)) for key, summary in summaries.items()},
+            'counters': dict(counters),
+        }
+        summaries.clear()
+        counters.clear()
+    return recorded
+
+def merge(recorded):
+    with _lock:
+        for key, (count, total, recent) in recorded['summaries'].items():
+            summary = summaries.setdefault(key, Summary())
+            summary.count += count
+            summary.sum += total
+            summary.recent.extend(recent)
+        counters.update(recorded['counters'])
+
+# Rows scanned by the running api call (see instrument); dataset accessors report them through scanned()
+_rows = contextvars.ContextVar('rows_scanned', default=None)
+
+def scanned(rows):
+    counter = _rows.get()
+    if counter is not None:
+        counter[0] += rows
+
+# Wrap an api function to record its latency, rows scanned and peak memory.
+# Calls made inside it count towards its own rows too.
+def instrument(func):
+    labels = (('function', func.__name__),)
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        counter = [0]
+        token = _rows.set(counter)
+        tracing = TRACE_MEMORY and tracemalloc.is_tracing()
+        if tracing:
+            start_memory = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            observe('ipl_function_duration_seconds', labels, time.perf_counter() - start)
+            observe('ipl_function_rows_scanned', labels, counter[0])
+            if tracing:
+                observe('ipl_function_memory_peak_bytes', labels, max(0, tracemalloc.get_traced_memory()[1] - start_memory))
+            _rows.reset(token)
+            scanned(counter[0])
+
+    return wrapper
+
+# Replace every public function defined in module, other than the helpers named in skip, with
+# its instrumented version (calls between the module's functions go through the wrappers too).
+# Helpers are left out: they run inside an entry point, which already counts their time and
+# rows, and the wrapper would only add its cost to every call.
+def instrument_module(module, skip=()):
+    if TRACE_MEMORY and not tracemalloc.is_tracing():
+        tracemalloc.start()
+    for name, func in list(vars(module).items()):
+        if (inspect.isfunction(func) and func.__module__ == module.__name__ and not name.startswith('_')
+                and name not in skip):
+            setattr(module, name, instrument(func))
+
+# Sampling profiler for one thread: its stack is sampled every interval seconds on a
+# background thread, and the samples are reported per stack (collapsed, outermost first)
+class SamplingProfiler:
+    def __init__(self, thread_id, interval=0.002):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self.samples = 0
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self.run, name='profiler', daemon=True)
+
+    def start(self):
+        self.started = time.perf_counter()
+        self.thread.start()
+        return self
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                frame = frame.f_back
+            if stack:
+                self.stacks[';'.join(reversed(stack))] += 1
+                self.samples += 1
+
+    def stop(self, top=50):
+        self.stopped.set()
+        self.thread.join()
+        return {
+            "duration_ms": round((time.perf_counter() - self.started) * 1000, 3),
+            "interval_ms": self.interval * 1000,
+            "samples": self.samples,
+            "stacks": [{"stack": stack, "samples": count} for stack, count in self.stacks.most_common(top)],
+        }
+
+def format_labels(labels):
+    if not labels:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in labels)
+    return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(labels, escaped)) + '}'
+
+# All series in Prometheus text exposition format; gauges maps extra (metric, labels) to values
+def render(gauges=None):
+    with _lock:
+        series = {}
+        for (metric, labels), summary in summaries.items():
+            lines = series.setdefault(metric, [])
+            for q, value in summary.quantiles().items():
+                lines.append(f"{metric}{format_labels(labels + (('quantile', q),))} {value:.6g}")
+            lines.append(f"{metric}_sum{format_labels(labels)} {summary.sum:.6g}")
+            lines.append(f"{metric}_count{format_labels(labels)} {summary.count}")
+        for (metric, labels), value in sorted(counters.items()):
+            series.setdefault(metric, []).append(f"{metric}{format_labels(labels)} {value}")
+    for (metric, labels), value in (gauges or {}).items():
+        series.setdefault(metric, []).append(f"{metric}{format_labels(labels)} {value}")
+
+    out = []
+    for metric in sorted(series):
+        kind, description = METRICS.get(metric, ('untyped', metric))
+        out.append(f"# HELP {metric} {description}")
+        out.append(f"# TYPE {metric} {kind}")
+        out.extend(series[metric])
+    return '\n'.join(out) + '\n'
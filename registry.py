@@ -0,0 +1,124 @@
+import difflib
+import re
+
+# Franchise renames and alternate spellings, mapped to the name used in the dataset.
+# Aliases whose target is not in the dataset are ignored.
+TEAM_ALIASES = {
+    'Delhi Daredevils': 'Delhi Capitals',
+    'Punjab Kings': 'Kings XI Punjab',
+    'Royal Challengers Bengaluru': 'Royal Challengers Bangalore',
+    'Deccan Chargers': 'Sunrisers Hyderabad',
+    'Pune Warriors India': 'Pune Warriors',
+    'Rising Pune Supergiant': 'Pune Warriors',
+    'Rising Pune Supergiants': 'Pune Warriors',
+    'Gujarat Lions': 'Gujarat Titans',
+}
+
+# Grounds that were renamed
+VENUE_ALIASES = {
+    'Feroz Shah Kotla': 'Arun Jaitley Stadium',
+    'Sardar Patel Stadium, Motera': 'Narendra Modi Stadium, Ahmedabad',
+    'Punjab Cricket Association Stadium, Mohali': 'Punjab Cricket Association IS Bindra Stadium',
+}
+
+CITY_ALIASES = {
+    'Bangalore': 'Bengaluru',
+    'Bombay': 'Mumbai',
+    'Madras': 'Chennai',
+    'Calcutta': 'Kolkata',
+}
+
+# Lookup form of a name: case, dots and extra spaces do not matter
+def normalize(name):
+    return re.sub(r'\s+', ' ', name.replace('.', ' ')).strip().lower()
+
+# "Mahendra Singh Dhoni", "M S Dhoni" and "MS Dhoni" all become "ms dhoni":
+# initials of every name but the last (all-caps tokens are already initials) plus the surname
+def initials_key(name):
+    tokens = name.replace('.', ' ').split()
+    if len(tokens) < 2:
+        return None
+    initials = ''.join(token if token.isupper() else token[0] for token in tokens[:-1])
+    return f"{initials} {tokens[-1]}".lower()
+
+# Venue names differ in the city suffix ("Eden Gardens" / "Eden Gardens, Kolkata")
+def venue_key(name):
+    return normalize(name.split(',')[0])
+
+# Canonical ID registry of one kind of name (players, teams, venues or cities).
+# Names that share a group key, or that are joined by an alias, are variants of one
+# entity; the shortest of them is its canonical name. IDs are positions in the sorted
+# list of canonical names.
+class Registry:
+    def __init__(self, names, aliases=None, group_key=None, cutoff=0.85):
+        names = sorted({name for name in names if isinstance(name, str)})
+        aliases = aliases or {}
+        self.cutoff = cutoff
+
+        groups = {}
+        for name in names:
+            groups.setdefault(group_key(name) if group_key else name, []).append(name)
+        self.canonical = {}
+        for members in groups.values():
+            head = min(members, key=len)
+            for member in members:
+                self.canonical[member] = head
+        for alias, target in aliases.items():
+            if alias in self.canonical and target in self.canonical:
+                old, new = self.canonical[alias], self.canonical[target]
+                for member, head in self.canonical.items():
+                    if head == old:
+                        self.canonical[member] = new
+
+        self.names = sorted(set(self.canonical.values()))
+        self.ids = {name: i for i, name in enumerate(self.names)}
+        self.variants = {}
+        for member, head in self.canonical.items():
+            self.variants.setdefault(head, []).append(member)
+
+        # Aliases of names in the dataset, by canonical name of their target
+        self.aliases = {alias: self.canonical[target] for alias, target in aliases.items() if target in self.canonical and alias not in self.canonical}
+
+        self.lookup = {}
+        for name in names:
+            self.lookup.setdefault(normalize(name), self.canonical[name])
+        for alias, target in aliases.items():
+            if target in self.canonical:
+                self.lookup.setdefault(normalize(alias), self.canonical[target])
+
+        # Initials keys are only used when they point to a single entity
+        by_initials = {}
+        for name in names:
+            key = initials_key(name)
+            if key:
+                by_initials.setdefault(key, set()).add(self.canonical[name])
+        self.initials = {key: heads.pop() for key, heads in by_initials.items() if len(heads) == 1}
+
+    # Canonical name for an exact, aliased or differently spelled name (case, dots, spacing,
+    # unambiguous initials), or None. With fuzzy, a misspelled name resolves to its closest match
+    # above the cutoff; that is a guess that can name someone else ("CSK P31" -> "CSK P3"), so
+    # only name lookups (/resolve) use it, never the data queries.
+    def resolve(self, name, fuzzy=False):
+        if not isinstance(name, str):
+            return None
+        if name in self.canonical:
+            return self.canonical[name]
+        key = normalize(name)
+        if key in self.lookup:
+            return self.lookup[key]
+        initials = initials_key(name)
+        if initials in self.initials:
+            return self.initials[initials]
+        if not fuzzy:
+            return None
+        match = difflib.get_close_matches(key, self.lookup.keys(), n=1, cutoff=self.cutoff)
+        return self.lookup[match[0]] if match else None
+
+    def id(self, name):
+        canonical = self.resolve(name)
+        return self.ids[canonical] if canonical is not None else None
+
+    # Every spelling of the entity as it appears in the dataset
+    def variants_of(self, name):
+        canonical = self.resolve(name)
+        return self.variants[canonical] if canonical is not None else []
@@ -0,0 +1,123 @@
+import numpy as np
+import pandas as pd
+
+# Match rollup cubes.
+# Match outcomes are summed over every combination of the match dimensions that occurs, once
+# per match (match cube) and once per match and team taking part (team cube, where wins are the
+# team's own wins). A cube has at most one row per match, or per match and team, and usually
+# far fewer; any grouping and filtering of the dimensions is then a selection and a bincount
+# over the cube instead of a pass over the matches.
+DIMENSIONS = ['season', 'city', 'venue', 'team', 'toss_decision', 'result']
+MEASURES = ['matches', 'wins', 'toss_wins', 'target_sum', 'target_count']
+METRICS = ['count', 'wins', 'toss_wins', 'mean_target', 'margin_histogram']
+
+# Margin bins of wins by runs (0-9, 10-19, ..., 130-139, 140+); wins by wickets are binned by
+# the number of wickets
+RUN_BINS = list(range(0, 141, 10)) + [float('inf')]
+RUN_LABELS = [f"{low}-{high - 1}" if high != float('inf') else f"{low}+" for low, high in zip(RUN_BINS[:-1], RUN_BINS[1:])]
+
+def margin_bins(matches):
+    margins = matches['result_margin']
+    runs = pd.cut(margins, bins=RUN_BINS, labels=RUN_LABELS, right=False).astype(object)
+    wickets = margins.map(lambda margin: str(int(margin)) if margin == margin else None)
+    result = matches['result'].astype(object)
+    return runs.where(result == 'runs', wickets.where(result == 'wickets'))
+
+# Cube rows are stored column-wise: every dimension as integer codes into its sorted values
+# (-1 for missing), measures as one float array, so a query is a few numpy passes
+class Cube:
+    def __init__(self, facts, dimensions):
+        table = facts.groupby(dimensions + ['margin_bin'], dropna=False)[MEASURES].sum().reset_index()
+        self.codes, self.values = {}, {}
+        for dimension in dimensions + ['margin_bin']:
+            codes, values = pd.factorize(table[dimension], sort=True)
+            self.codes[dimension], self.values[dimension] = codes, values
+        self.measures = table[MEASURES].to_numpy(float)
+
+    def __len__(self):
+        return len(self.measures)
+
+    # Rows matching filters ({dimension: allowed values})
+    def select(self, filters):
+        mask = np.ones(len(self), dtype=bool)
+        for dimension, values in filters.items():
+            mask &= np.isin(self.codes[dimension], np.flatnonzero(self.values[dimension].isin(values)))
+        return mask
+
+    # Summed measures of the selected rows grouped by dimensions, as (group values, sums).
+    # Groups come in sorted order; rows with a missing group value are left out.
+    def group(self, mask, dimensions):
+        codes = [self.codes[dimension] for dimension in dimensions]
+        for column in codes:
+            mask = mask & (column >= 0)
+        shape = [len(self.values[dimension]) for dimension in dimensions]
+        keys = np.ravel_multi_index([column[mask] for column in codes], shape) if dimensions else np.zeros(mask.sum(), dtype=int)
+        groups, inverse = np.unique(keys, return_inverse=True)
+        sums = np.column_stack([np.bincount(inverse, weights=column, minlength=len(groups)) for column in self.measures[mask].T])
+        positions = np.unravel_index(groups, shape) if dimensions else []
+        values = [self.values[dimension][position].tolist() for dimension, position in zip(dimensions, positions)]
+        return list(zip(*values)) if dimensions else [()] * len(groups), sums
+
+# Match cube and team cube of the matches table
+def build_match_rollups(matches):
+    facts = pd.DataFrame({
+        'season': matches['season'],
+        'city': matches['city'].astype(object),
+        'venue': matches['venue'].astype(object),
+        'toss_decision': matches['toss_decision'].astype(object),
+        'result': matches['result'].astype(object),
+        'margin_bin': margin_bins(matches),
+        'matches': 1,
+        'wins': matches['winner'].notna().astype(int),
+        'toss_wins': (matches['toss_winner'].astype(object) == matches['winner'].astype(object)).astype(int),
+        'target_sum': matches['target_runs'].fillna(0),
+        'target_count': matches['target_runs'].notna().astype(int),
+    })
+    winner = matches['winner'].astype(object)
+    toss_winner = matches['toss_winner'].astype(object)
+    sides = []
+    for side in ['team1', 'team2']:
+        team = matches[side].astype(object)
+        won = team == winner
+        sides.append(facts.assign(team=team, wins=won.astype(int), toss_wins=(won & (team == toss_winner)).astype(int)))
+    match_dimensions = [dimension for dimension in DIMENSIONS if dimension != 'team']
+    return {'match': Cube(facts, match_dimensions), 'team': Cube(pd.concat(sides, ignore_index=True), DIMENSIONS)}
+
+# Metrics of the cube rows matching filters ({dimension: allowed values}), grouped by group_by.
+# Returns one record per group (group values plus metrics), groups in sorted order; rows whose
+# group value is missing (e.g. no city) are left out, as in value_counts.
+def query(rollups, group_by, filters, metrics):
+    cube = rollups['team' if 'team' in group_by or 'team' in filters else 'match']
+    mask = cube.select(filters)
+    groups, sums = cube.group(mask, group_by)
+    if not group_by and not groups:
+        groups, sums = [()], np.zeros((1, len(MEASURES)))
+    totals = dict(zip(MEASURES, sums.T))
+
+    histograms = {}
+    if 'margin_histogram' in metrics:
+        margin_groups, margin_sums = cube.group(mask, group_by + ['result', 'margin_bin'])
+        for (*group, result, margin_bin), count in zip(margin_groups, margin_sums[:, MEASURES.index('matches')]):
+            histogram = histograms.setdefault(tuple(group), {"win_by_runs": dict.fromkeys(RUN_LABELS, 0), "win_by_wickets": {}})
+            if result == 'runs':
+                histogram["win_by_runs"][margin_bin] += int(count)
+            else:
+                histogram["win_by_wickets"][int(margin_bin)] = int(count)
+
+    records = []
+    for i, group in enumerate(groups):
+        record = dict(zip(group_by, group))
+        if 'count' in metrics:
+            record['count'] = int(totals['matches'][i])
+        if 'wins' in metrics:
+            record['wins'] = int(totals['wins'][i])
+        if 'toss_wins' in metrics:
+            record['toss_wins'] = int(totals['toss_wins'][i])
+        if 'mean_target' in metrics:
+            record['mean_target'] = float(totals['target_sum'][i] / totals['target_count'][i]) if totals['target_count'][i] else None
+        if 'margin_histogram' in metrics:
+            histogram = histograms.get(group, {"win_by_runs": dict.fromkeys(RUN_LABELS, 0), "win_by_wickets": {}})
+            histogram["win_by_wickets"] = dict(sorted(histogram["win_by_wickets"].items()))
+            record['margin_histogram'] = histogram
+        records.append(record)
+    return records
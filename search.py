@@ -0,0 +1,174 @@
+import bisect
+import copy
+import heapq
+
+from registry import normalize
+
+# Name search index for autocomplete.
+# Every spelling of a player, team or venue name in the dataset (and every alias, such as a
+# franchise's old name) is indexed under its normalized form and under each word start of it,
+# in one sorted array of keys, so all names with a word starting with the query are one binary
+# search and a contiguous range of the array ("mccul" finds "BB McCullum"). Names, and each word
+# of a name of several words, are also indexed by their trigrams: when prefixes give fewer than
+# k suggestions, names whose whole form or one word shares enough trigrams with the query fill
+# up the rest, which catches typos ("mcullum", and "mumbia" for "Mumbai Indians").
+#
+# Suggestions are canonical names (see registry.py), best first: exact names, then names
+# starting with the query, then names with a word starting with it, then trigram matches by
+# similarity; ties go to the more prominent name (deliveries played for players, matches for
+# teams and venues), then the shorter one, then (between spellings of one name) the alphabetically first spelling.
+KINDS = ['player', 'team', 'venue']
+FUZZY_CUTOFF = 0.4
+
+EXACT, NAME_PREFIX, WORD_PREFIX, FUZZY = range(4)
+
+def trigrams(key):
+    padded = f"  {key} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+# Trigram units of a normalized name: the name, and each of its words if it has several
+def units_of(key):
+    words = key.split(' ')
+    return [key] + words if len(words) > 1 else [key]
+
+class SearchIndex:
+    # entries: (kind, canonical name, spelling, prominence) of every spelling to index;
+    # prominence: {kind: {spelling: count}} the entries' prominence was summed from
+    def __init__(self, entries, prominence):
+        self.entries = []
+        self.prominence = prominence
+        self.spellings = {}
+        self.keys, self.positions, self.tiers = [], [], []
+        # Trigram postings are by unit: the whole name or one of its words
+        self.grams = {}
+        self.unit_positions, self.gram_counts = [], []
+        keys = []
+        for entry in entries:
+            keys.extend(self.add(entry))
+        keys.sort()
+        self.keys = [key for key, _, _ in keys]
+        self.positions = [position for _, position, _ in keys]
+        self.tiers = [tier for _, _, tier in keys]
+
+    # Store entry and index the trigrams of its units; returns its (key, position, tier) prefix keys
+    def add(self, entry):
+        position = len(self.entries)
+        self.entries.append(entry)
+        self.spellings[entry[0], entry[2]] = position
+        key = normalize(entry[2])
+        words = key.split(' ')
+        starts = [len(' '.join(words[:i])) + (i > 0) for i in range(len(words))]
+        keys = [(key[start:], position, NAME_PREFIX if start == 0 else WORD_PREFIX) for start in starts]
+        compact = key.replace(' ', '')
+        if compact != key:
+            keys.append((compact, position, WORD_PREFIX))
+        for unit in units_of(key):
+            grams = trigrams(unit)
+            for gram in grams:
+                self.grams.setdefault(gram, []).append(len(self.unit_positions))
+            self.unit_positions.append(position)
+            self.gram_counts.append(len(grams))
+        return keys
+
+    # Index of the registries with the prominence of new deliveries and matches (a player cube
+    # and the match rows of the new deliveries) added. Spellings already indexed keep their keys
+    # and trigrams (only their canonical name and prominence can change); new spellings are
+    # inserted into the sorted keys.
+    def update(self, registries, player_cube, matches):
+        prominence = {kind: dict(counts) for kind, counts in self.prominence.items()}
+        for kind, counts in prominence_of(player_cube, matches).items():
+            for spelling, count in counts.items():
+                prominence[kind][spelling] = prominence[kind].get(spelling, 0) + count
+
+        index = copy.copy(self)
+        index.prominence = prominence
+        index.entries = list(self.entries)
+        index.spellings = dict(self.spellings)
+        index.keys, index.positions, index.tiers = list(self.keys), list(self.positions), list(self.tiers)
+        index.grams = dict(self.grams)
+        index.unit_positions, index.gram_counts = list(self.unit_positions), list(self.gram_counts)
+        for entry in search_entries(registries, prominence):
+            position = index.spellings.get((entry[0], entry[2]))
+            if position is not None:
+                index.entries[position] = entry
+                continue
+            for unit in units_of(normalize(entry[2])):
+                for gram in trigrams(unit):
+                    index.grams[gram] = list(index.grams.get(gram, ()))  # shared with this index
+            for key, position, tier in index.add(entry):
+                # Positions of new entries are the largest yet, so they go after equal keys
+                at = bisect.bisect_right(index.keys, key)
+                index.keys.insert(at, key)
+                index.positions.insert(at, position)
+                index.tiers.insert(at, tier)
+        return index
+
+    def __len__(self):
+        return len(self.entries)
+
+    # Best k suggestions for query, optionally of one kind only, as records of kind, name
+    # (canonical) and matched (the spelling that matched)
+    def search(self, query, kind=None, k=10):
+        key = normalize(query)
+        if not key:
+            return []
+        best = {}
+
+        def offer(position, rank):
+            entry = self.entries[position]
+            if kind is not None and entry[0] != kind:
+                return
+            rank = rank + (-entry[3], len(entry[1]), entry[1], entry[2])
+            name = entry[:2]
+            if name not in best or rank < best[name][0]:
+                best[name] = (rank, position)
+
+        for prefix in {key, key.replace(' ', '')}:
+            lo = bisect.bisect_left(self.keys, prefix)
+            hi = bisect.bisect_left(self.keys, prefix + '\uffff', lo)
+            for i in range(lo, hi):
+                tier = EXACT if self.tiers[i] == NAME_PREFIX and self.keys[i] == key else self.tiers[i]
+                offer(self.positions[i], (tier, 0))
+
+        if len(best) < k:
+            grams = trigrams(key)
+            shared = {}
+            for gram in grams:
+                for unit in self.grams.get(gram, ()):
+                    shared[unit] = shared.get(unit, 0) + 1
+            # A name scores its best unit
+            for unit, count in shared.items():
+                similarity = 2 * count / (len(grams) + self.gram_counts[unit])
+                if similarity >= FUZZY_CUTOFF:
+                    offer(self.unit_positions[unit], (FUZZY, -similarity))
+
+        suggestions = heapq.nsmallest(k, best.values())
+        return [{"kind": self.entries[position][0], "name": self.entries[position][1], "matched": self.entries[position][2]} for _, position in suggestions]
+
+# Prominence of names: deliveries faced and bowled by a player (from a player cube), matches
+# played by a team or hosted by a venue, as {kind: {spelling: count}}
+def prominence_of(player_cube, matches):
+    balls = player_cube['balls'].groupby(level='player').sum()
+    return {
+        'player': {str(name): int(count) for name, count in balls.items()},
+        'team': {str(name): int(count) for name, count in matches['team1'].astype(object).value_counts().add(matches['team2'].astype(object).value_counts(), fill_value=0).items()},
+        'venue': {str(name): int(count) for name, count in matches['venue'].astype(object).value_counts().items()},
+    }
+
+# (kind, canonical name, spelling, prominence) of every spelling and alias in the registries;
+# a name's prominence is summed over all its spellings
+def search_entries(registries, prominence):
+    entries = []
+    for kind in KINDS:
+        names = registries[kind]
+        counts = {}
+        for spelling, canonical in names.canonical.items():
+            counts[canonical] = counts.get(canonical, 0) + prominence[kind].get(spelling, 0)
+        for spelling, canonical in list(names.canonical.items()) + list(names.aliases.items()):
+            entries.append((kind, canonical, spelling, counts[canonical]))
+    return entries
+
+# Index of the player, team and venue registries
+def build_search_index(registries, player_cube, matches):
+    prominence = prominence_of(player_cube, matches)
+    return SearchIndex(search_entries(registries, prominence), prominence)
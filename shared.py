@@ -0,0 +1,93 @@
+import json
+import os
+import shutil
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+import loader
+
+# Shared deliveries store.
+# The deliveries frame is written once to a directory as one fixed-width .npy array per
+# column (names dictionary-encoded: integer codes plus a categories list). Every worker
+# process then memory-maps the arrays read-only and wraps them in a DataFrame without
+# copying, so N workers share one copy of the data in the page cache. Put the directory
+# on a tmpfs (e.g. /dev/shm/ipl) to keep it in shared memory.
+
+# Write the frame's columns as arrays into directory.
+# The export is written to a temporary directory next to it and renamed into place, so
+# workers never see a half-written store; if another worker exported first, its store is kept.
+def export(df, directory, source):
+    parent = os.path.dirname(os.path.abspath(directory))
+    os.makedirs(parent, exist_ok=True)
+    tmp = tempfile.mkdtemp(prefix='.export-', dir=parent)
+
+    columns = []
+    for column in df.columns:
+        values = df[column]
+        if not isinstance(values.dtype, pd.CategoricalDtype) and not pd.api.types.is_numeric_dtype(values):
+            values = values.astype('category')
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            np.save(os.path.join(tmp, column + '.npy'), values.cat.codes.to_numpy())
+            with open(os.path.join(tmp, column + '.json'), 'w') as f:
+                json.dump(values.cat.categories.tolist(), f)
+            columns.append({'name': column, 'categorical': True})
+        else:
+            np.save(os.path.join(tmp, column + '.npy'), values.to_numpy())
+            columns.append({'name': column, 'categorical': False})
+
+    with open(os.path.join(tmp, 'meta.json'), 'w') as f:
+        json.dump({'source': source, 'columns': columns, 'rows': len(df)}, f)
+
+    if is_current(directory, source):
+        shutil.rmtree(tmp, ignore_errors=True)
+        return
+
+    # Move a stale store aside first; processes that already mapped it keep their views
+    stale = None
+    if os.path.exists(directory):
+        stale = tempfile.mkdtemp(prefix='.stale-', dir=parent)
+        os.rename(directory, os.path.join(stale, 'store'))
+    try:
+        os.rename(tmp, directory)
+    except OSError:
+        shutil.rmtree(tmp, ignore_errors=True)
+    if stale:
+        shutil.rmtree(stale, ignore_errors=True)
+
+# Map the arrays in directory read-only and wrap them in a DataFrame (zero-copy views)
+def attach(directory):
+    with open(os.path.join(directory, 'meta.json')) as f:
+        meta = json.load(f)
+
+    data = {}
+    for column in meta['columns']:
+        name = column['name']
+        values = np.load(os.path.join(directory, name + '.npy'), mmap_mode='r')
+        if column['categorical']:
+            with open(os.path.join(directory, name + '.json')) as f:
+                values = pd.Categorical.from_codes(values, categories=json.load(f))
+        data[name] = pd.Series(values, name=name, copy=False)
+
+    return pd.DataFrame(data, copy=False)
+
+# Source file identity the export was made from (a changed source means a stale export)
+def source_stamp(path):
+    stat = os.stat(path)
+    return {'path': os.path.abspath(path), 'mtime': stat.st_mtime, 'size': stat.st_size, 'version': loader.CACHE_VERSION}
+
+def is_current(directory, source):
+    try:
+        with open(os.path.join(directory, 'meta.json')) as f:
+            return json.load(f)['source'] == source
+    except (OSError, ValueError, KeyError):
+        return False
+
+# Deliveries from the shared store in directory, exporting them first if the store is
+# missing or was made from a different source file
+def load_deliveries(directory, path='cleaned_del.csv', cache_dir=loader.CACHE_DIR):
+    source = source_stamp(path)
+    if not is_current(directory, source):
+        export(loader.load_deliveries(path, cache_dir), directory, source)
+    return attach(directory)
@@ -0,0 +1,46 @@
+import numpy as np
+import pandas as pd
+
+# Ball-by-ball innings state.
+# One row per delivery, in the row order of the deliveries frame (so the match and innings
+# offsets slice both), holding the state of the innings after that delivery:
+#   score, wickets            runs and wickets so far
+#   legal_balls               balls bowled so far, wides and no-balls not counted
+#   balls_remaining           balls left of the innings' overs (the match's target overs in the
+#                             first two innings, one over in a super over)
+#   current_run_rate          runs per six legal balls so far
+#   required_run_rate         runs per six balls still needed to reach the target (second innings)
+#   partnership               number of the partnership the delivery belongs to (wickets before it)
+# Every per-over chart (worm, Manhattan, run rates) and the fall of wickets is a slice of it.
+NOT_LEGAL = ['wides', 'noballs']
+SUPER_OVER_BALLS = 6
+
+def build_delivery_state(deliveries, matches):
+    innings = [deliveries['match_id'], deliveries['inning']]
+    wicket = deliveries['is_wicket']
+    legal = (~deliveries['extras_type'].isin(NOT_LEGAL)).astype('int16')
+
+    score = deliveries['total_runs'].astype('int32').groupby(innings, sort=False).cumsum()
+    wickets = wicket.groupby(innings, sort=False).cumsum()
+    legal_balls = legal.groupby(innings, sort=False).cumsum()
+
+    by_id = matches.set_index('id')
+    target_overs = deliveries['match_id'].map(by_id['target_overs']).fillna(20).to_numpy()
+    target_runs = deliveries['match_id'].map(by_id['target_runs']).to_numpy(dtype=float)
+    inning = deliveries['inning'].to_numpy()
+    total_balls = np.where(inning <= 2, np.round(target_overs * 6), SUPER_OVER_BALLS)
+    balls_remaining = np.maximum(total_balls - legal_balls.to_numpy(), 0)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        current_run_rate = np.where(legal_balls > 0, score / legal_balls * 6, 0)
+        required_run_rate = np.where((inning == 2) & (balls_remaining > 0), (target_runs - score) / balls_remaining * 6, np.nan)
+
+    return pd.DataFrame({
+        'score': score.to_numpy(),
+        'wickets': wickets.to_numpy().astype('int8'),
+        'legal_balls': legal_balls.to_numpy().astype('int16'),
+        'balls_remaining': balls_remaining.astype('int16'),
+        'current_run_rate': current_run_rate.astype('float32'),
+        'required_run_rate': required_run_rate.astype('float32'),
+        'partnership': (wickets - wicket).to_numpy().astype('int8'),
+    }, index=deliveries.index)
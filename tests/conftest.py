@@ -0,0 +1,39 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'benchmarks'))
+
+import dataset
+import synthetic
+
+# A small seeded synthetic dataset (about 20 matches), so no dataset files are needed
+SCALE = 0.02
+
+@pytest.fixture(scope='session')
+def frames():
+    return synthetic.generate(SCALE, seed=0)
+
+# The synthetic dataset published as the current snapshot for the test
+@pytest.fixture
+def snapshot(frames):
+    deliveries, matches = frames
+    snap = dataset.build_snapshot(deliveries, matches, 'test')
+    dataset.publish(snap)
+    yield snap
+    dataset.publish(None)
+
+# Deliveries and match rows, as ingest takes them, of a copy of an existing match under a new ID
+def match_copy(frames, match_id, new_id):
+    deliveries, matches = frames
+
+    def records(frame):
+        return [{key: None if isinstance(value, float) and np.isnan(value) else value for key, value in row.items()}
+                for row in frame.astype(object).to_dict(orient='records')]
+
+    return (records(deliveries[deliveries['match_id'] == match_id].assign(match_id=new_id)),
+            records(matches[matches['id'] == match_id].assign(id=new_id)))
@@ -0,0 +1,28 @@
+import pytest
+
+@pytest.mark.parametrize('path', ['/admin/ingest', '/admin/reload'])
+def test_admin_endpoints_are_disabled_without_a_token(snapshot, monkeypatch, path):
+    import app
+
+    monkeypatch.delenv('IPL_ADMIN_TOKEN', raising=False)
+    response = app.app.test_client().post(path, json={})
+    assert response.status_code == 403
+    assert 'disabled' in response.get_json()['error']
+
+def test_admin_endpoints_check_the_token(snapshot, monkeypatch):
+    import app
+
+    monkeypatch.setenv('IPL_ADMIN_TOKEN', 'secret')
+    client = app.app.test_client()
+    assert client.post('/admin/ingest', json={}, headers={'X-Admin-Token': 'wrong'}).status_code == 403
+    assert client.post('/admin/ingest', json={}).status_code == 403
+    # Past the token check: an empty payload is a bad request
+    assert client.post('/admin/ingest', json={}, headers={'X-Admin-Token': 'secret'}).status_code == 400
+
+def test_profiling_stays_open_without_a_token(snapshot, monkeypatch):
+    import app
+
+    monkeypatch.delenv('IPL_ADMIN_TOKEN', raising=False)
+    response = app.app.test_client().get('/teams?profile=1')
+    assert response.status_code == 200
+    assert 'profile' in response.get_json()
@@ -0,0 +1,100 @@
+import asyncio
+import json
+
+import pytest
+
+import metrics
+
+def call(path, query=''):
+    messages = []
+
+    async def receive():
+        return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+    async def send(message):
+        messages.append(message)
+
+    scope = {'type': 'http', 'method': 'GET', 'path': path, 'query_string': query.encode(), 'headers': []}
+    return scope, receive, send, messages
+
+def test_streamed_route_is_not_sent_to_the_pool(snapshot, monkeypatch):
+    import asgi
+
+    def no_pool():
+        raise AssertionError('streamed route sent to the process pool')
+
+    monkeypatch.setattr(asgi, 'HEAVY_ENDPOINTS', asgi.HEAVY_ENDPOINTS | {'get_all_partnerships'})
+    monkeypatch.setattr(asgi, 'get_pool', no_pool)
+    scope, receive, send, messages = call('/all partnerships', 'limit=20')
+    asyncio.run(asgi.app(scope, receive, send))
+
+    assert messages[0]['status'] == 200
+    chunks = [message['body'] for message in messages[1:]]
+    assert len(chunks) > 2
+    assert len(json.loads(b''.join(chunks))) == 20
+
+def test_drained_metrics_merge_back():
+    metrics.reset()
+    metrics.observe('ipl_function_duration_seconds', (('function', 'f'),), 0.5)
+    metrics.increment('ipl_response_cache_hits_total', (('endpoint', 'e'),))
+    recorded = metrics.drain()
+    assert not metrics.summaries and not metrics.counters
+
+    metrics.observe('ipl_function_duration_seconds', (('function', 'f'),), 1.5)
+    metrics.merge(recorded)
+    summary = metrics.summaries[('ipl_function_duration_seconds', (('function', 'f'),))]
+    assert (summary.count, summary.sum) == (2, 2.0)
+    assert metrics.counters[('ipl_response_cache_hits_total', (('endpoint', 'e'),))] == 1
+    metrics.reset()
+
+# Heavy requests in a real spawned worker
+@pytest.fixture
+def pool(monkeypatch, tmp_path):
+    import asgi
+
+    monkeypatch.setattr(asgi, 'POOL_WORKERS', 1)
+    monkeypatch.setattr(asgi, 'STORE_DIR', str(tmp_path))
+    monkeypatch.setattr(asgi, 'pool', None)
+    yield asgi
+    if asgi.pool is not None:
+        asgi.pool.shutdown()
+    asgi.release_stores(None)
+
+def get_all(asgi, requests):
+    async def main():
+        requests_ = [call(path, query) for path, query in requests]
+        await asyncio.gather(*(asgi.app(scope, receive, send) for scope, receive, send, _ in requests_))
+        return [messages for *_, messages in requests_]
+
+    return asyncio.run(main())
+
+# The worker's request and api metrics show up in the parent, once for two identical requests
+# sharing one computation
+def test_worker_metrics_reach_the_parent(snapshot, pool):
+    metrics.reset()
+    match_id = min(snapshot.match_offsets)
+    responses = get_all(pool, [('/match/report', f'match_id={match_id}')] * 2)
+    assert [messages[0]['status'] for messages in responses] == [200, 200]
+    assert responses[0][1]['body'] == responses[1][1]['body']
+
+    requests = metrics.summaries[('ipl_request_duration_seconds', (('endpoint', 'get_match_report'),))]
+    assert requests.count == 1
+    assert metrics.summaries[('ipl_function_duration_seconds', (('function', 'match_report'),))].count == 1
+    assert 'endpoint="get_match_report"' in metrics.render()
+    metrics.reset()
+
+# Workers answer from the parent's snapshot: a match ingested in the parent is found, and the
+# store of the old version is removed once nothing uses it
+def test_worker_sees_ingested_matches(frames, snapshot, pool):
+    import dataset
+    from conftest import match_copy
+
+    match_id = int(frames[1]['id'].iloc[0])
+    before, = get_all(pool, [('/match/report', f'match_id={match_id}')])
+    assert 'error' not in dataset.ingest(*match_copy(frames, match_id, 940001))
+    after, = get_all(pool, [('/match/report', 'match_id=940001')])
+
+    assert after[0]['status'] == 200
+    report = json.loads(after[1]['body'])
+    assert report['innings'] == json.loads(before[1]['body'])['innings']
+    assert list(pool.stores) == [dataset.current().version]
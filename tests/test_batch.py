@@ -0,0 +1,37 @@
+import batch
+
+def test_parallel_run_matches_serial(snapshot, monkeypatch):
+    match_ids = sorted(snapshot.match_offsets)
+    serial = batch.run('innings4', match_ids, workers=1)
+    monkeypatch.setattr(batch, 'usable_workers', lambda workers, matches, min_matches: workers)
+    parallel = batch.run('innings4', match_ids, workers=2)
+    assert list(parallel) == match_ids
+    assert parallel == serial
+
+def test_small_runs_stay_serial():
+    assert batch.usable_workers(8, batch.MIN_MATCHES_PER_WORKER - 1) == 1
+
+def test_workers_get_at_least_min_matches(monkeypatch):
+    monkeypatch.setattr(batch.os, 'sched_getaffinity', lambda pid: set(range(8)), raising=False)
+    assert batch.usable_workers(8, 1000, min_matches=250) == 4
+    assert batch.usable_workers(8, 1000, min_matches=100) == 8
+    assert batch.usable_workers(2, 1000, min_matches=100) == 2
+
+def test_shards_cover_every_match_in_order():
+    match_ids = list(range(10))
+    shards = batch.shards_of(match_ids, 4)
+    assert len(shards) <= 4
+    assert [match_id for shard in shards for match_id in shard] == match_ids
+
+# One row per match innings, nested stats flattened to columns and lists kept as JSON text
+def test_results_become_one_row_per_innings(snapshot):
+    match_ids = sorted(snapshot.match_offsets)[:3]
+    results = batch.run('report', match_ids, workers=1)
+    frame = batch.to_frame(results)
+    assert len(frame) == sum(len(result['innings']) for result in results.values())
+    assert frame['match_id'].drop_duplicates().tolist() == match_ids
+
+    row = frame.iloc[0]
+    stats = results[row['match_id']]['innings'][row['inning']]
+    assert batch.flatten(stats) == {column: row[column] for column in batch.flatten(stats)}
+    assert not any(isinstance(value, (dict, list)) for value in batch.flatten(stats).values())
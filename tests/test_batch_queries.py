@@ -0,0 +1,23 @@
+def test_repeated_match_ids_are_counted_once(snapshot):
+    import api
+
+    match_id = int(sorted(snapshot.match_offsets)[0])
+    single = api.match_innings_3(match_id)
+    repeated = api.match_innings_bulk([match_id, match_id], 3)
+    assert list(repeated) == [match_id]
+    assert repeated[match_id]['innings'] == single['innings']
+
+    report = api.match_report(match_id)
+    repeated = api.match_report_bulk([match_id, match_id])[match_id]
+    assert repeated['innings'] == report['innings']
+    assert len(snapshot.match_rows([match_id, match_id])) == len(snapshot.match_deliveries(match_id))
+
+def test_batch_endpoint_answers_each_distinct_key_once(snapshot):
+    import app
+
+    match_id = int(sorted(snapshot.match_offsets)[0])
+    client = app.app.test_client()
+    single = client.get(f'/match/innings/third?match_id={match_id}').get_json()
+    body = client.post('/batch', json={'match_innings_3': [match_id, match_id]}).get_json()
+    assert list(body['match_innings_3']) == [str(match_id)]
+    assert body['match_innings_3'][str(match_id)]['innings'] == single['innings']
@@ -0,0 +1,60 @@
+import pytest
+
+import cache
+
+@pytest.fixture
+def client(snapshot):
+    import app
+
+    app.response_cache.clear()
+    yield app.app.test_client()
+    app.response_cache.clear()
+
+# A strong ETag on the first response and on cache hits, and a 304 for a matching If-None-Match
+def test_etag_and_not_modified(client):
+    first = client.get('/teams')
+    etag = first.headers['ETag']
+    assert first.status_code == 200 and not etag.startswith('W/')
+    assert 'no-cache' in first.headers['Cache-Control']
+
+    hit = client.get('/teams')
+    assert hit.status_code == 200 and hit.headers['ETag'] == etag and hit.data == first.data
+    assert 'no-cache' in hit.headers['Cache-Control']
+    not_modified = client.get('/teams', headers={'If-None-Match': etag})
+    assert not_modified.status_code == 304 and not_modified.data == b''
+    assert client.get('/teams', headers={'If-None-Match': '"other"'}).status_code == 200
+
+# The ETag carries the dataset version, so an ingest makes old ETags stale
+def test_etag_changes_with_the_dataset_version(frames, client):
+    import dataset
+    from conftest import match_copy
+
+    etag = client.get('/matches/total_per_season').headers['ETag']
+    match_id = int(frames[1]['id'].iloc[0])
+    assert 'error' not in dataset.ingest(*match_copy(frames, match_id, 950001))
+    response = client.get('/matches/total_per_season', headers={'If-None-Match': etag})
+    assert response.status_code == 200 and response.headers['ETag'] != etag
+
+def test_query_args_are_normalized(client):
+    client.get('/player/performance?player_name=CSK P3&x=1')
+    stats = client.get('/cache/stats').get_json()
+    client.get('/player/performance?x=1&player_name=CSK P3')
+    assert client.get('/cache/stats').get_json()['hits'] == stats['hits'] + 1
+
+def test_lru_eviction_and_ttl(monkeypatch):
+    lru = cache.LRUCache(maxsize=2)
+    lru.set('a', 1)
+    lru.set('b', 2)
+    assert lru.get('a') == 1
+    lru.set('c', 3)
+    assert lru.get('b') is None and lru.get('a') == 1 and lru.get('c') == 3
+    assert lru.stats()['evictions'] == 1
+
+    now = [100.0]
+    monkeypatch.setattr(cache.time, 'monotonic', lambda: now[0])
+    expiring = cache.LRUCache(ttl=5)
+    expiring.set('a', 1)
+    now[0] += 4
+    assert expiring.get('a') == 1
+    now[0] += 2
+    assert expiring.get('a') is None and expiring.stats()['size'] == 0
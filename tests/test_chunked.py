@@ -0,0 +1,69 @@
+import pandas as pd
+import pytest
+
+import chunked
+import dataset
+import leaderboard
+import loader
+
+# Chunk and ingest merges add narrow per-chunk sums; they must not wrap
+def test_merge_totals_widens_small_integer_sums():
+    table = pd.Series([100, 20], index=['a', 'b'], dtype='int8')
+    merged = dataset.merge_totals(table, pd.Series([100, 1], index=['a', 'c'], dtype='int8'))
+    assert merged.dtype == 'int64'
+    assert merged.to_dict() == {'a': 200, 'b': 20, 'c': 1}
+    assert dataset.merge_totals(table, table.iloc[:0]) is table
+
+    frame = pd.DataFrame({'runs': [120], 'balls': [1]}, index=['a'], dtype='int8')
+    merged = dataset.merge_totals(frame, frame)
+    assert merged.dtypes.tolist() == ['int64', 'int64']
+    assert merged.loc['a'].tolist() == [240, 2]
+
+def full_and_chunked(frames, path, chunk_rows):
+    full = dataset.build_aggregates(
+        loader.read_typed_csv(path, loader.DELIVERY_INTS, loader.DELIVERY_CATEGORIES, sort_by=['match_id', 'inning']), frames[1])
+    return full, chunked.build_aggregates(path, frames[1], chunk_rows)[0]
+
+# Chunk boundaries fall inside matches (the trailing match is carried), and the merged totals and
+# the tables built from them are those of one build over all the deliveries
+@pytest.mark.parametrize('chunk_rows', [700, 5000])
+def test_chunked_build_equals_full_build(frames, tmp_path, chunk_rows):
+    path = str(tmp_path / 'cleaned_del.csv')
+    frames[0].to_csv(path, index=False)
+    full, chunks = full_and_chunked(frames, path, chunk_rows)
+
+    for name in dataset.TOTALS:
+        compare = pd.testing.assert_frame_equal if isinstance(full[name], pd.DataFrame) else pd.testing.assert_series_equal
+        compare(chunks[name].sort_index(), full[name].sort_index(), check_dtype=False, check_categorical=False)
+    pd.testing.assert_frame_equal(chunks['partnerships'], full['partnerships'], check_categorical=False)
+
+    for name in ['player_form', 'pair_form']:
+        assert set(chunks[name].offsets) == set(full[name].offsets)
+        for key in full[name].offsets:
+            expected, found = full[name].window(key, last_n=3), chunks[name].window(key, last_n=3)
+            # Measure order follows the order dismissal kinds were first seen in
+            assert found[0].to_dict() == expected[0].to_dict()
+            assert found[1:] == expected[1:]
+
+    for metric in leaderboard.METRICS:
+        assert chunks['leaderboards'].top(metric, k=20) == full['leaderboards'].top(metric, k=20)
+    for (batter, bowler) in full['head_to_head'].index[:200]:
+        assert chunks['head_to_head_matrix'].pair(batter, bowler) == full['head_to_head_matrix'].pair(batter, bowler)
+    assert chunks['search_index'].search('mumbai', None, 10) == full['search_index'].search('mumbai', None, 10)
+    assert set(chunks['registries']['player'].canonical) == set(full['registries']['player'].canonical)
+
+# Every way of building a snapshot fills in every aggregate it declares
+def test_every_builder_produces_every_aggregate(frames, snapshot, tmp_path, monkeypatch):
+    from conftest import match_copy
+
+    path = str(tmp_path / 'cleaned_del.csv')
+    frames[0].to_csv(path, index=False)
+    assert set(dataset.build_aggregates(*frames)) == set(dataset.AGGREGATES)
+    assert set(chunked.build_aggregates(path, frames[1], 1000)[0]) == set(dataset.AGGREGATES)
+
+    built = []
+    snapshot_class = dataset.Snapshot
+    monkeypatch.setattr(dataset, 'Snapshot', lambda *args: built.append(set(args[3])) or snapshot_class(*args))
+    match_id = int(frames[1]['id'].iloc[0])
+    assert 'error' not in dataset.ingest(*match_copy(frames, match_id, 960001))
+    assert built == [set(dataset.AGGREGATES)]
@@ -0,0 +1,92 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import form
+
+@pytest.mark.parametrize('path', ['/player/form?player_name=CSK P3', '/player/batsman_vs_bowler/form?batsman=CSK P3&bowler=MI P8'])
+@pytest.mark.parametrize('query', ['last_n=0', 'last_n=two', 'from=yesterday'])
+def test_bad_windows_are_rejected(snapshot, path, query):
+    import app
+
+    response = app.app.test_client().get(f'{path}&{query}')
+    assert response.status_code == 400
+
+# Windows of the synthetic dataset: everything, a date range, the last few matches, and both
+def windows(matches):
+    dates = sorted(pd.to_datetime(matches['date'].astype(object)).dt.normalize().unique())
+    start, end = np.datetime64(dates[len(dates) // 4], 'ns'), np.datetime64(dates[3 * len(dates) // 4], 'ns')
+    return [(None, None, None), (start, end, None), (None, None, 3), (start, None, 2), (None, end, 50), (end, start, None)]
+
+# A key's window totals, straight from its deliveries: its matches ordered by date (then
+# match ID), cut to the date range and then to the last last_n
+def brute_force(matches, rows, measures, start, end, last_n):
+    dates = form.match_dates(rows, matches)
+    totals = measures(rows).groupby(rows['match_id']).sum()
+    order = pd.DataFrame({'date': dates.groupby(rows['match_id']).first()}).loc[totals.index]
+    order = order.reset_index().sort_values(['date', 'match_id'])
+    if start is not None:
+        order = order[order['date'] >= start]
+    if end is not None:
+        order = order[order['date'] <= end]
+    if last_n is not None:
+        order = order.tail(last_n)
+    if order.empty:
+        return None
+    return totals.loc[order['match_id']].sum().to_dict(), order['date'].iloc[0], order['date'].iloc[-1], len(order)
+
+def player_measures(facts):
+    batting, bowling = facts['batter'] == facts['player'], facts['bowler'] == facts['player']
+    return pd.DataFrame({
+        'runs': facts['batsman_runs'].where(batting, 0),
+        'balls_faced': batting.astype(int),
+        'fours': (batting & (facts['batsman_runs'] == 4)).astype(int),
+        'sixes': (batting & (facts['batsman_runs'] == 6)).astype(int),
+        'wickets': facts['is_wicket'].where(bowling, 0),
+        'runs_conceded': facts['total_runs'].where(bowling, 0),
+        'balls_bowled': bowling.astype(int),
+    })
+
+def pair_measures(facts):
+    return pd.DataFrame({'balls': 1, 'runs': facts['batsman_runs'], 'dismissals': facts['is_wicket']}, index=facts.index)
+
+def check(found, expected):
+    if expected is None:
+        assert found is None
+        return
+    totals, first, last, matches = found
+    assert {measure: totals[measure] for measure in expected[0]} == expected[0]
+    assert (first, last, matches) == expected[1:]
+
+def test_player_windows_match_brute_force(frames, snapshot):
+    deliveries, matches = frames
+    players = deliveries['batter'].astype(object).value_counts().index[:5].tolist() + \
+        deliveries['bowler'].astype(object).value_counts().index[:5].tolist()
+    for player in players:
+        facts = deliveries[(deliveries['batter'] == player) | (deliveries['bowler'] == player)].assign(player=player)
+        for window in windows(matches):
+            check(snapshot.player_form.window(player, *window),
+                  brute_force(matches, facts, player_measures, *window))
+
+def test_pair_windows_match_brute_force(frames, snapshot):
+    deliveries, matches = frames
+    pairs = deliveries.astype({'batter': object, 'bowler': object}).value_counts(['batter', 'bowler']).index[:10]
+    for batter, bowler in pairs:
+        facts = deliveries[(deliveries['batter'] == batter) & (deliveries['bowler'] == bowler)]
+        for window in windows(matches):
+            check(snapshot.pair_form.window((batter, bowler), *window),
+                  brute_force(matches, facts, pair_measures, *window))
+
+# The endpoint adds up the same window: last_n=1 is the player's latest match
+def test_player_form_endpoint(frames, snapshot):
+    import api
+
+    deliveries, matches = frames
+    player = deliveries['batter'].astype(object).value_counts().index[0]
+    result = api.player_form(player, last_n=1)
+    assert result['window']['matches'] == 1
+    facts = deliveries[(deliveries['batter'] == player) | (deliveries['bowler'] == player)].assign(player=player)
+    totals, first, _, _ = brute_force(matches, facts, player_measures, None, None, 1)
+    assert result['window']['from'] == str(first)[:10]
+    assert result['batting']['total_runs'] == totals['runs']
+    assert result['batting']['balls_faced'] == totals['balls_faced']
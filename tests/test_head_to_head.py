@@ -0,0 +1,43 @@
+import pytest
+
+@pytest.mark.parametrize('query', ['k=0', 'k=-1', 'k=x', 'min_balls=-1', 'sort=bogus'])
+def test_invalid_list_parameters_are_rejected(snapshot, query):
+    import app
+
+    batter = str(snapshot.df_del['batter'].iloc[0])
+    client = app.app.test_client()
+    assert client.get('/player/batsman_vs_bowler/bowlers', query_string=f'batsman={batter}&{query}').status_code == 400
+    bowler = str(snapshot.df_del['bowler'].iloc[0])
+    assert client.get('/player/batsman_vs_bowler/batsmen', query_string=f'bowler={bowler}&{query}').status_code == 400
+
+def test_top_k_keeps_k_pairs(snapshot):
+    import api
+
+    batter = str(snapshot.df_del['batter'].iloc[0])
+    every = api.batsman_vs_bowlers(batter)['bowlers']
+    assert api.batsman_vs_bowlers(batter, k=2)['bowlers'] == every[:2]
+    assert 'error' in api.batsman_vs_bowlers(batter, k=-1)
+
+# A matrix updated with the deliveries of later matches (with new players and a new dismissal
+# kind) is the matrix of all the deliveries
+def test_updated_matrix_matches_a_full_build(frames):
+    import dataset
+    import headtohead
+
+    deliveries = frames[0].astype({'batter': object, 'bowler': object, 'dismissal_kind': object})
+    later = deliveries['match_id'] >= deliveries['match_id'].median()
+    deliveries.loc[later & (deliveries['batter'] == deliveries['batter'].iloc[0]), 'batter'] = 'New Batter'
+    deliveries.loc[deliveries.index[later & (deliveries['is_wicket'] == 1)][:2], 'dismissal_kind'] = 'hit wicket'
+
+    matrix = headtohead.build_head_to_head_matrix(*dataset.build_head_to_head(deliveries[~later])[:2])
+    matrix = matrix.update(*dataset.build_head_to_head(deliveries[later])[:2])
+    pairs, pair_dismissals, _ = dataset.build_head_to_head(deliveries)
+    full = headtohead.build_head_to_head_matrix(pairs, pair_dismissals)
+
+    assert matrix.names.tolist() == full.names.tolist() and matrix.kinds == full.kinds
+    for name in ['indptr', 'indices', 'data', 'column_order', 'colptr']:
+        assert (getattr(matrix, name) == getattr(full, name)).all(), name
+    batter = 'New Batter'
+    assert matrix.row(batter).equals(full.row(batter))
+    bowler = str(deliveries['bowler'].iloc[-1])
+    assert matrix.column(bowler).equals(full.column(bowler))
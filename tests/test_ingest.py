@@ -0,0 +1,112 @@
+import threading
+
+import pandas as pd
+import pytest
+
+import dataset
+from conftest import match_copy
+
+def test_ingest_builds_on_latest_snapshot_not_pinned_one(frames, snapshot):
+    first = int(frames[1]['id'].iloc[0])
+    token = dataset.pin()  # a request that started before the other ingest
+    try:
+        other = threading.Thread(target=dataset.ingest, args=match_copy(frames, first, 900001))
+        other.start()
+        other.join()
+        assert 'error' not in dataset.ingest(*match_copy(frames, first, 900002))
+    finally:
+        dataset.unpin(token)
+    ids = set(dataset.current().df_match['id'])
+    assert {900001, 900002} <= ids
+
+def test_concurrent_ingests_keep_every_match(frames, snapshot):
+    source = [int(match_id) for match_id in frames[1]['id'].iloc[:4]]
+    barrier = threading.Barrier(len(source))
+    results = {}
+
+    def run(i, match_id):
+        token = dataset.pin()
+        try:
+            barrier.wait()
+            results[i] = dataset.ingest(*match_copy(frames, match_id, 910000 + i))
+        finally:
+            dataset.unpin(token)
+
+    threads = [threading.Thread(target=run, args=(i, match_id)) for i, match_id in enumerate(source)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert all('error' not in result for result in results.values())
+    snap = dataset.current()
+    assert {910000 + i for i in range(len(source))} <= set(snap.df_match['id'])
+    assert len(snap.df_match) == len(frames[1]) + len(source)
+    assert set(snap.match_offsets) == set(snap.df_match['id'])
+
+# Merged integer sums are int64 (see dataset.merge_totals) where a rebuild may sum in a narrower type
+def assert_same_totals(incremental, full):
+    if isinstance(full, pd.DataFrame):
+        pd.testing.assert_frame_equal(incremental.sort_index(), full.sort_index(), check_dtype=False)
+    else:
+        pd.testing.assert_series_equal(incremental.sort_index(), full.sort_index(), check_dtype=False)
+
+# Ingest merges aggregates of the new rows only; they must come out as a rebuild of the combined data would
+def test_ingest_matches_full_rebuild(frames, snapshot):
+    first, second = (int(match_id) for match_id in frames[1]['id'].iloc[:2])
+    deliveries, matches = match_copy(frames, first, 920001)
+    deliveries[0]['batter'] = 'Brand New Player'  # a new name: the registries are rebuilt
+    assert 'error' not in dataset.ingest(deliveries, matches)
+    assert 'error' not in dataset.ingest(*match_copy(frames, second, 920002))
+
+    incremental = dataset.current()
+    full = dataset.build_snapshot(incremental.df_del, incremental.df_match, 'full')
+    for name in ['player_cube', 'head_to_head', 'pair_dismissals', 'player_dismissals', 'team_phase']:
+        assert_same_totals(getattr(incremental, name), getattr(full, name))
+    assert incremental.match_offsets == full.match_offsets
+    assert incremental.inning_offsets == full.inning_offsets
+    pd.testing.assert_frame_equal(incremental.delivery_state, full.delivery_state)
+
+    order = ['match_id', 'inning', 'partnership']
+    pd.testing.assert_frame_equal(incremental.partnerships.sort_values(order, ignore_index=True),
+                                  full.partnerships.sort_values(order, ignore_index=True))
+    for levels, totals in full.player_rollups.items():
+        assert incremental.player_rollups[levels].keys() == totals.keys()
+        assert all((incremental.player_rollups[levels][key] == value).all() for key, value in totals.items())
+
+    assert set(incremental.leaderboards.boards) == set(full.leaderboards.boards)
+    for key, board in full.leaderboards.boards.items():
+        pd.testing.assert_frame_equal(incremental.leaderboards.boards[key].table, board.table)
+        for measure, order in board.orders.items():
+            assert (incremental.leaderboards.boards[key].orders[measure] == order).all()
+
+    # Structures updated in place of a rebuild: same answers, not necessarily the same layout
+    assert sorted(incremental.search_index.entries) == sorted(full.search_index.entries)
+    for query in ['brand', 'csk p1', 'p2', 'brnd new', 'mumbai']:
+        assert incremental.search_index.search(query) == full.search_index.search(query)
+
+    matrix, full_matrix = incremental.head_to_head_matrix, full.head_to_head_matrix
+    assert (matrix.names == full_matrix.names).all() and matrix.kinds == full_matrix.kinds
+    for name in ['indptr', 'indices', 'data', 'column_order', 'colptr']:
+        assert (getattr(matrix, name) == getattr(full_matrix, name)).all(), name
+
+    for table, full_table in [(incremental.player_form, full.player_form), (incremental.pair_form, full.pair_form)]:
+        assert table.offsets.keys() == full_table.offsets.keys()
+        for key in full_table.offsets:
+            found, expected = table.window(key), full_table.window(key)
+            assert found[1:] == expected[1:]
+            assert found[0].reindex(expected[0].index).equals(expected[0])
+    totals = incremental.player_totals('Brand New Player', 'batting')
+    assert totals is not None and totals['balls'] > 0
+    assert totals == full.player_totals('Brand New Player', 'batting')
+
+def test_repeated_match_rows_are_rejected(frames, snapshot):
+    deliveries, matches = match_copy(frames, int(frames[1]['id'].iloc[0]), 930001)
+    result = dataset.ingest(deliveries, matches + matches)
+    assert result == {"error": "Match rows given more than once: 930001"}
+    assert dataset.current() is snapshot
+
+def test_ingest_needs_a_loaded_dataset(frames, monkeypatch):
+    monkeypatch.setattr(dataset, '_current', None)
+    with pytest.raises(RuntimeError):
+        dataset.ingest(*match_copy(frames, int(frames[1]['id'].iloc[0]), 930002))
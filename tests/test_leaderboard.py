@@ -0,0 +1,60 @@
+import pytest
+
+import dataset
+import leaderboard
+
+# The leaders straight from the deliveries: each player's totals in the season and phase,
+# players under min_balls dropped, sorted by the metric with the player's name breaking ties
+def brute_force(frames, metric, season, phase, min_balls, k):
+    deliveries, matches = frames
+    role, value, descending = leaderboard.METRICS[metric]
+    facts = deliveries.assign(
+        season=dataset.season_of(deliveries, matches),
+        phase=dataset.over_phase(deliveries['over']),
+        player=deliveries['batter' if role == 'batting' else 'bowler'].astype(object),
+        runs=deliveries['batsman_runs'],
+        runs_conceded=deliveries['total_runs'],
+        balls=1,
+        fours=(deliveries['batsman_runs'] == 4).astype(int),
+        sixes=(deliveries['batsman_runs'] == 6).astype(int),
+        wickets=deliveries['is_wicket'],
+    )
+    if season is not None:
+        facts = facts[facts['season'] == season]
+    if phase is not None:
+        facts = facts[facts['phase'] == phase]
+    totals = facts.groupby('player')[leaderboard.MEASURES].sum()
+    totals = totals[totals['balls'] >= min_balls]
+    totals = totals.assign(value=value(totals)).reset_index()
+    ranked = totals.sort_values(['value', 'player'], ascending=[not descending, True])
+    return [(row.player, row.value) for row in ranked.head(k).itertuples()]
+
+@pytest.mark.parametrize('metric', list(leaderboard.METRICS))
+@pytest.mark.parametrize('season, phase, min_balls', [(None, None, 0), (None, 'death', 12), ('first', None, 30), ('first', 'powerplay', 6)])
+def test_leaders_match_a_brute_force_ranking(frames, snapshot, metric, season, phase, min_balls):
+    if season == 'first':
+        season = int(frames[1]['season'].min())
+    leaders = snapshot.leaderboards.top(metric, season, phase, min_balls, 8)
+    expected = brute_force(frames, metric, season, phase, min_balls, 8)
+
+    assert [leader['player'] for leader in leaders] == [player for player, _ in expected]
+    assert [leader[metric] for leader in leaders] == pytest.approx([value for _, value in expected], abs=0.005)
+    assert [leader['rank'] for leader in leaders] == list(range(1, len(leaders) + 1))
+
+# Without min_balls a rate only ranks players with the metric's default balls; counts rank everyone
+@pytest.mark.parametrize('metric', ['strike_rate', 'economy', 'runs'])
+def test_default_min_balls(frames, snapshot, metric):
+    import api
+
+    default = leaderboard.DEFAULT_MIN_BALLS.get(metric, 0)
+    result = api.leaderboard_top(metric, k=5)
+    assert result['min_balls'] == default
+    assert [leader['player'] for leader in result['leaders']] == \
+        [player for player, _ in brute_force(frames, metric, None, None, default, 5)]
+
+@pytest.mark.parametrize('query', ['k=0', 'k=ten', 'min_balls=-1', 'season=twenty'])
+def test_bad_arguments_are_rejected(snapshot, query):
+    import app
+
+    response = app.app.test_client().get(f'/leaderboard?metric=runs&{query}')
+    assert response.status_code == 400
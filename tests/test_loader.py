@@ -0,0 +1,58 @@
+import os
+
+import pandas as pd
+import pytest
+
+import loader
+
+pytest.importorskip('pyarrow')
+
+@pytest.fixture
+def source(frames, tmp_path):
+    path = tmp_path / 'cleaned_match.csv'
+    frames[1].to_csv(path, index=False)
+    return str(path)
+
+def no_parse(*args, **kwargs):
+    raise AssertionError('CSV parsed although the cache is valid')
+
+# The cached frame is the typed CSV parse, column types included
+def test_cache_round_trip(source, tmp_path, monkeypatch):
+    cache_dir = str(tmp_path / 'cache')
+    parsed = loader.load_matches(source, cache_dir)
+    assert os.path.exists(os.path.join(cache_dir, 'cleaned_match.feather'))
+    assert isinstance(parsed['venue'].dtype, pd.CategoricalDtype)
+    assert parsed['team1'].dtype == parsed['winner'].dtype
+
+    monkeypatch.setattr(loader, 'read_typed_csv', no_parse)
+    pd.testing.assert_frame_equal(loader.load_matches(source, cache_dir), parsed)
+
+# A new mtime with the same content keeps the cache; changed content rebuilds it
+def test_cache_invalidation(source, tmp_path, monkeypatch):
+    cache_dir = str(tmp_path / 'cache')
+    parsed = loader.load_matches(source, cache_dir)
+    stat = os.stat(source)
+    os.utime(source, (stat.st_atime, stat.st_mtime + 10))
+    with monkeypatch.context() as patch:
+        patch.setattr(loader, 'read_typed_csv', no_parse)
+        pd.testing.assert_frame_equal(loader.load_matches(source, cache_dir), parsed)
+        pd.testing.assert_frame_equal(loader.load_matches(source, cache_dir), parsed)
+
+    # An edit of the same size (a four-digit season) under a new mtime: the content hash differs
+    changed = pd.read_csv(source)
+    changed.loc[0, 'season'] += 1
+    changed.to_csv(source, index=False)
+    os.utime(source, (stat.st_atime, stat.st_mtime + 20))
+    reloaded = loader.load_matches(source, cache_dir)
+    assert reloaded.loc[0, 'season'] == changed.loc[0, 'season']
+    pd.testing.assert_frame_equal(reloaded, loader.read_typed_csv(source, loader.MATCH_INTS, loader.MATCH_CATEGORIES))
+
+def test_cache_version_change_rebuilds(source, tmp_path, monkeypatch):
+    cache_dir = str(tmp_path / 'cache')
+    loader.load_matches(source, cache_dir)
+    monkeypatch.setattr(loader, 'CACHE_VERSION', loader.CACHE_VERSION + 1)
+    parsed = []
+    read_typed_csv = loader.read_typed_csv
+    monkeypatch.setattr(loader, 'read_typed_csv', lambda *args, **kwargs: parsed.append(1) or read_typed_csv(*args, **kwargs))
+    loader.load_matches(source, cache_dir)
+    assert parsed == [1]
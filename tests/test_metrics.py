@@ -0,0 +1,22 @@
+import types
+
+import metrics
+
+# Entry points are wrapped and record their own metrics; helpers run unwrapped inside them
+def test_helpers_are_not_instrumented():
+    module = types.ModuleType('instrumented')
+    exec("def helper(x):\n    return x + 1\n\ndef entry(x):\n    return helper(x) * 2\n", module.__dict__)
+    helper = module.helper
+    metrics.reset()
+    metrics.instrument_module(module, skip={'helper'})
+
+    assert module.helper is helper
+    assert module.entry(1) == 4
+    recorded = {labels for name, labels in metrics.summaries if name == 'ipl_function_duration_seconds'}
+    assert recorded == {(('function', 'entry'),)}
+    metrics.reset()
+
+def test_api_helpers_exist():
+    import api
+
+    assert all(callable(getattr(api, name, None)) for name in api.HELPERS)
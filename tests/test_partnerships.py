@@ -0,0 +1,20 @@
+import pytest
+
+@pytest.mark.parametrize('query', ['limit=0', 'limit=-1', 'limit=x', 'cursor=-1', 'cursor=abc', 'season=twenty', 'match_id=x'])
+def test_invalid_arguments_are_rejected(snapshot, query):
+    import app
+
+    response = app.app.test_client().get(f'/all%20partnerships?{query}')
+    assert response.status_code == 400
+
+def test_paging_walks_every_row_once(snapshot):
+    import app
+
+    client = app.app.test_client()
+    rows, cursor = [], 0
+    while cursor is not None:
+        response = client.get(f'/all%20partnerships?limit=50&cursor={cursor}')
+        assert response.status_code == 200
+        rows.extend(response.get_json())
+        cursor = response.headers.get('X-Next-Cursor')
+    assert len(rows) == len(snapshot.partnerships)
@@ -0,0 +1,17 @@
+def test_player_totals_match_the_deliveries(snapshot, frames):
+    deliveries, _ = frames
+    player = str(deliveries['batter'].value_counts().index[0])
+    batting = deliveries[deliveries['batter'] == player]
+    totals = snapshot.player_totals(player, 'batting')
+    assert totals['runs'] == batting['batsman_runs'].sum()
+    assert totals['balls'] == len(batting)
+
+    team = str(batting['bowling_team'].iloc[0])
+    against = batting[batting['bowling_team'] == team]
+    assert snapshot.player_totals(player, 'batting', opposing_team=team)['runs'] == against['batsman_runs'].sum()
+
+    death = batting[batting['over'] >= 15]
+    assert snapshot.player_totals(player, 'batting', phase='death')['balls'] == len(death)
+
+    assert snapshot.player_totals('Nobody', 'batting') is None
+    assert snapshot.player_totals(player, 'batting', opposing_team='Nobody') is None
@@ -0,0 +1,13 @@
+def test_data_queries_do_not_guess_misspelled_names(snapshot):
+    import api
+
+    assert 'error' in api.player_performance('CSK P31')
+    assert 'error' in api.player_performance('CSK P3x')
+    assert 'error' in api.player_vs_team('CSK P31', 'Mumbai Indians')
+    assert api.player_performance('csk  p3')['player'] == 'CSK P3'
+
+def test_name_lookup_still_resolves_typos(snapshot):
+    import api
+
+    assert api.resolve_name('player', 'CSK P3x')['canonical'] == 'CSK P3'
+    assert snapshot.players.resolve('CSK P3x') is None
@@ -0,0 +1,31 @@
+import api
+
+def partnership_key(partnership):
+    return partnership['runs'], partnership['balls'], partnership['batsmen']
+
+# Every section of the combined report equals the per-innings analysis it replaces, for every match
+def test_report_sections_equal_the_innings_analyses(snapshot):
+    for match_id in sorted(snapshot.match_offsets):
+        report = api.match_report(match_id)['innings']
+        analyses = {n: getattr(api, f'match_innings_{n}')(match_id)['innings'] for n in range(1, 6)}
+        assert set(report) == set(analyses[1])
+
+        for inning, stats in report.items():
+            first = analyses[1][inning]
+            assert (stats['batting_team'], stats['total_runs'], stats['wickets']) == \
+                (first['batting_team'], first['total_runs'], first['wickets'])
+            assert stats['phase_stats'] == first['phase_stats']
+            assert stats['top_performers'] == {key: analyses[2][inning][key] for key in ['top_batsman', 'top_bowler']}
+            assert stats['boundaries'] == analyses[3][inning]['boundaries']
+            assert stats['fall_of_wickets'] == analyses[4][inning]['fall_of_wickets']
+            assert sorted(stats['partnerships'], key=partnership_key) == \
+                sorted(analyses[5][inning]['partnerships'], key=partnership_key)
+
+def test_report_sections_can_be_selected(snapshot):
+    match_id = min(snapshot.match_offsets)
+    report = api.match_report(match_id, ['boundaries', 'partnerships'])
+    assert report['sections'] == ['boundaries', 'partnerships']
+    for stats in report['innings'].values():
+        assert 'boundaries' in stats and 'partnerships' in stats and 'phase_stats' not in stats
+    assert 'error' in api.match_report(match_id, ['boundaries', 'scorecard'])
+    assert api.match_report(1)['error'] == 'Match ID not found'
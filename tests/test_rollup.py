@@ -0,0 +1,33 @@
+import pandas as pd
+import pytest
+
+import rollup
+
+# Cube queries against the same grouping done directly on the matches table
+def test_matches_by_season(frames):
+    matches = frames[1]
+    records = rollup.query(rollup.build_match_rollups(matches), ['season'], {}, ['count', 'mean_target'])
+    expected = matches.groupby('season')['target_runs'].agg(['size', 'mean'])
+    assert [record['season'] for record in records] == expected.index.tolist()
+    assert [record['count'] for record in records] == expected['size'].tolist()
+    assert [record['mean_target'] for record in records] == pytest.approx(expected['mean'].tolist())
+
+def test_team_wins_with_a_venue_filter(frames):
+    matches = frames[1]
+    venue = matches['venue'].astype(object).mode()[0]
+    records = rollup.query(rollup.build_match_rollups(matches), ['team'], {'venue': [venue]}, ['count', 'wins'])
+
+    played = matches[matches['venue'].astype(object) == venue]
+    sides = pd.concat([played[['team1', 'winner']].set_axis(['team', 'winner'], axis=1),
+                       played[['team2', 'winner']].set_axis(['team', 'winner'], axis=1)]).astype(object)
+    expected = sides.assign(won=sides['team'] == sides['winner']).groupby('team')['won'].agg(['size', 'sum'])
+    assert {record['team']: (record['count'], record['wins']) for record in records} == \
+        {team: (int(row['size']), int(row['sum'])) for team, row in expected.iterrows()}
+
+def test_margin_histogram_counts_every_decided_match(frames):
+    matches = frames[1]
+    record, = rollup.query(rollup.build_match_rollups(matches), [], {}, ['count', 'margin_histogram'])
+    assert record['count'] == len(matches)
+    histogram = record['margin_histogram']
+    assert sum(histogram['win_by_runs'].values()) == (matches['result'] == 'runs').sum()
+    assert sum(histogram['win_by_wickets'].values()) == (matches['result'] == 'wickets').sum()
@@ -0,0 +1,42 @@
+import pytest
+
+import dataset
+from conftest import match_copy
+
+# A typo in one word of a name of several words still finds it
+@pytest.mark.parametrize('query, name', [
+    ('mumbia', 'Mumbai Indians'),
+    ('mumbai indains', 'Mumbai Indians'),
+    ('kolkatta knight', 'Kolkata Knight Riders'),
+    ('hyderbad', 'Sunrisers Hyderabad'),
+    ('chidambram', 'MA Chidambaram Stadium, Chepauk, Chennai'),
+])
+def test_typo_lookups(snapshot, query, name):
+    import api
+
+    results = api.search_names(query, k=3)['results']
+    assert name in [result['name'] for result in results]
+
+def test_prefixes_rank_before_typos(snapshot):
+    import api
+
+    assert api.search_names('mumbai', k=1)['results'][0]['name'] == 'Mumbai Indians'
+    assert api.search_names('zzzz')['results'] == []
+
+# Names added by an ingest are found by prefix and with a typo
+def test_ingested_names_are_searchable(frames, snapshot):
+    import api
+
+    deliveries, matches = match_copy(frames, int(frames[1]['id'].iloc[0]), 950001)
+    for row in deliveries[:6]:
+        row['batter'] = 'Rahmanullah Gurbaz'
+    assert 'error' not in dataset.ingest(deliveries, matches)
+    assert api.search_names('gurb', kind='player')['results'][0]['name'] == 'Rahmanullah Gurbaz'
+    assert api.search_names('rahmanulah', kind='player')['results'][0]['name'] == 'Rahmanullah Gurbaz'
+
+@pytest.mark.parametrize('query', ['k=0', 'k=many', 'kind=umpire'])
+def test_bad_arguments_are_rejected(snapshot, query):
+    import app
+
+    response = app.app.test_client().get(f'/search?q=mumbai&{query}')
+    assert response.status_code == 400
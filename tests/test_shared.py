@@ -0,0 +1,62 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+import shared
+
+def check_equal(attached, df):
+    assert list(attached.columns) == list(df.columns)
+    for column in df.columns:
+        assert attached[column].astype(object).tolist() == df[column].astype(object).tolist(), column
+
+# The attached frame has the exported values, as read-only views of the mapped arrays
+def test_export_attach_round_trip(frames, tmp_path):
+    deliveries = frames[0].head(2000)
+    directory = str(tmp_path / 'deliveries')
+    shared.export(deliveries, directory, {'version': 'a'})
+    attached = shared.attach(directory)
+
+    check_equal(attached, deliveries)
+    assert attached['match_id'].dtype == deliveries['match_id'].dtype
+    assert isinstance(attached['batter'].dtype, pd.CategoricalDtype)
+    values = attached['match_id'].to_numpy()
+    assert not values.flags.writeable
+    while not isinstance(values, np.memmap) and values is not None:
+        values = values.base
+    assert values is not None
+
+# Re-exporting the same source keeps the store; a new source replaces it, and a frame attached
+# before keeps reading the old arrays until it is dropped
+def test_reexport_and_detach(frames, tmp_path):
+    deliveries = frames[0].head(500)
+    directory = str(tmp_path / 'deliveries')
+    shared.export(deliveries, directory, {'version': 'a'})
+    meta = os.path.join(directory, 'meta.json')
+    written = os.stat(meta).st_mtime_ns
+    shared.export(deliveries, directory, {'version': 'a'})
+    assert os.stat(meta).st_mtime_ns == written
+
+    old = shared.attach(directory)
+    changed = deliveries.assign(total_runs=deliveries['total_runs'] + 1)
+    shared.export(changed, directory, {'version': 'b'})
+    assert shared.is_current(directory, {'version': 'b'}) and not shared.is_current(directory, {'version': 'a'})
+    check_equal(shared.attach(directory), changed)
+    check_equal(old, deliveries)
+    assert [name for name in os.listdir(tmp_path) if name.startswith('.')] == []
+
+# load_deliveries exports on first use and when the source file changes, and attaches otherwise
+def test_load_deliveries_exports_once_per_source(frames, tmp_path, monkeypatch):
+    path = tmp_path / 'cleaned_del.csv'
+    frames[0].head(300).to_csv(path, index=False)
+    directory, cache_dir = str(tmp_path / 'store'), str(tmp_path / 'cache')
+    exports = []
+    export = shared.export
+    monkeypatch.setattr(shared, 'export', lambda *args: exports.append(1) or export(*args))
+
+    assert len(shared.load_deliveries(directory, str(path), cache_dir)) == 300
+    assert len(shared.load_deliveries(directory, str(path), cache_dir)) == 300
+    assert len(exports) == 1
+    frames[0].head(400).to_csv(path, index=False)
+    assert len(shared.load_deliveries(directory, str(path), cache_dir)) == 400
+    assert len(exports) == 2
@@ -0,0 +1,35 @@
+import threading
+
+import dataset
+
+# A pinned request keeps reading the snapshot it started with; new requests see the latest
+def test_pinned_snapshot_survives_a_publish(frames, snapshot):
+    newer = dataset.build_snapshot(*frames, 'newer')
+    token = dataset.pin()
+    try:
+        dataset.publish(newer)
+        assert dataset.current() is snapshot
+        seen = []
+        other = threading.Thread(target=lambda: seen.append(dataset.current()))
+        other.start()
+        other.join()
+        assert seen == [newer]
+    finally:
+        dataset.unpin(token)
+    assert dataset.current() is newer
+
+# A request publishing midway (as a concurrent ingest would) still answers from its own snapshot
+def test_request_reads_the_snapshot_it_started_with(frames, snapshot, monkeypatch):
+    import api
+    import app
+
+    newer = dataset.build_snapshot(*frames, 'newer')
+
+    def match_report(match_id, sections=None):
+        dataset.publish(newer)
+        return {"version": dataset.current().version}
+
+    monkeypatch.setattr(api, 'match_report', match_report)
+    response = app.app.test_client().get(f'/match/report?match_id={min(snapshot.match_offsets)}')
+    assert response.get_json() == {"version": snapshot.version}
+    assert dataset.current() is newer
@@ -0,0 +1,60 @@
+import numpy as np
+import pytest
+
+import api
+import state
+
+# The state after every delivery, recomputed by walking each innings ball by ball
+def walk(deliveries, matches):
+    by_id = matches.set_index('id')
+    expected = []
+    for (match_id, inning), rows in deliveries.groupby(['match_id', 'inning'], sort=False):
+        overs = by_id.loc[match_id, 'target_overs']
+        total = round((20 if overs != overs else overs) * 6) if inning <= 2 else state.SUPER_OVER_BALLS
+        score = wickets = legal = 0
+        for row in rows.itertuples():
+            partnership = wickets
+            score += row.total_runs
+            wickets += row.is_wicket
+            legal += row.extras_type not in state.NOT_LEGAL
+            remaining = max(total - legal, 0)
+            required = (by_id.loc[match_id, 'target_runs'] - score) / remaining * 6 if inning == 2 and remaining else np.nan
+            expected.append((score, wickets, legal, remaining, score / legal * 6 if legal else 0, required, partnership))
+    return expected
+
+def test_state_matches_a_ball_by_ball_walk(frames, snapshot):
+    deliveries, matches = frames
+    columns = ['score', 'wickets', 'legal_balls', 'balls_remaining', 'current_run_rate', 'required_run_rate', 'partnership']
+    found = snapshot.delivery_state[columns].to_numpy(float)
+    expected = np.array(walk(deliveries, matches), dtype=float)
+    assert found.shape == expected.shape
+    np.testing.assert_allclose(found, expected, rtol=1e-5, equal_nan=True)
+
+# Per-over charts against per-match sums and running totals of the deliveries
+@pytest.mark.parametrize('chart', ['worm', 'manhattan'])
+def test_charts_match_per_match_sums(frames, snapshot, chart):
+    deliveries = frames[0]
+    for match_id in sorted(snapshot.match_offsets)[:8]:
+        rows = deliveries[deliveries['match_id'] == match_id]
+        result = api.match_progress(match_id, chart)
+        assert set(result['innings']) == set(rows['inning'].unique())
+        for inning, stats in result['innings'].items():
+            per_over = rows[rows['inning'] == inning].groupby('over')[['total_runs', 'is_wicket']].sum()
+            assert [point['over'] for point in stats['overs']] == (per_over.index + 1).tolist()
+            if chart == 'worm':
+                assert [point['score'] for point in stats['overs']] == per_over['total_runs'].cumsum().tolist()
+                assert [point['wickets'] for point in stats['overs']] == per_over['is_wicket'].cumsum().tolist()
+            else:
+                assert [point['runs'] for point in stats['overs']] == per_over['total_runs'].tolist()
+                assert [point['wickets'] for point in stats['overs']] == per_over['is_wicket'].tolist()
+
+def test_run_rate_chart(frames, snapshot):
+    deliveries, matches = frames
+    match_id = min(snapshot.match_offsets)
+    result = api.match_progress(match_id, 'run_rate')
+    assert all(point['required_run_rate'] is None for point in result['innings'][1]['overs'])
+    last = result['innings'][1]['overs'][-1]
+    first_innings = deliveries[(deliveries['match_id'] == match_id) & (deliveries['inning'] == 1)]
+    legal = (~first_innings['extras_type'].isin(state.NOT_LEGAL)).sum()
+    assert last['current_run_rate'] == round(first_innings['total_runs'].sum() / legal * 6, 2)
+    assert api.match_progress(match_id, 'pie')['error'].startswith('Invalid chart')
@@ -0,0 +1,8 @@
+import pytest
+
+@pytest.mark.parametrize('query, status', [('', 200), ('season=2008', 200), ('season=twenty', 400), ('season=-1', 400)])
+def test_season_argument(snapshot, query, status):
+    import app
+
+    response = app.app.test_client().get(f'/teams/phase_matrix?{query}')
+    assert response.status_code == status
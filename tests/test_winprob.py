@@ -0,0 +1,81 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import api
+import winprob
+
+# Models are trained on the synthetic snapshot and saved under the test's directory
+@pytest.fixture
+def model(snapshot, tmp_path, monkeypatch):
+    monkeypatch.setattr(winprob, 'model_path', lambda version: str(tmp_path / f'winprob-{version}.json'))
+    monkeypatch.setattr(winprob, '_models', winprob.cache.LRUCache(maxsize=4))
+    return winprob.model_for(snapshot)
+
+def test_probabilities_are_bounded(snapshot, model):
+    for match_id in sorted(snapshot.match_offsets):
+        result = api.match_win_probability(match_id)
+        for stats in result['innings'].values():
+            p = np.array([ball['win_probability'] for ball in stats['balls']])
+            assert np.isfinite(p).all() and (p >= 0).all() and (p <= 1).all()
+
+# A finished chase is certain: the last ball gives 1 to a winning chase, 0 to a losing one
+# and 0.5 to a tie
+def test_finished_chases_are_certain(frames, snapshot, model):
+    matches = frames[1].set_index('id')
+    checked = 0
+    for match_id in sorted(snapshot.match_offsets):
+        result = api.match_win_probability(match_id)
+        if 2 not in result['innings'] or matches.loc[match_id, 'result'] == 'no result':
+            continue
+        chase = result['innings'][2]
+        last = chase['balls'][-1]
+        needed = matches.loc[match_id, 'target_runs'] - last['score']
+        chase_rows = (snapshot.match_deliveries(match_id)['inning'] == 2).to_numpy()
+        finished = needed <= 0 or last['wickets'] == 10 or \
+            snapshot.match_state(match_id)['balls_remaining'][chase_rows].iloc[-1] == 0
+        if not finished:
+            continue
+        expected = 1.0 if needed <= 0 else 0.5 if needed == 1 else 0.0
+        assert last['win_probability'] == expected
+        checked += 1
+        if needed <= 0:
+            assert matches.loc[match_id, 'winner'] == chase['batting_team']
+    assert checked > len(matches) // 2
+
+# Second innings states with the given runs needed, balls left and wickets down
+def chase_states(target, needed, balls_remaining, wickets):
+    needed = np.asarray(needed, dtype=float)
+    legal_balls = 120 - balls_remaining
+    score = target - needed
+    return pd.DataFrame({
+        'score': score,
+        'wickets': wickets,
+        'legal_balls': legal_balls,
+        'balls_remaining': balls_remaining,
+        'current_run_rate': score / max(legal_balls, 1) * 6,
+    })
+
+# Towards the end of a chase, needing more runs never makes winning likelier
+@pytest.mark.parametrize('balls_remaining', [0, 1, 3, 6, 12])
+@pytest.mark.parametrize('wickets', [0, 5, 9])
+def test_end_of_chase_is_monotonic_in_runs_needed(snapshot, model, balls_remaining, wickets):
+    match_id = min(snapshot.match_offsets)
+    target = float(snapshot.df_match.set_index('id').loc[match_id, 'target_runs'])
+    needed = np.arange(-2, 40)
+    states = chase_states(target, needed, balls_remaining, wickets)
+    p = winprob.win_probability(model, 2, states, pd.Series(match_id, index=states.index), snapshot.df_match)
+    assert (np.diff(p) <= 1e-12).all()
+    assert (p[needed <= 0] == 1).all()
+    if balls_remaining == 0:
+        assert p[needed == 1].tolist() == [0.5] and (p[needed > 1] == 0).all()
+
+def test_model_is_trained_once_per_version(snapshot, model, monkeypatch):
+    def no_training(*args):
+        raise AssertionError('model trained again')
+
+    monkeypatch.setattr(winprob, 'train', no_training)
+    assert winprob.model_for(snapshot) is model
+    monkeypatch.setattr(winprob, '_models', winprob.cache.LRUCache(maxsize=4))
+    assert winprob.model_for(snapshot) == model  # from the saved file
+    assert set(model['innings']) == {str(inning) for inning in winprob.INNINGS}
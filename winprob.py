@@ -0,0 +1,183 @@
+import argparse
+import json
+import os
+import threading
+
+import numpy as np
+
+import cache
+import dataset
+import loader
+
+# Win probability.
+# Logistic regression of "the batting side goes on to win" on the innings state after every
+# delivery of the first two innings (see state.py): in the first innings the score projected at
+# the current rate against the venue's par first-innings score, in the second the runs still
+# needed against the balls left, both with the wickets in hand. One model per innings, fitted by
+# Newton's method on standardized features, so the same data always gives the same coefficients.
+# Inference is one matrix product over the state rows of a whole match.
+#
+# Models are cached by dataset version, in memory and as JSON under the loader's cache
+# directory, so a model is trained once per version of the data; to train it offline for the
+# current dataset files:
+#
+#     python winprob.py
+MODEL_VERSION = 1
+MODEL_DIR = loader.CACHE_DIR
+
+INNINGS = [1, 2]
+FEATURES = {
+    1: ['projected_vs_par', 'balls_left', 'wickets_left', 'wickets_left_x_balls_left', 'projected_vs_par_x_balls_used'],
+    2: ['needed_vs_target', 'balls_left', 'wickets_left', 'wickets_left_x_balls_left', 'required_rate', 'needed_per_ball'],
+}
+
+# Venue par: mean first-innings score at the venue, shrunk towards the overall mean by
+# PAR_PRIOR_MATCHES matches' worth of weight, so venues with few matches stay near it
+PAR_PRIOR_MATCHES = 10
+L2 = 1e-3
+ITERATIONS = 25
+
+def venue_pars(matches):
+    scores = matches['target_runs'] - 1
+    overall = float(scores.mean()) if scores.notna().any() else 160.0
+    by_venue = scores.groupby(matches['venue'].astype(object)).agg(['sum', 'count'])
+    pars = (by_venue['sum'] + PAR_PRIOR_MATCHES * overall) / (by_venue['count'] + PAR_PRIOR_MATCHES)
+    return {str(venue): float(par) for venue, par in pars.items()}, overall
+
+# Feature matrix of the delivery state rows of one innings number (state rows, the deliveries'
+# match IDs and the matches frame), plus the runs still needed in a chase
+def features(inning, state, match_ids, matches, pars, default_par):
+    by_id = matches.set_index('id')
+    score = state['score'].to_numpy(float)
+    wickets_left = (10 - state['wickets'].to_numpy(float)) / 10
+    remaining = state['balls_remaining'].to_numpy(float)
+    total = np.maximum(state['legal_balls'].to_numpy(float) + remaining, 1)
+    balls_left = remaining / total
+
+    if inning == 1:
+        par = match_ids.map(by_id['venue'].astype(object)).map(pars).fillna(default_par).to_numpy(float)
+        projected = score + state['current_run_rate'].to_numpy(float) * remaining / 6
+        columns = [projected / par - 1, balls_left, wickets_left, wickets_left * balls_left, (projected / par - 1) * (1 - balls_left)]
+        return np.column_stack(columns), None
+
+    target = match_ids.map(by_id['target_runs']).to_numpy(float)
+    needed = target - score
+    required = np.clip(np.maximum(needed, 0) * 6 / np.maximum(remaining, 1), 0, 36) / 6
+    columns = [needed / target, balls_left, wickets_left, wickets_left * balls_left, required, np.maximum(needed, 0) / (remaining + 1)]
+    return np.column_stack(columns), needed
+
+# Coefficients of an L2-regularized logistic regression (intercept first) on standardized X
+def fit_logistic(X, y):
+    mean, scale = X.mean(axis=0), X.std(axis=0)
+    scale[scale == 0] = 1
+    Z = np.column_stack([np.ones(len(X)), (X - mean) / scale])
+    coef = np.zeros(Z.shape[1])
+    penalty = L2 * len(Z) * np.eye(Z.shape[1])
+    penalty[0, 0] = 0
+    for _ in range(ITERATIONS):
+        p = 1 / (1 + np.exp(-Z @ coef))
+        gradient = Z.T @ (y - p) - penalty @ coef
+        hessian = (Z * (p * (1 - p))[:, None]).T @ Z + penalty
+        step = np.linalg.solve(hessian, gradient)
+        coef += step
+        if np.abs(step).max() < 1e-8:
+            break
+    return {'mean': mean.tolist(), 'scale': scale.tolist(), 'coef': coef.tolist()}
+
+def predict(params, X):
+    Z = (X - np.asarray(params['mean'])) / np.asarray(params['scale'])
+    coef = np.asarray(params['coef'])
+    return 1 / (1 + np.exp(-(coef[0] + Z @ coef[1:])))
+
+# Train on every delivery of the first two innings of decided matches
+def train(deliveries, state, matches, version):
+    pars, default_par = venue_pars(matches)
+    winners = matches.set_index('id')['winner'].astype(object)
+    model = {'model_version': MODEL_VERSION, 'dataset_version': version, 'venue_pars': pars, 'default_par': default_par, 'innings': {}}
+    for inning in INNINGS:
+        rows = (deliveries['inning'] == inning).to_numpy()
+        match_ids = deliveries['match_id'][rows]
+        winner = match_ids.map(winners)
+        X, _ = features(inning, state[rows], match_ids, matches, pars, default_par)
+        keep = winner.notna().to_numpy() & np.isfinite(X).all(axis=1)
+        y = (deliveries['batting_team'][rows].astype(object) == winner).to_numpy(float)
+        if keep.sum() < len(FEATURES[inning]) + 1 or len(np.unique(y[keep])) < 2:
+            raise ValueError(f"Not enough decided matches to train the innings {inning} model")
+        params = fit_logistic(X[keep], y[keep])
+        p = np.clip(predict(params, X[keep]), 1e-9, 1 - 1e-9)
+        params.update(
+            features=FEATURES[inning],
+            rows=int(keep.sum()),
+            log_loss=float(-np.mean(y[keep] * np.log(p) + (1 - y[keep]) * np.log(1 - p))),
+            accuracy=float(np.mean((p > 0.5) == y[keep])),
+        )
+        model['innings'][str(inning)] = params
+    return model
+
+# Win probability of the batting side after every delivery of the given innings rows of a
+# match. A finished chase is certain: won once nothing is needed, lost when out of wickets or
+# balls short of the target (a tie, one run short, goes to a super over: even).
+def win_probability(model, inning, state, match_ids, matches):
+    X, needed = features(inning, state, match_ids, matches, model['venue_pars'], model['default_par'])
+    p = predict(model['innings'][str(inning)], np.nan_to_num(X))
+    if inning == 2:
+        over = ((state['wickets'] >= 10) | (state['balls_remaining'] == 0)).to_numpy()
+        p = np.where(over, np.where(needed == 1, 0.5, 0.0), p)
+        p = np.where(needed <= 0, 1.0, p)
+    return p
+
+def model_path(version, directory=MODEL_DIR):
+    return os.path.join(directory, f'winprob-{version}-v{MODEL_VERSION}.json')
+
+def save(model, path):
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path + '.tmp', 'w') as f:
+        json.dump(model, f)
+    os.replace(path + '.tmp', path)
+
+def load(path):
+    try:
+        with open(path) as f:
+            model = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return model if model.get('model_version') == MODEL_VERSION else None
+
+_models = cache.LRUCache(maxsize=4)
+_training = threading.Lock()
+
+# Model of a snapshot's version: from memory, else from its file, else trained and saved
+def model_for(snap):
+    model = _models.get(snap.version)
+    if model is not None:
+        return model
+    with _training:
+        model = _models.get(snap.version)
+        if model is None:
+            path = model_path(snap.version)
+            model = load(path)
+            if model is None:
+                model = train(snap.df_del, snap.delivery_state, snap.df_match, snap.version)
+                try:
+                    save(model, path)
+                except OSError:  # read-only checkout: the model is kept in memory only
+                    pass
+            _models.set(snap.version, model)
+    return model
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--force', action='store_true', help='retrain even if a model of this version is saved')
+    options = parser.parse_args()
+
+    snap = dataset.load()
+    path = model_path(snap.version)
+    if options.force and os.path.exists(path):
+        os.remove(path)
+    model = model_for(snap)
+    for inning, params in model['innings'].items():
+        print(f"innings {inning}: {params['rows']} deliveries, log loss {params['log_loss']:.4f}, accuracy {params['accuracy']:.3f}")
+    print(f"model of dataset version {snap.version} saved to {path}")
+
+if __name__ == '__main__':
+    main()